@@ -0,0 +1,12 @@
+"""
+Asynchronous Server Gateway Interface (ASGI) entry point
+"""
+
+import os
+import uvicorn
+from service.asgi import app
+
+PORT = int(os.getenv("PORT", "8501"))
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="0.0.0.0", port=PORT)
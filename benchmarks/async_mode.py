@@ -0,0 +1,191 @@
+"""
+Throughput of the ASGI (asyncio) serving mode vs WSGI at high concurrency
+
+Starts wsgi.py (the threaded Flask server) and then asgi.py (uvicorn with
+the async engine) on copies of the same seeded SQLite database and drives
+each with 10, 100 and 1000 concurrent keep-alive clients, all coroutines
+on one asyncio event loop speaking plain HTTP/1.1, so a thousand clients
+cost sockets rather than threads. The mix covers the routes the ASGI mode
+serves itself: reservation reads and writes and the reference data.
+Prints requests per second, p50/p99 latency and errors per server and
+client count.
+
+Usage:
+    python -m benchmarks.async_mode [--database /tmp/async_mode.db]
+        [--seed-reservations 100000] [--clients 10,100,1000] [--duration 15]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import closing
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+from benchmarks.load_test import Workload, start_server
+
+SERVERS = (("wsgi", "wsgi.py"), ("asgi", "asgi.py"))
+MIX = {"get_reservation": 40, "list_by_account": 20, "get_account": 10,
+       "car_types": 10, "locations": 10, "create_reservation": 10}
+TIMEOUT = 30
+
+
+class HttpConnection:
+    """One keep-alive HTTP/1.1 connection, reopened when the server closes it."""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, payload=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(payload).encode() if payload is not None else b""
+        head = (f"{method} {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+                f"Content-Length: {len(body)}\r\n")
+        if payload is not None:
+            head += "Content-Type: application/json\r\n"
+        self.writer.write(head.encode() + b"\r\n" + body)
+        try:
+            status_line = await self.reader.readline()
+            if not status_line:
+                raise ConnectionError("Server closed the connection")
+            headers = {}
+            while (line := await self.reader.readline()) not in (b"\r\n", b""):
+                name, _, value = line.decode().partition(":")
+                headers[name.strip().lower()] = value.strip()
+            await self.reader.readexactly(int(headers.get("content-length", 0)))
+        except BaseException:
+            self.close()
+            raise
+        if headers.get("connection", "").lower() == "close":
+            self.close()
+        return int(status_line.split()[1])
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+def next_request(workload, rng):
+    operation = rng.choices(list(MIX), list(MIX.values()))[0]
+    if operation == "get_reservation":
+        return "GET", f"/reservations/{rng.randint(1, workload.max_reservation_id)}", None
+    if operation == "list_by_account":
+        return "GET", f"/reservations/account/{rng.randint(1, workload.max_account_id)}", None
+    if operation == "get_account":
+        return "GET", f"/accounts/{rng.randint(1, workload.max_account_id)}", None
+    if operation == "car_types":
+        return "GET", "/car-types", None
+    if operation == "locations":
+        return "GET", "/locations", None
+    pick_up = datetime.now() + timedelta(days=rng.randint(1, 90), hours=rng.randint(0, 23))
+    days = rng.randint(1, 14)
+    return "POST", "/reservations", {
+        "AccountId": rng.randint(1, workload.max_account_id),
+        "CarTypeId": rng.choice(workload.car_types)[0],
+        "PickUpTime": pick_up.isoformat(),
+        "DropOffTime": (pick_up + timedelta(days=days)).isoformat(),
+        "Duration": days,
+        "PickUpLocationId": rng.choice(workload.locations)[0],
+        "DropOffLocationId": rng.choice(workload.locations)[0],
+    }
+
+
+async def run_clients(base_url, workload, clients, duration, warmup):
+    """(latencies of successful requests, errors) of `clients` closed-loop clients."""
+    url = urlsplit(base_url)
+    loop = asyncio.get_running_loop()
+    measure_from = loop.time() + warmup
+    deadline = measure_from + duration
+    latencies, errors = [], 0
+
+    async def client(number):
+        nonlocal errors
+        rng = random.Random(number)
+        connection = HttpConnection(url.hostname, url.port)
+        while (begin := loop.time()) < deadline:
+            method, path, payload = next_request(workload, rng)
+            try:
+                status = await asyncio.wait_for(connection.request(method, path, payload),
+                                                TIMEOUT)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+                status = None
+                # Back off a little so a refusing server is not spun on
+                await asyncio.sleep(0.05)
+            if begin >= measure_from:
+                if status is None or status >= 500:
+                    errors += 1
+                else:
+                    latencies.append(loop.time() - begin)
+        connection.close()
+
+    await asyncio.gather(*(client(number) for number in range(clients)))
+    return latencies, errors
+
+
+def copy_database(source, target):
+    """
+    Copy a SQLite database with the backup API, which includes pages still
+    in the source's write-ahead log; copying the main file alone loses them.
+    """
+    with closing(sqlite3.connect(source)) as reader, closing(sqlite3.connect(target)) as writer:
+        reader.backup(writer)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database", default="/tmp/async_mode.db")
+    parser.add_argument("--seed-reservations", type=int, default=100000,
+                        help="Seed the database first if it does not exist.")
+    parser.add_argument("--clients", default="10,100,1000", help="Comma-separated client counts.")
+    parser.add_argument("--duration", type=float, default=15, help="Measured seconds per level.")
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--port", type=int, default=5058)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.database):
+        subprocess.run(["flask", "--app", "wsgi", "db-seed", "--reset",
+                        "--reservations", str(args.seed_reservations)],
+                       env=dict(os.environ, DATABASE_URI=f"sqlite:///{args.database}",
+                                DB_ENGINE_PROFILE="default"), check=True)
+    levels = [int(clients) for clients in args.clients.split(",")]
+
+    print(f"{'server':<6} {'clients':>7} {'RPS':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for name, script in SERVERS:
+        database = f"{args.database}.{name}"
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(database + suffix):
+                os.remove(database + suffix)
+        copy_database(args.database, database)
+        database_uri = f"sqlite:///{database}"
+        workload = Workload(database_uri)
+        server, base_url = start_server(f"{sys.executable} {script}", args.port, database_uri,
+                                        AVAILABILITY_REFRESH_INTERVAL="0")
+        try:
+            for clients in levels:
+                started = time.perf_counter()
+                latencies, errors = asyncio.run(
+                    run_clients(base_url, workload, clients, args.duration, args.warmup))
+                elapsed = min(time.perf_counter() - started - args.warmup, args.duration)
+                if len(latencies) > 1:
+                    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+                    p50, p99 = cuts[49] * 1000, cuts[98] * 1000
+                else:
+                    p50 = p99 = float("nan")
+                print(f"{name:<6} {clients:>7} {len(latencies) / elapsed:>9.1f} {p50:>9.1f} "
+                      f"{p99:>9.1f} {errors:>7}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
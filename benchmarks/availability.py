@@ -0,0 +1,64 @@
+"""
+Availability index query latency
+
+Fills an AvailabilityIndex with a synthetic fleet and a year of bookings
+per car, then times free_cars() for random type/branch/window queries.
+
+Usage:
+    python -m benchmarks.availability [--cars 20000] [--bookings-per-car 50] [--queries 20000]
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from service.availability import AvailabilityIndex, CarSchedule
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cars", type=int, default=20000)
+    parser.add_argument("--bookings-per-car", type=int, default=50)
+    parser.add_argument("--car-types", type=int, default=20)
+    parser.add_argument("--branches", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    start = datetime.now()
+    index = AvailabilityIndex()
+    index.horizon = start
+    reservation_id = 0
+    for car in range(args.cars):
+        plate = f"CAR{car:07d}"
+        group = (rng.randint(1, args.car_types), rng.randint(1, args.branches))
+        index._cars[plate] = group  # pylint: disable=protected-access
+        index._groups.setdefault(group, set()).add(plate)  # pylint: disable=protected-access
+        index._schedules[plate] = CarSchedule()  # pylint: disable=protected-access
+        pick_up = start
+        for _ in range(args.bookings_per_car):
+            pick_up += timedelta(hours=rng.randint(1, 120))
+            drop_off = pick_up + timedelta(hours=rng.randint(4, 96))
+            reservation_id += 1
+            index.track(reservation_id, plate, pick_up, drop_off)
+            pick_up = drop_off
+
+    samples = []
+    for _ in range(args.queries):
+        begin = start + timedelta(hours=rng.randint(0, 24 * 300))
+        query = (rng.randint(1, args.car_types), rng.randint(1, args.branches),
+                 begin, begin + timedelta(days=rng.randint(1, 7)))
+        t0 = time.perf_counter()
+        index.free_cars(*query)
+        samples.append((time.perf_counter() - t0) * 1e6)
+
+    samples.sort()
+    print(f"{args.cars} cars, {reservation_id} bookings, "
+          f"~{args.cars // (args.car_types * args.branches)} cars per type and branch")
+    print(f"free_cars latency: p50 {statistics.median(samples):.1f} us, "
+          f"p99 {samples[int(len(samples) * 0.99)]:.1f} us, max {samples[-1]:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Concurrency stress test of POST /reservations/book
+
+Starts wsgi.py (or uses --url) against a seeded database and fires
+hundreds of simultaneous bookings at it:
+
+- same window: every client books the same car type, branch and window at
+  once, round after round; exactly min(clients, cars) must succeed.
+- overlapping windows: every client books random, heavily overlapping
+  windows for a few car types and branches in a loop.
+
+Then checks the database for two reservations of one car with overlapping
+windows, and prints bookings per second, conflicts (409) and errors. Exits
+with status 1 on a double booking or a wrong number of successful bookings.
+
+Usage:
+    python -m benchmarks.booking_stress [--database /tmp/booking_stress.db]
+        [--seed-reservations 20000] [--clients 200] [--rounds 10] [--duration 20]
+    python -m benchmarks.booking_stress --database postgresql+psycopg://... --url http://...
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import requests
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import aliased
+
+from benchmarks.load_test import start_server
+from service.models import Car, Reservation
+
+TIMEOUT = 60
+
+
+def book(session, base_url, car_type_id, branch_id, start, days):
+    try:
+        return session.post(f"{base_url}/reservations/book", json={
+            "AccountId": 1, "CarTypeId": car_type_id,
+            "PickUpTime": start.isoformat(),
+            "DropOffTime": (start + timedelta(days=days)).isoformat(),
+            "PickUpLocationId": branch_id, "DropOffLocationId": branch_id,
+        }, timeout=TIMEOUT).status_code
+    except requests.RequestException:
+        return "error"
+
+
+def run_clients(clients, work):
+    """Run work(number, session) in `clients` threads released together."""
+    barrier = threading.Barrier(clients)
+    results = [Counter() for _ in range(clients)]
+
+    def client(number):
+        session = requests.Session()
+        barrier.wait()
+        work(number, session, results[number])
+
+    threads = [threading.Thread(target=client, args=(number,)) for number in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    total = Counter()
+    for counts in results:
+        total.update(counts)
+    return total, time.perf_counter() - started
+
+
+def report(label, counts, elapsed):
+    print(f"{label:<22} {sum(counts.values()):>8} {counts[201]:>8} {counts[409]:>9} "
+          f"{sum(c for s, c in counts.items() if s not in (201, 409)):>7} "
+          f"{sum(counts.values()) / elapsed:>9.1f}")
+    others = {status: count for status, count in counts.items() if status not in (201, 409)}
+    if others:
+        print(f"{'':<22} other statuses: {others}")
+
+
+def double_bookings(engine, since_id, horizon):
+    """Pairs of reservations of one car with overlapping windows, at least one new."""
+    other = aliased(Reservation)
+    with engine.connect() as connection:
+        return connection.scalar(
+            select(func.count())
+            .select_from(Reservation)
+            .join(other, (other.CarPlateNumber == Reservation.CarPlateNumber)
+                  & (other.Id != Reservation.Id)
+                  & (other.PickUpTime < Reservation.DropOffTime)
+                  & (other.DropOffTime > Reservation.PickUpTime))
+            .where(Reservation.Id > since_id, Reservation.CarPlateNumber.is_not(None),
+                   Reservation.PickUpTime >= horizon, other.PickUpTime >= horizon - timedelta(days=30))
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database", default="/tmp/booking_stress.db",
+                        help="SQLite file or database URI the server runs against.")
+    parser.add_argument("--seed-reservations", type=int, default=20000,
+                        help="Seed a SQLite database first if it does not exist.")
+    parser.add_argument("--url", default=None, help="Use an already running server.")
+    parser.add_argument("--port", type=int, default=5059)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=10, help="Same-window rounds.")
+    parser.add_argument("--duration", type=float, default=20,
+                        help="Seconds of overlapping-window bookings.")
+    args = parser.parse_args()
+
+    database_uri = args.database if "://" in args.database else f"sqlite:///{args.database}"
+    if "://" not in args.database and not os.path.exists(args.database):
+        subprocess.run(["flask", "--app", "wsgi", "db-seed", "--reset",
+                        "--reservations", str(args.seed_reservations)],
+                       env=dict(os.environ, DATABASE_URI=database_uri), check=True)
+
+    engine = create_engine(database_uri)
+    with engine.connect() as connection:
+        since_id = connection.scalar(select(func.max(Reservation.Id))) or 0
+        latest = connection.scalar(select(func.max(Reservation.DropOffTime))) or datetime.now()
+        groups = connection.execute(
+            select(Car.CarTypeId, Car.BranchId, func.count())
+            .where(Car.CarTypeId.is_not(None), Car.BranchId.is_not(None))
+            .group_by(Car.CarTypeId, Car.BranchId)
+            .order_by(func.count().desc(), Car.CarTypeId, Car.BranchId)
+            .limit(4)
+        ).all()
+    if not groups:
+        raise SystemExit("The database has no cars; seed it first")
+    # Windows after every existing booking, so the expected counts are exact
+    horizon = latest.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=30)
+
+    server = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        server, base_url = start_server(f"{sys.executable} wsgi.py", args.port, database_uri)
+    failures = []
+    try:
+        print(f"{'phase':<22} {'requests':>8} {'booked':>8} {'conflicts':>9} {'errors':>7} "
+              f"{'req/s':>9}")
+        for round_number in range(args.rounds):
+            car_type_id, branch_id, cars = groups[round_number % len(groups)]
+            start = horizon + timedelta(days=7 * round_number, hours=10)
+
+            def same_window(number, session, counts):
+                counts[book(session, base_url, car_type_id, branch_id, start, 3)] += 1
+
+            counts, elapsed = run_clients(args.clients, same_window)
+            report(f"same window {round_number + 1}", counts, elapsed)
+            if counts[201] != min(args.clients, cars):
+                failures.append(f"same window {round_number + 1}: {counts[201]} booked, "
+                                f"{min(args.clients, cars)} cars free")
+
+        overlap_start = horizon + timedelta(days=7 * args.rounds + 7)
+        deadline = time.perf_counter() + args.duration
+
+        def overlapping_windows(number, session, counts):
+            rng = random.Random(number)
+            while time.perf_counter() < deadline:
+                car_type_id, branch_id, _ = rng.choice(groups)
+                start = overlap_start + timedelta(hours=rng.randint(0, 24 * 28))
+                counts[book(session, base_url, car_type_id, branch_id, start,
+                            rng.randint(1, 5))] += 1
+
+        counts, elapsed = run_clients(args.clients, overlapping_windows)
+        report("overlapping windows", counts, elapsed)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    overlaps = double_bookings(engine, since_id, horizon)
+    print(f"double bookings: {overlaps}")
+    if overlaps:
+        failures.append(f"{overlaps} overlapping reservation pairs")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
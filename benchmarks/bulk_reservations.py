@@ -0,0 +1,87 @@
+"""
+Throughput of bulk reservation writes vs one request per reservation
+
+Creates reservations through POST /reservations one at a time and through
+POST /reservations/bulk, then updates them through PUT one at a time and
+through PATCH /reservations/bulk, on a scratch SQLite database via the
+Flask test client, and prints rows per second for each path.
+
+Usage:
+    python -m benchmarks.bulk_reservations [--rows 5000] [--batch 1000]
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--database", default="/tmp/bulk_reservations_benchmark.db")
+    args = parser.parse_args()
+
+    if os.path.exists(args.database):
+        os.remove(args.database)
+    os.environ["DATABASE_URI"] = f"sqlite:///{args.database}"
+    os.environ.setdefault("MODEL_WATCH_INTERVAL", "0")
+    os.environ.setdefault("AVAILABILITY_REFRESH_INTERVAL", "0")
+    # pylint: disable=import-outside-toplevel
+    from service import create_app
+
+    client = create_app().test_client()
+    rng = random.Random(5)
+    start = datetime(2025, 1, 1)
+
+    def reservation():
+        pick_up = start + timedelta(hours=rng.randint(0, 24 * 365))
+        return {
+            "AccountId": rng.randint(1, 1000), "CarTypeId": rng.randint(1, 15),
+            "PickUpTime": pick_up.isoformat(),
+            "DropOffTime": (pick_up + timedelta(days=rng.randint(1, 14))).isoformat(),
+            "PickUpLocationId": rng.randint(1, 20), "DropOffLocationId": rng.randint(1, 20),
+            "RentalPricePerDay": round(rng.uniform(40, 140), 2),
+        }
+
+    def timed(label, func):
+        began = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - began
+        print(f"{label:<32} {args.rows / elapsed:>10.0f} rows/s {elapsed:>8.2f} s")
+        return result
+
+    rows = [reservation() for _ in range(args.rows)]
+    batches = [rows[i:i + args.batch] for i in range(0, args.rows, args.batch)]
+
+    def create_single():
+        return [client.post("/reservations", json=row).get_json()["Id"] for row in rows]
+
+    def create_bulk():
+        ids = []
+        for batch in batches:
+            response = client.post("/reservations/bulk", json=batch)
+            ids.extend(result["Id"] for result in response.get_json()["results"])
+        return ids
+
+    single_ids = timed("POST /reservations x N", create_single)
+    bulk_ids = timed(f"POST /reservations/bulk x {len(batches)}", create_bulk)
+
+    def update_single():
+        for reservation_id in single_ids:
+            client.put(f"/reservations/{reservation_id}", json={"Duration": rng.randint(1, 14)})
+
+    def update_bulk():
+        for i in range(0, len(bulk_ids), args.batch):
+            client.patch("/reservations/bulk", json=[
+                {"Id": reservation_id, "Duration": rng.randint(1, 14)}
+                for reservation_id in bulk_ids[i:i + args.batch]
+            ])
+
+    timed("PUT /reservations/<id> x N", update_single)
+    timed(f"PATCH /reservations/bulk x {len(batches)}", update_bulk)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Micro-benchmark of the compiled price scorer against the sklearn Pipeline
+
+For single quotes and for batches it times Pipeline.predict on a DataFrame
+(the pre-compiled path) and CompiledPriceModel lookups, and reports the
+largest absolute difference between the two.
+
+Usage:
+    python -m benchmarks.compiled_scorer [--quotes 1000] [--repeat 20]
+"""
+import argparse
+import random
+import time
+
+import joblib
+import pandas as pd
+
+from benchmarks.predict_batch import MODEL_PATH, random_quotes
+from service.price_scorer import FEATURES
+
+
+def best_of(func, repeat):
+    """Best wall time of func() over `repeat` runs, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--quotes", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    estimator = joblib.load(MODEL_PATH)
+    quotes = random_quotes(args.quotes, random.Random(args.seed))
+    rows = [[quote[name] for name in FEATURES] for quote in quotes]
+    frame = pd.DataFrame(rows, columns=FEATURES)
+
+    pipeline_prices = estimator.model.predict(frame)
+    compiled_prices = estimator.compiled.predict_rows(rows)
+    max_diff = max(abs(a - b) for a, b in zip(pipeline_prices, compiled_prices))
+
+    single = rows[:100]
+    pipeline_single = best_of(
+        lambda: [estimator.model.predict(pd.DataFrame([row], columns=FEATURES)) for row in single],
+        max(1, args.repeat // 5)) / len(single)
+    compiled_single = best_of(
+        lambda: [estimator.compiled.predict_row(row) for row in single], args.repeat) / len(single)
+    pipeline_batch = best_of(
+        lambda: estimator.model.predict(pd.DataFrame(rows, columns=FEATURES)), args.repeat) / len(rows)
+    compiled_batch = best_of(
+        lambda: estimator.compiled.predict_rows(rows), args.repeat) / len(rows)
+
+    print(f"{'path':<28} {'pipeline us':>12} {'compiled us':>12} {'speedup':>8}")
+    print(f"{'single quote':<28} {pipeline_single * 1e6:>12.2f} {compiled_single * 1e6:>12.2f} "
+          f"{pipeline_single / compiled_single:>7.0f}x")
+    print(f"{f'batch of {len(rows)} (per quote)':<28} {pipeline_batch * 1e6:>12.2f} "
+          f"{compiled_batch * 1e6:>12.2f} {pipeline_batch / compiled_batch:>7.1f}x")
+    print(f"max |pipeline - compiled| = {max_diff:.3e}")
+
+
+if __name__ == "__main__":
+    main()
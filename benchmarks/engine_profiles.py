@@ -0,0 +1,94 @@
+"""
+Throughput of the database engine profiles under concurrency
+
+Starts wsgi.py once per DB_ENGINE_PROFILE ("default": SQLAlchemy's pool
+and SQLite's rollback journal; "tuned": the sized pool, pre-ping and the
+WAL/synchronous/busy_timeout pragmas) on its own copy of a seeded SQLite
+database, and drives each with the load test's endpoint mix at several
+client counts. Prints requests per second, p95 latency, server errors and
+the pool checkout waits the server reports on /metrics for each level.
+
+Usage:
+    python -m benchmarks.engine_profiles [--database /tmp/engine_profiles.db]
+        [--seed-reservations 100000] [--clients 4,16,64] [--duration 15]
+        [--mix create_reservation=30,get_reservation=70]
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+from collections import Counter
+
+import requests
+
+from benchmarks.load_test import DEFAULT_MIX, Workload, parse_mix, run_load, start_server, summarize
+
+PROFILES = ("default", "tuned")
+
+
+def pool_waits(base_url):
+    """(checkouts, seconds waited) of the primary pool, from /metrics."""
+    waits = {}
+    for line in requests.get(f"{base_url}/metrics", timeout=10).text.splitlines():
+        for name in ("count", "sum"):
+            if line.startswith(f'db_pool_checkout_wait_seconds_{name}{{pool="primary"}}'):
+                waits[name] = float(line.rsplit(" ", 1)[1])
+    return waits.get("count", 0), waits.get("sum", 0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database", default="/tmp/engine_profiles.db")
+    parser.add_argument("--seed-reservations", type=int, default=100000,
+                        help="Seed the database first if it does not exist.")
+    parser.add_argument("--clients", default="4,16,64", help="Comma-separated client counts.")
+    parser.add_argument("--duration", type=float, default=15, help="Measured seconds per level.")
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Comma-separated operation=weight.")
+    parser.add_argument("--port", type=int, default=5057)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.database):
+        subprocess.run(["flask", "--app", "wsgi", "db-seed", "--reset",
+                        "--reservations", str(args.seed_reservations)],
+                       env=dict(os.environ, DATABASE_URI=f"sqlite:///{args.database}",
+                                DB_ENGINE_PROFILE="default"), check=True)
+    mix = parse_mix(args.mix)
+    levels = [int(clients) for clients in args.clients.split(",")]
+
+    print(f"{'profile':<8} {'clients':>7} {'RPS':>8} {'p95 ms':>9} {'5xx/err':>8} "
+          f"{'checkouts':>10} {'mean wait ms':>13}")
+    for profile in PROFILES:
+        # The journal mode is stored in the file, so each profile gets its own copy
+        database = f"{args.database}.{profile}"
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(database + suffix):
+                os.remove(database + suffix)
+        shutil.copyfile(args.database, database)
+        database_uri = f"sqlite:///{database}"
+        workload = Workload(database_uri)
+        server, base_url = start_server(f"{sys.executable} wsgi.py", args.port, database_uri,
+                                        DB_ENGINE_PROFILE=profile,
+                                        AVAILABILITY_REFRESH_INTERVAL="0")
+        try:
+            for clients in levels:
+                checkouts, waited = pool_waits(base_url)
+                samples = run_load(base_url, workload, mix, clients, args.duration, args.warmup)
+                checkouts, waited = (now - before for now, before
+                                     in zip(pool_waits(base_url), (checkouts, waited)))
+                latencies, statuses = [], Counter()
+                for operation_latencies, operation_statuses in samples.values():
+                    latencies.extend(operation_latencies)
+                    statuses.update(operation_statuses)
+                total = summarize(latencies, statuses, args.duration)
+                mean_wait = waited / checkouts * 1000 if checkouts else 0.0
+                print(f"{profile:<8} {clients:>7} {total['rps']:>8.1f} {total['p95_ms']:>9.1f} "
+                      f"{total['errors']:>8} {int(checkouts):>10} {mean_wait:>13.3f}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
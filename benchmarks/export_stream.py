@@ -0,0 +1,75 @@
+"""
+Time to first byte and memory of the streaming reservation export
+
+Starts wsgi.py against a seeded database and downloads /reservations/export
+for one account, one branch and the whole table, as NDJSON and CSV. Prints
+rows, time to first byte, total time, throughput and the server's peak
+resident memory after each export; with a streamed response the peak
+should stay flat as the exports grow.
+
+Usage:
+    python -m benchmarks.export_stream [--database /tmp/export_stream.db] [--seed-reservations 1000000]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import requests
+
+from benchmarks.load_test import start_server
+
+
+def peak_rss_mib(pid):
+    with open(f"/proc/{pid}/status", encoding="utf-8") as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database", default="/tmp/export_stream.db")
+    parser.add_argument("--seed-reservations", type=int, default=1000000,
+                        help="Seed the database first if it does not exist.")
+    parser.add_argument("--port", type=int, default=5056)
+    args = parser.parse_args()
+
+    database_uri = f"sqlite:///{args.database}"
+    if not os.path.exists(args.database):
+        subprocess.run(["flask", "--app", "wsgi", "db-seed", "--reset",
+                        "--reservations", str(args.seed_reservations)],
+                       env=dict(os.environ, DATABASE_URI=database_uri), check=True)
+
+    server, base_url = start_server(f"{sys.executable} wsgi.py", args.port, database_uri)
+    try:
+        print(f"server peak RSS after start: {peak_rss_mib(server.pid):.0f} MiB")
+        print(f"{'export':<24} {'format':<7} {'rows':>9} {'TTFB ms':>9} {'total s':>8} "
+              f"{'MiB/s':>7} {'peak RSS MiB':>13}")
+        for label, params in (("one account", {"account_id": 1}),
+                              ("one branch", {"pickup_location_id": 1}),
+                              ("whole table", {})):
+            for export_format in ("ndjson", "csv"):
+                started = time.perf_counter()
+                response = requests.get(f"{base_url}/reservations/export", stream=True,
+                                        params=dict(params, format=export_format), timeout=600)
+                response.raise_for_status()
+                first_byte, size, lines = None, 0, 0
+                for chunk in response.iter_content(chunk_size=65536):
+                    if first_byte is None:
+                        first_byte = time.perf_counter() - started
+                    size += len(chunk)
+                    lines += chunk.count(b"\n")
+                total = time.perf_counter() - started
+                rows = lines - (export_format == "csv")
+                print(f"{label:<24} {export_format:<7} {rows:>9} {(first_byte or total) * 1000:>9.1f} "
+                      f"{total:>8.2f} {size / total / 2 ** 20:>7.1f} {peak_rss_mib(server.pid):>13.0f}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
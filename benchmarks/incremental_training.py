@@ -0,0 +1,81 @@
+"""
+Incremental vs full retraining of the rental price model
+
+Trains on a synthetic history, then replays a series of daily batches two
+ways: folding each batch in with partial_fit, and retraining from scratch on
+everything seen so far. Reports the time of each refresh and the largest
+price difference between the two models (new categories appear on the way).
+
+Usage:
+    python -m benchmarks.incremental_training [--history 200000] [--daily 2000] [--days 5]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from service.ml_model import RentalPriceEstimator, simulated_credit_score
+
+BRANDS = ['Toyota', 'Honda', 'Ford', 'BMW', 'Audi', 'Tesla']
+MODELS = ['Corolla', 'Civic', 'Focus', 'X5', 'A4', 'Model 3']
+CITIES = ['New York', 'Los Angeles', 'Chicago', 'Houston', 'Miami', 'Boston']
+
+
+def synthetic_reservations(first_id, count, rng, known=5):
+    """Training frame with ids first_id.. and only the first `known` categories of each kind."""
+    ids = np.arange(first_id, first_id + count)
+    brand = rng.integers(0, known, count)
+    days = rng.integers(1, 15, count)
+    frame = pd.DataFrame({
+        'reservation_id': ids,
+        'brand': np.array(BRANDS)[brand],
+        'model': np.array(MODELS)[brand],
+        'pickupcity': np.array(CITIES)[rng.integers(0, known, count)],
+        'seats': rng.integers(2, 8, count).astype(float),
+        'pick_up_day': rng.integers(0, 7, count).astype(float),
+        'pick_up_month': rng.integers(1, 13, count).astype(float),
+        'drop_off_day': rng.integers(0, 7, count).astype(float),
+        'drop_off_month': rng.integers(1, 13, count).astype(float),
+        'credit_score': simulated_credit_score(ids).astype(float),
+    })
+    frame['price'] = days * (40.0 + 10 * brand) + rng.normal(0, 25, count)
+    return frame
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--history", type=int, default=200000)
+    parser.add_argument("--daily", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    seen = synthetic_reservations(1, args.history, rng)
+    incremental = RentalPriceEstimator()
+    initial = timed(lambda: incremental.train_model(seen))
+    print(f"initial full train on {len(seen)} rows: {initial:.3f}s")
+
+    print(f"{'day':>4} {'rows':>9} {'incremental s':>14} {'full retrain s':>15} {'max gap $':>10}")
+    for day in range(1, args.days + 1):
+        # The last day brings a brand, model and city never seen before
+        batch = synthetic_reservations(int(seen['reservation_id'].max()) + 1, args.daily, rng,
+                                       known=6 if day == args.days else 5)
+        seen = pd.concat([seen, batch], ignore_index=True)
+
+        update = timed(lambda: incremental.partial_fit(batch))
+        full = RentalPriceEstimator()
+        retrain = timed(lambda: full.train_model(seen))
+        gap = incremental.max_prediction_gap(full)
+        print(f"{day:>4} {len(seen):>9} {update:>14.3f} {retrain:>15.3f} {gap:>10.2e}")
+
+
+if __name__ == "__main__":
+    main()
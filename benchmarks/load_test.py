@@ -0,0 +1,341 @@
+"""
+HTTP load test of the reservation API
+
+Starts the app from wsgi.py against a local database (optionally seeding it
+first with `flask db-seed`) and drives it with concurrent closed-loop
+clients, each picking its next request from a weighted endpoint mix. Prints
+requests per second and p50/p95/p99 latency per endpoint, and can save the
+results as JSON so two runs can be compared.
+
+Usage:
+    python -m benchmarks.load_test [--database /tmp/load_test.db] [--seed-reservations 100000]
+        [--clients 16] [--duration 30] [--mix get_reservation=30,predict_price=20,...]
+        [--output results.json] [--baseline previous.json]
+    python -m benchmarks.load_test --url http://127.0.0.1:5000 --database /tmp/load_test.db
+    python -m benchmarks.load_test --compare old.json new.json
+"""
+import argparse
+import json
+import os
+import random
+import shlex
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+DEFAULT_MIX = ("get_reservation=30,list_by_account=20,predict_price=20,car_types=8,"
+               "locations=8,create_reservation=8,update_reservation=4,delete_reservation=2")
+# Percentage change that --compare reports as a regression
+DEFAULT_THRESHOLD = 10.0
+TIMEOUT = 30
+
+
+class Workload:
+    """Ids and reference data the clients draw their requests from."""
+
+    def __init__(self, database_uri):
+        # pylint: disable=import-outside-toplevel
+        from sqlalchemy import create_engine, func, select
+        from service.models import Account, BranchLocation, CarType, Reservation
+
+        engine = create_engine(database_uri)
+        with engine.connect() as connection:
+            self.max_reservation_id = connection.scalar(select(func.max(Reservation.Id))) or 1
+            self.max_account_id = connection.scalar(select(func.max(Account.Id))) or 1
+            self.car_types = connection.execute(
+                select(CarType.TypeId, CarType.Brand, CarType.Model, CarType.Seats)).all()
+            self.locations = connection.execute(select(BranchLocation.Id, BranchLocation.City)).all()
+        engine.dispose()
+        if not self.car_types or not self.locations:
+            raise SystemExit("The database has no car types or locations; seed it first")
+        # Reservations created by this run, the only ones it updates or deletes
+        self.created = deque()
+
+
+def get_reservation(workload, session, base_url, rng):
+    return session.get(f"{base_url}/reservations/{rng.randint(1, workload.max_reservation_id)}",
+                       timeout=TIMEOUT)
+
+
+def list_by_account(workload, session, base_url, rng):
+    return session.get(f"{base_url}/reservations/account/{rng.randint(1, workload.max_account_id)}",
+                       params={"expand": "car_type,locations"}, timeout=TIMEOUT)
+
+
+def predict_price(workload, session, base_url, rng):
+    _, brand, model, seats = rng.choice(workload.car_types)
+    return session.post(f"{base_url}/predict-price", json={
+        "Brand": brand, "Model": model, "Seats": seats or 4,
+        "Location_City": rng.choice(workload.locations)[1],
+        "Pick_Up_Day": rng.randint(0, 6), "Pick_Up_Month": rng.randint(1, 12),
+        "Drop_Off_Day": rng.randint(0, 6), "Drop_Off_Month": rng.randint(1, 12),
+        "Credit_Score": rng.randint(300, 850),
+    }, timeout=TIMEOUT)
+
+
+def car_types(workload, session, base_url, rng):
+    return session.get(f"{base_url}/car-types", timeout=TIMEOUT)
+
+
+def locations(workload, session, base_url, rng):
+    return session.get(f"{base_url}/locations", timeout=TIMEOUT)
+
+
+def create_reservation(workload, session, base_url, rng):
+    type_id = rng.choice(workload.car_types)[0]
+    pick_up = datetime.now() + timedelta(days=rng.randint(1, 90), hours=rng.randint(0, 23))
+    days = rng.randint(1, 14)
+    response = session.post(f"{base_url}/reservations", json={
+        "AccountId": rng.randint(1, workload.max_account_id),
+        "CarTypeId": type_id,
+        "PickUpTime": pick_up.isoformat(),
+        "DropOffTime": (pick_up + timedelta(days=days)).isoformat(),
+        "Duration": days,
+        "PickUpLocationId": rng.choice(workload.locations)[0],
+        "DropOffLocationId": rng.choice(workload.locations)[0],
+    }, timeout=TIMEOUT)
+    if response.status_code == 201:
+        workload.created.append(response.json()["Id"])
+    return response
+
+
+def update_reservation(workload, session, base_url, rng):
+    try:
+        reservation_id = workload.created[-1]
+    except IndexError:
+        return create_reservation(workload, session, base_url, rng)
+    return session.put(f"{base_url}/reservations/{reservation_id}",
+                       json={"DropOffLocationId": rng.choice(workload.locations)[0]},
+                       timeout=TIMEOUT)
+
+
+def delete_reservation(workload, session, base_url, rng):
+    try:
+        reservation_id = workload.created.popleft()
+    except IndexError:
+        return create_reservation(workload, session, base_url, rng)
+    return session.delete(f"{base_url}/reservations/{reservation_id}", timeout=TIMEOUT)
+
+
+OPERATIONS = {operation.__name__: operation for operation in (
+    get_reservation, list_by_account, predict_price, car_types, locations,
+    create_reservation, update_reservation, delete_reservation,
+)}
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise SystemExit(f"Unknown operation {name!r}; choose from {', '.join(OPERATIONS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def run_load(base_url, workload, mix, clients, duration, warmup, seed=1):
+    """
+    Run `clients` closed-loop clients for warmup + duration seconds and
+    return {operation: ([latency seconds], Counter(status))} for requests
+    started after the warm-up.
+    """
+    names, weights = list(mix), list(mix.values())
+    start = time.perf_counter()
+    measure_from, deadline = start + warmup, start + warmup + duration
+    results = [dict() for _ in range(clients)]
+
+    def client(number):
+        rng = random.Random(seed * 1000 + number)
+        session = requests.Session()
+        samples = results[number]
+        while True:
+            begin = time.perf_counter()
+            if begin >= deadline:
+                break
+            name = rng.choices(names, weights)[0]
+            try:
+                status = OPERATIONS[name](workload, session, base_url, rng).status_code
+            except requests.RequestException:
+                status = "error"
+            if begin >= measure_from:
+                latencies, statuses = samples.setdefault(name, ([], Counter()))
+                latencies.append(time.perf_counter() - begin)
+                statuses[status] += 1
+
+    threads = [threading.Thread(target=client, args=(number,)) for number in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    merged = {}
+    for samples in results:
+        for name, (latencies, statuses) in samples.items():
+            all_latencies, all_statuses = merged.setdefault(name, ([], Counter()))
+            all_latencies.extend(latencies)
+            all_statuses.update(statuses)
+    return merged
+
+
+def summarize(latencies, statuses, duration):
+    """Request rate and latency percentiles (in ms) of one set of samples."""
+    ordered = sorted(latencies)
+    if len(ordered) > 1:
+        cuts = statistics.quantiles(ordered, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = ordered[0] if ordered else 0.0
+    errors = sum(count for status, count in statuses.items()
+                 if status == "error" or status >= 500)
+    return {
+        "requests": len(ordered),
+        "rps": round(len(ordered) / duration, 2),
+        "p50_ms": round(p50 * 1000, 3),
+        "p95_ms": round(p95 * 1000, 3),
+        "p99_ms": round(p99 * 1000, 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3) if ordered else 0.0,
+        "errors": errors,
+        "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+    }
+
+
+def report(results):
+    header = f"{'operation':<20} {'requests':>9} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}"
+    print(header)
+    print("-" * len(header))
+    for name, row in list(results["operations"].items()) + [("total", results["total"])]:
+        print(f"{name:<20} {row['requests']:>9} {row['rps']:>9.1f} {row['p50_ms']:>9.2f} "
+              f"{row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['errors']:>7}")
+
+
+def compare(baseline, current, threshold):
+    """Print per-operation changes; returns the number of regressions."""
+    regressions = 0
+    print(f"{'operation':<20} {'metric':<7} {'baseline':>10} {'current':>10} {'change':>8}")
+    operations = list(current["operations"]) + ["total"]
+    for name in operations:
+        old = baseline["total"] if name == "total" else baseline["operations"].get(name)
+        new = current["total"] if name == "total" else current["operations"][name]
+        if not old:
+            continue
+        for metric, higher_is_better in (("rps", True), ("p50_ms", False),
+                                         ("p95_ms", False), ("p99_ms", False)):
+            change = (new[metric] - old[metric]) / old[metric] * 100 if old[metric] else 0.0
+            worse = -change if higher_is_better else change
+            flag = "  REGRESSION" if worse > threshold else ""
+            regressions += bool(flag)
+            print(f"{name:<20} {metric:<7} {old[metric]:>10.2f} {new[metric]:>10.2f} {change:>+7.1f}%{flag}")
+    return regressions
+
+
+def start_server(command, port, database_uri, **env_overrides):
+    env = dict(os.environ, PORT=str(port), DATABASE_URI=database_uri, MODEL_WATCH_INTERVAL="0",
+               **env_overrides)
+    server = subprocess.Popen(shlex.split(command), env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(600):
+        if server.poll() is not None:
+            raise SystemExit(f"Server exited with status {server.returncode}")
+        try:
+            requests.get(f"{base_url}/car-types", timeout=1)
+            return server, base_url
+        except requests.RequestException:
+            time.sleep(0.1)
+    server.terminate()
+    raise SystemExit("Server did not start within 60 seconds")
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as results:
+        return json.load(results)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database", default="/tmp/load_test.db",
+                        help="SQLite file or database URI the server runs against.")
+    parser.add_argument("--seed-reservations", type=int, default=None,
+                        help="Reseed the database with this many reservations first.")
+    parser.add_argument("--url", default=None,
+                        help="Load an already running server instead of starting wsgi.py.")
+    parser.add_argument("--server-command", default=f"{sys.executable} wsgi.py",
+                        help="Command that starts the server; PORT and DATABASE_URI are set.")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds.")
+    parser.add_argument("--warmup", type=float, default=3, help="Unmeasured seconds first.")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Comma-separated operation=weight.")
+    parser.add_argument("--output", default=None, help="Save the results as JSON.")
+    parser.add_argument("--baseline", default=None, help="Compare this run against saved results.")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="Compare two saved results without running.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Percent change reported as a regression.")
+    args = parser.parse_args()
+
+    if args.compare:
+        baseline, current = (load_results(path) for path in args.compare)
+        sys.exit(1 if compare(baseline, current, args.threshold) else 0)
+
+    database_uri = args.database if "://" in args.database else f"sqlite:///{args.database}"
+    if args.seed_reservations:
+        subprocess.run(["flask", "--app", "wsgi", "db-seed", "--reset",
+                        "--reservations", str(args.seed_reservations)],
+                       env=dict(os.environ, DATABASE_URI=database_uri), check=True)
+
+    mix = parse_mix(args.mix)
+    workload = Workload(database_uri)
+    server = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        server, base_url = start_server(args.server_command, args.port, database_uri)
+    try:
+        started_at = datetime.now(timezone.utc).isoformat()
+        samples = run_load(base_url, workload, mix, args.clients, args.duration, args.warmup)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    all_latencies, all_statuses = [], Counter()
+    for latencies, statuses in samples.values():
+        all_latencies.extend(latencies)
+        all_statuses.update(statuses)
+    results = {
+        "meta": {
+            "started_at": started_at, "commit": git_commit(), "url": base_url,
+            "database": database_uri, "max_reservation_id": workload.max_reservation_id,
+            "clients": args.clients, "duration": args.duration, "warmup": args.warmup, "mix": mix,
+        },
+        "operations": {name: summarize(*samples[name], args.duration)
+                       for name in mix if name in samples},
+        "total": summarize(all_latencies, all_statuses, args.duration),
+    }
+    report(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(results, output, indent=2)
+    if args.baseline:
+        print()
+        sys.exit(1 if compare(load_results(args.baseline), results, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
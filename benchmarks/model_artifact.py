@@ -0,0 +1,64 @@
+"""
+Per-worker cost of loading the price model: pickle vs compact artifact
+
+Each variant runs in a fresh interpreter, the way a new Flask worker would,
+and reports the time spent importing and loading the model plus the
+resident memory of the process afterwards.
+
+Usage:
+    python -m benchmarks.model_artifact [--runs 5]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+CHILD = """
+import json, resource, time
+start = time.perf_counter()
+{load}
+elapsed = time.perf_counter() - start
+model.estimate_price('BMW', 'X5', 4, 'Miami', 1, 3, 2, 3, 700)
+with open('/proc/self/status') as status:
+    rss = next(int(line.split()[1]) for line in status if line.startswith('VmRSS'))
+print(json.dumps({{"seconds": elapsed, "rss_kb": rss}}))
+"""
+
+VARIANTS = {
+    "pickle (joblib + sklearn)": (
+        "import joblib\n"
+        "model = joblib.load('service/rental_price_model.pkl')"
+    ),
+    "compact (numpy memmap)": (
+        "from service.price_scorer import CompiledPriceModel\n"
+        "model = CompiledPriceModel.load('service/rental_price_model.rpm')"
+    ),
+}
+
+
+def measure(load, runs):
+    samples = [json.loads(subprocess.run(
+        [sys.executable, "-c", CHILD.format(load=load)],
+        check=True, capture_output=True, text=True,
+    ).stdout) for _ in range(runs)]
+    return (statistics.median(s["seconds"] for s in samples),
+            statistics.median(s["rss_kb"] for s in samples))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    results = {name: measure(load, args.runs) for name, load in VARIANTS.items()}
+    print(f"{'artifact':<28} {'import+load ms':>15} {'RSS MiB':>9}")
+    for name, (seconds, rss_kb) in results.items():
+        print(f"{name:<28} {seconds * 1000:>15.1f} {rss_kb / 1024:>9.1f}")
+    (pickle_s, pickle_rss), (compact_s, compact_rss) = results.values()
+    print(f"saved per worker: {(pickle_s - compact_s) * 1000:.1f} ms, "
+          f"{(pickle_rss - compact_rss) / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
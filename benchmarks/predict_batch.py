@@ -0,0 +1,72 @@
+"""
+Benchmark per-quote latency of RentalPriceEstimator.predict_many
+
+Scores the same random quotes one at a time and in batches of growing size
+so the per-quote cost of the vectorized path can be compared.
+
+Usage:
+    python -m benchmarks.predict_batch [--sizes 1 10 100 1000] [--repeat 20]
+"""
+import argparse
+import random
+import time
+
+import joblib
+
+MODEL_PATH = "service/rental_price_model.pkl"
+
+BRANDS = ['Toyota', 'Honda', 'Ford', 'BMW', 'Audi']
+MODELS = ['Corolla', 'Civic', 'Focus', 'X5', 'A4']
+CITIES = ['New York', 'Los Angeles', 'Chicago', 'Houston', 'Miami']
+
+
+def random_quotes(count, rng):
+    """Build `count` random, valid feature records."""
+    return [{
+        'brand': rng.choice(BRANDS),
+        'model': rng.choice(MODELS),
+        'seats': rng.randint(2, 7),
+        'pickupcity': rng.choice(CITIES),
+        'pick_up_day': rng.randint(0, 6),
+        'pick_up_month': rng.randint(1, 12),
+        'drop_off_day': rng.randint(0, 6),
+        'drop_off_month': rng.randint(1, 12),
+        'credit_score': rng.randint(300, 850),
+    } for _ in range(count)]
+
+
+def per_quote_us(func, quotes, repeat):
+    """Best-of-`repeat` wall time of func(quotes), in microseconds per quote."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(quotes)
+        best = min(best, time.perf_counter() - start)
+    return best / len(quotes) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    estimator = joblib.load(MODEL_PATH)
+    rng = random.Random(args.seed)
+
+    def one_at_a_time(quotes):
+        for quote in quotes:
+            estimator.estimate_price(**quote)
+
+    print(f"{'batch size':>10} {'loop us/quote':>15} {'batch us/quote':>15} {'speedup':>8}")
+    for size in args.sizes:
+        quotes = random_quotes(size, rng)
+        # The per-quote loop is slow; cap it so large sizes stay quick to run
+        loop = per_quote_us(one_at_a_time, quotes[:min(size, 200)], max(1, args.repeat // 5))
+        batch = per_quote_us(estimator.predict_many, quotes, args.repeat)
+        print(f"{size:>10} {loop:>15.1f} {batch:>15.1f} {loop / batch:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
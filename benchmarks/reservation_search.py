@@ -0,0 +1,96 @@
+"""
+Keyset search latency as the reservation table grows
+
+Grows a scratch SQLite database through the given sizes and, at each size,
+times /reservations/search style queries: the first page for an account,
+a page deep into a branch's history reached with a keyset cursor, and the
+same deep page fetched with OFFSET for comparison.
+
+Usage:
+    python -m benchmarks.reservation_search [--sizes 10000 100000 1000000] [--without-indexes]
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--database", default="/tmp/reservation_search_benchmark.db")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--without-indexes", action="store_true",
+                        help="Drop the search indexes to see the full-scan baseline.")
+    args = parser.parse_args()
+
+    if os.path.exists(args.database):
+        os.remove(args.database)
+    os.environ["DATABASE_URI"] = f"sqlite:///{args.database}"
+    os.environ.setdefault("MODEL_WATCH_INTERVAL", "0")
+    # pylint: disable=import-outside-toplevel
+    from service import create_app
+    from service.models import db, Reservation
+
+    app = create_app()
+    if args.without_indexes:
+        with app.app_context():
+            for index in Reservation.__table__.indexes:
+                index.drop(db.engine)
+    rng = random.Random(3)
+    start = datetime(2020, 1, 1)
+    accounts, branches = 5000, 50
+
+    def grow(to):
+        rows = []
+        for reservation_id in range(grow.size + 1, to + 1):
+            pick_up = start + timedelta(minutes=rng.randint(0, 60 * 24 * 365 * 4))
+            rows.append({
+                "Id": reservation_id,
+                "AccountId": rng.randint(1, accounts),
+                "CarTypeId": rng.randint(1, 20),
+                "PickUpLocationId": rng.randint(1, branches),
+                "DropOffLocationId": rng.randint(1, branches),
+                "PickUpTime": pick_up,
+                "DropOffTime": pick_up + timedelta(days=rng.randint(1, 14)),
+            })
+            if len(rows) == 50000:
+                db.session.execute(Reservation.__table__.insert(), rows)
+                rows = []
+        if rows:
+            db.session.execute(Reservation.__table__.insert(), rows)
+        db.session.commit()
+        grow.size = to
+    grow.size = 0
+
+    def timed_ms(func):
+        samples = []
+        for _ in range(args.repeat):
+            begin = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - begin) * 1000)
+        return statistics.median(samples)
+
+    print(f"{'rows':>10} {'first page ms':>14} {'deep keyset ms':>15} {'deep OFFSET ms':>15} {'depth':>7}")
+    with app.app_context():
+        for size in args.sizes:
+            grow(size)
+            branch = 7
+            depth = db.session.query(Reservation).filter_by(PickUpLocationId=branch).count() // 2
+            offset_query = (Reservation.query.filter(Reservation.PickUpLocationId == branch,
+                                                     Reservation.PickUpTime.is_not(None))
+                            .order_by(Reservation.PickUpTime, Reservation.Id))
+            middle = offset_query.offset(depth).first()
+
+            first = timed_ms(lambda: Reservation.search(account_id=42, limit=args.page_size))
+            keyset = timed_ms(lambda: Reservation.search(
+                pickup_location_id=branch, after=(middle.PickUpTime, middle.Id), limit=args.page_size))
+            offset = timed_ms(lambda: offset_query.offset(depth).limit(args.page_size).all())
+            print(f"{size:>10} {first:>14.2f} {keyset:>15.2f} {offset:>15.2f} {depth:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,29 +10,61 @@ api = None  # pylint: disable=invalid-name
 ############################################################
 def create_app():
     """Initialize the core application."""
+    # pylint: disable=import-outside-toplevel
+    from service.common.startup import startup
+
     # Create Flask application
-    app = Flask(__name__)
-    app.config.from_object(config)
+    with startup.phase("config"):
+        app = Flask(__name__)
+        app.config.from_object(config)
 
     # Initialize Plugins
-    # pylint: disable=import-outside-toplevel
-    from service.models import db
+    with startup.phase("database"):
+        from service.models import db
+        from service.common.engine import engine_options, engine_pools
+        from service.common.replicas import replica_binds, replicas
+
+        app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(app.config))
+        app.config.setdefault("SQLALCHEMY_BINDS", replica_binds(app.config))
+        db.init_app(app)
+
+    # Request latency, status and SQL metrics, served on /metrics
+    from service.common.metrics import metrics
 
-    db.init_app(app)
+    metrics.init_app(app)
+    metrics.add_collector(startup.render)
 
     with app.app_context():
+        # SQLite pragmas and pool wait/saturation metrics, before any connection opens
+        engine_pools.init_app(app, db.engines)
+        metrics.add_collector(engine_pools.render)
+        # Read-only routes on the replicas, with stickiness and fallback
+        replicas.init_app(app, db.engines)
+
         # Dependencies require we import the routes AFTER the Flask app is created
         # pylint: disable=wrong-import-position, wrong-import-order, unused-import
-        from service import (
-            routes,
-            models,
-        )  # noqa: F401 E402 # pylint: disable=cyclic-import
-        from service.common import cli_commands  # noqa: F401, E402
-
-        try:
-            db.create_all()
-        except Exception as error:  # pylint: disable=broad-except
-            app.logger.critical("%s: Cannot continue", error)
-            sys.exit(4)
+        with startup.phase("routes"):
+            from service import (
+                routes,
+                models,
+            )  # noqa: F401 E402 # pylint: disable=cyclic-import
+            from service.common import cli_commands  # noqa: F401, E402
+
+        if app.config["DB_CREATE_ON_STARTUP"]:
+            with startup.phase("schema"):
+                try:
+                    db.create_all()
+                except Exception as error:  # pylint: disable=broad-except
+                    app.logger.critical("%s: Cannot continue", error)
+                    sys.exit(4)
+
+        from service.availability import availability
+
+        availability.init_app(app)
+        startup.warm_up(app, "availability", availability.ensure_loaded,
+                        app.config["STARTUP_WARMUP"])
+        startup.warm_up(app, "model", routes.live_model.load_serving,
+                        app.config["STARTUP_WARMUP"])
+        routes.live_model.start_watcher(app.config["MODEL_WATCH_INTERVAL"])
 
         return app
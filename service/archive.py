@@ -0,0 +1,76 @@
+"""
+Archival of completed reservations
+
+RESERVATION only needs the reservations that can still change or be
+booked around; everything that dropped off more than ARCHIVE_HORIZON_DAYS
+ago is moved to RESERVATION_ARCHIVE by `flask archive-reservations`:
+
+- rows move in batches of at most ARCHIVE_BATCH_SIZE, oldest Ids first,
+  each batch copied and deleted in its own short transaction, so the hot
+  table is never locked for longer than one batch; on Postgres the batch's
+  rows are taken with FOR UPDATE SKIP LOCKED, so a reservation being
+  written is left for the next run;
+- the copy and delete are Core statements, which the session events do
+  not see: the reporting summaries keep counting archived reservations and
+  the availability index is left alone (it only holds recent windows).
+
+Lookups by Id fall back to the archive, listings and exports take
+?include_archived=true, and training and the summaries rebuild read both
+tables (Reservation.with_archive()). Everything else reads RESERVATION only.
+"""
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select
+
+from service.models import db, Reservation, ReservationArchive
+
+
+def archive_batch(connection, cutoff, batch_size):
+    """
+    Move up to `batch_size` reservations that dropped off before `cutoff`
+    to the archive on `connection`; returns how many were moved.
+    """
+    hot = Reservation.__table__
+    candidates = (select(hot.c.Id).where(hot.c.DropOffTime < cutoff)
+                  .order_by(hot.c.DropOffTime, hot.c.Id).limit(batch_size))
+    if connection.dialect.name == "postgresql":
+        candidates = candidates.with_for_update(skip_locked=True)
+    ids = connection.scalars(candidates).all()
+    if not ids:
+        return 0
+    connection.execute(insert(ReservationArchive.__table__).from_select(
+        [column.name for column in hot.columns], select(hot).where(hot.c.Id.in_(ids))))
+    connection.execute(delete(hot).where(hot.c.Id.in_(ids)))
+    return len(ids)
+
+
+def archive_reservations(horizon_days, batch_size, max_batches=None, pause=0.0, progress=None):
+    """
+    Move every reservation that dropped off more than `horizon_days` ago to
+    the archive, one committed batch at a time, sleeping `pause` seconds
+    between batches. Stops after `max_batches` if given. Calls
+    progress(moved so far) after each batch; returns the number moved.
+    """
+    cutoff = datetime.now() - timedelta(days=horizon_days)
+    moved = batches = 0
+    while max_batches is None or batches < max_batches:
+        with db.engine.begin() as connection:
+            count = archive_batch(connection, cutoff, batch_size)
+        if not count:
+            break
+        moved += count
+        batches += 1
+        if progress:
+            progress(moved)
+        if count < batch_size:
+            break
+        time.sleep(pause)
+    return moved
+
+
+def table_sizes():
+    """(current, archived) reservation counts."""
+    with db.engine.connect() as connection:
+        return (connection.scalar(select(func.count()).select_from(Reservation.__table__)),
+                connection.scalar(select(func.count()).select_from(ReservationArchive.__table__)))
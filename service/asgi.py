@@ -0,0 +1,161 @@
+"""
+Asynchronous (ASGI) serving mode
+
+Serves the hot routes (creating and reading reservations, an account's
+reservations, account names, car types and locations) from coroutines on
+an asyncio event loop, with an async SQLAlchemy engine (aiosqlite for
+SQLite, psycopg's async API for Postgres) and its own connection pool, so a
+request waiting on the database holds a pool connection but not a thread.
+Every other route is passed to the Flask app unchanged, so both modes
+expose the same API.
+
+The async routes only run their queries here: validation and response
+bodies come from the helpers their Flask counterparts use (service/routes.py),
+and writes go through the same ORM models, so the session events that keep
+the availability index and the reference cache current fire for them too.
+They are not counted in the per-route metrics and do not use the read
+replicas.
+
+Run with `python asgi.py` or `uvicorn service.asgi:app`.
+"""
+import json
+from contextlib import asynccontextmanager
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+
+from a2wsgi import WSGIMiddleware
+
+from service import create_app
+from service.common.engine import async_database_uri, async_engine_options, engine_pools
+from service.common.reference_cache import reference_cache
+from service.models import Account, BranchLocation, CarType, Reservation, ReservationArchive
+
+flask_app = create_app()
+# pylint: disable=wrong-import-position
+from service.routes import (  # noqa: E402
+    account_name_body, account_reservations_body, car_types_body, is_true, locations_body,
+    parse_expand, reservation_body,
+)
+
+engine = create_async_engine(async_database_uri(flask_app.config["SQLALCHEMY_DATABASE_URI"]),
+                             **async_engine_options(flask_app.config))
+engine_pools.track("async", engine.sync_engine, flask_app.config)
+Session = async_sessionmaker(engine, expire_on_commit=False)
+
+
+def json_response(payload, status_code=200, headers=None):
+    # Encoded like Flask's jsonify, so both modes return the same bytes
+    body = json.dumps(payload, default=flask_app.json.default, ensure_ascii=True,
+                      sort_keys=True, separators=(",", ":")) + "\n"
+    return Response(body, status_code=status_code, headers=headers,
+                    media_type="application/json")
+
+
+async def reference_response(request, tables, build):
+    """reference_data() for the async routes: `build` is awaited on a miss."""
+    entry = reference_cache.get(request.url.path)
+    if entry is None:
+        response = json_response(*await build())
+        entry = reference_cache.put(request.url.path, frozenset(tables),
+                                    flask_app.config["REFERENCE_CACHE_TTL"],
+                                    response.status_code, response.body)
+    _, _, status, body, etag = entry
+
+    headers = {"ETag": f'"{etag}"',
+               "Cache-Control": f"public, max-age={flask_app.config['REFERENCE_CACHE_MAX_AGE']}"}
+    if_none_match = {tag.strip().removeprefix("W/").strip('"')
+                     for tag in request.headers.get("if-none-match", "").split(",")}
+    if etag in if_none_match or "*" in if_none_match:
+        return Response(status_code=304, headers=headers)
+    return Response(body, status_code=status, headers=headers, media_type="application/json")
+
+
+######################################################################
+# Reservations
+######################################################################
+async def create_reservation(request):
+    try:
+        reservation = Reservation.deserialize(await request.json())
+        async with Session() as session:
+            session.add(reservation)
+            await session.commit()
+        return json_response(reservation.serialize(), 201)
+    except Exception as e:  # pylint: disable=broad-except
+        return json_response({"error": str(e)}, 400)
+
+
+async def get_reservation(request):
+    async with Session() as session:
+        reservation = (await session.get(Reservation, request.path_params["reservation_id"])
+                       or await session.get(ReservationArchive,
+                                            request.path_params["reservation_id"]))
+    return json_response(*reservation_body(reservation))
+
+
+async def list_reservations_by_account(request):
+    account_id = request.path_params["account_id"]
+    try:
+        expand = parse_expand(request.query_params.get("expand", ""))
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+    include_archived = is_true(request.query_params.get("include_archived", ""))
+
+    async with Session() as session:
+        if not expand:
+            source = Reservation.with_archive() if include_archived else Reservation
+            rows = (await session.scalars(
+                select(source).where(source.AccountId == account_id))).all()
+        else:
+            rows = (await session.execute(
+                Reservation.account_details_statement(account_id, include_archived))).all()
+    return json_response(*account_reservations_body(rows, expand))
+
+
+######################################################################
+# Reference data
+######################################################################
+async def get_account(request):
+    async with Session() as session:
+        row = (await session.execute(
+            Account.name_statement(request.path_params["account_id"]))).first()
+    return json_response(*account_name_body(row))
+
+
+async def list_car_types(request):
+    async def build():
+        async with Session() as session:
+            return car_types_body((await session.scalars(select(CarType))).all())
+    return await reference_response(request, [CarType.__tablename__], build)
+
+
+async def list_locations(request):
+    async def build():
+        async with Session() as session:
+            return locations_body((await session.scalars(select(BranchLocation))).all())
+    return await reference_response(request, [BranchLocation.__tablename__], build)
+
+
+@asynccontextmanager
+async def lifespan(_app):
+    yield
+    await engine.dispose()
+
+
+app = Starlette(
+    routes=[
+        Route("/reservations", create_reservation, methods=["POST"]),
+        Route("/reservations/{reservation_id:int}", get_reservation, methods=["GET"]),
+        Route("/reservations/account/{account_id:int}", list_reservations_by_account,
+              methods=["GET"]),
+        Route("/accounts/{account_id:int}", get_account, methods=["GET"]),
+        Route("/car-types", list_car_types, methods=["GET"]),
+        Route("/locations", list_locations, methods=["GET"]),
+        # Everything else is served by the Flask app
+        Mount("/", app=WSGIMiddleware(flask_app)),
+    ],
+    lifespan=lifespan,
+)
@@ -0,0 +1,255 @@
+"""
+In-memory car availability index
+
+Answers "which cars of type X at branch Y are free between T1 and T2"
+without querying RESERVATION. Every car keeps its booked windows sorted by
+pick-up time together with a running maximum of drop-off times, so a car
+is checked with one binary search.
+
+The index is bulk-loaded at startup (or on first use, see STARTUP_WARMUP)
+and kept current from SQLAlchemy
+session events: reservation rows flushed by a session are applied when
+that session commits (and dropped if it rolls back). Each worker process
+also rebuilds its index every AVAILABILITY_REFRESH_INTERVAL seconds to
+pick up writes made by other processes.
+
+Only reservations with a CarPlateNumber block a car, and only windows that
+end after the load horizon (now minus AVAILABILITY_LOOKBACK_DAYS) are kept.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from service.models import db, Car, Reservation, OUT_OF_SERVICE
+
+logger = logging.getLogger(__name__)
+
+
+class CarSchedule:
+    """Booked [start, end) windows of one car, sorted by start."""
+    __slots__ = ("starts", "ends", "ids", "max_ends")
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.ids = []
+        # max_ends[i] is the latest end among the first i + 1 windows
+        self.max_ends = []
+
+    def add(self, reservation_id, start, end):
+        i = bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.ids.insert(i, reservation_id)
+        self.max_ends.insert(i, end)
+        self._rebuild_max_ends(i)
+
+    def remove(self, reservation_id):
+        i = self.ids.index(reservation_id)
+        for column in (self.starts, self.ends, self.ids, self.max_ends):
+            del column[i]
+        self._rebuild_max_ends(i)
+
+    def _rebuild_max_ends(self, i):
+        latest = self.max_ends[i - 1] if i else None
+        for j in range(i, len(self.ends)):
+            latest = self.ends[j] if latest is None or self.ends[j] > latest else latest
+            self.max_ends[j] = latest
+
+    def is_free(self, start, end):
+        """True when no booked window overlaps [start, end)."""
+        # Windows starting before `end` are the only candidates; the latest
+        # of their ends decides whether any of them reaches past `start`
+        i = bisect_left(self.starts, end)
+        return i == 0 or self.max_ends[i - 1] <= start
+
+
+class AvailabilityIndex:
+    """Per-car interval index over current and future reservations."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cars = {}          # plate -> (car_type_id, branch_id)
+        self._groups = {}        # (car_type_id, branch_id) -> set of plates
+        self._schedules = {}     # plate -> CarSchedule
+        self._bookings = {}      # reservation id -> (plate, start, end)
+        self.lookback = timedelta(days=1)
+        self.horizon = None
+        self.loaded = False
+        self._load_lock = threading.Lock()
+        self._refresher = None
+        # Writes applied while a load is running, replayed onto its result
+        self._replay = None
+
+    def init_app(self, app):
+        """
+        Keep the index current for the lifetime of the app. It is loaded by
+        the startup warm-up (service/common/startup.py) or on first use.
+        """
+        self.lookback = timedelta(days=app.config["AVAILABILITY_LOOKBACK_DAYS"])
+        self.start_refresher(app, app.config["AVAILABILITY_REFRESH_INTERVAL"])
+
+    def ensure_loaded(self):
+        """Load the index unless it is loaded; waits for a load in progress."""
+        if self.loaded:
+            return
+        with self._load_lock:
+            if not self.loaded:
+                self._load()
+
+    def load(self):
+        """
+        Bulk-load cars and bookings, then swap them in at once. One load runs
+        at a time: a refresh and a first-use load would otherwise share the
+        replay buffer and lose the writes made meanwhile.
+        """
+        with self._load_lock:
+            self._load()
+
+    def _load(self):
+        horizon = datetime.now() - self.lookback
+        with self._lock:
+            self._replay = []
+        cars, groups, schedules, bookings = {}, {}, {}, {}
+        with db.engine.connect() as connection:
+            for plate, car_type_id, branch_id, status in connection.execute(
+                    select(Car.LicensePlateNumber, Car.CarTypeId, Car.BranchId, Car.Status)):
+                if status in OUT_OF_SERVICE:
+                    continue
+                cars[plate] = (car_type_id, branch_id)
+                groups.setdefault((car_type_id, branch_id), set()).add(plate)
+                schedules[plate] = CarSchedule()
+
+            rows = connection.execute(
+                select(Reservation.Id, Reservation.CarPlateNumber,
+                       Reservation.PickUpTime, Reservation.DropOffTime)
+                .where(Reservation.CarPlateNumber.is_not(None),
+                       Reservation.PickUpTime.is_not(None),
+                       Reservation.DropOffTime > horizon)
+                .order_by(Reservation.CarPlateNumber, Reservation.PickUpTime)
+            )
+            for reservation_id, plate, start, end in rows:
+                schedule = schedules.get(plate)
+                if schedule is not None:
+                    # Rows arrive sorted per car, so appending keeps order
+                    schedule.starts.append(start)
+                    schedule.ends.append(end)
+                    schedule.ids.append(reservation_id)
+                    schedule.max_ends.append(end if not schedule.max_ends
+                                             else max(end, schedule.max_ends[-1]))
+                    bookings[reservation_id] = (plate, start, end)
+
+        with self._lock:
+            self._cars, self._groups = cars, groups
+            self._schedules, self._bookings = schedules, bookings
+            self.horizon = horizon
+            self.loaded = True
+            replay, self._replay = self._replay, None
+            for args in replay:
+                self._track(*args)
+        logger.info("Availability index loaded: %d cars, %d bookings", len(cars), len(bookings))
+
+    def start_refresher(self, app, interval):
+        """Rebuild the index every `interval` seconds in a daemon thread."""
+        if self._refresher or interval <= 0:
+            return
+
+        def refresh():
+            while True:
+                time.sleep(interval)
+                try:
+                    with app.app_context():
+                        self.load()
+                except Exception as error:  # pylint: disable=broad-except
+                    logger.error("Availability index refresh failed: %s", error)
+
+        self._refresher = threading.Thread(target=refresh, name="availability-refresh", daemon=True)
+        self._refresher.start()
+
+    def track(self, reservation_id, plate, start, end):
+        """Add or move one reservation's booked window."""
+        with self._lock:
+            self._track(reservation_id, plate, start, end)
+
+    def forget(self, reservation_id):
+        """Drop a reservation's booked window, if it is indexed."""
+        with self._lock:
+            self._track(reservation_id, None, None, None)
+
+    def _track(self, reservation_id, plate, start, end):
+        if self._replay is not None:
+            self._replay.append((reservation_id, plate, start, end))
+        self._forget(reservation_id)
+        schedule = self._schedules.get(plate)
+        if schedule is None or start is None or end is None:
+            return
+        schedule.add(reservation_id, start, end)
+        self._bookings[reservation_id] = (plate, start, end)
+
+    def _forget(self, reservation_id):
+        booking = self._bookings.pop(reservation_id, None)
+        if booking:
+            self._schedules[booking[0]].remove(reservation_id)
+
+    def sync(self, reservation_ids):
+        """
+        Re-read the booked windows of the given reservations, for writes made
+        with Core statements that bypass the session events below.
+        """
+        rows = {}
+        with db.engine.connect() as connection:
+            for chunk_start in range(0, len(reservation_ids), 500):
+                chunk = reservation_ids[chunk_start:chunk_start + 500]
+                for reservation_id, plate, start, end in connection.execute(
+                        select(Reservation.Id, Reservation.CarPlateNumber,
+                               Reservation.PickUpTime, Reservation.DropOffTime)
+                        .where(Reservation.Id.in_(chunk))):
+                    rows[reservation_id] = (plate, start, end)
+        with self._lock:
+            for reservation_id in reservation_ids:
+                self._track(reservation_id, *rows.get(reservation_id, (None, None, None)))
+
+    def free_cars(self, car_type_id, branch_id, start, end):
+        """Plates of cars of a type at a branch with no booking overlapping [start, end)."""
+        self.ensure_loaded()
+        if self.horizon and start < self.horizon:
+            raise ValueError(f"Availability is only indexed from {self.horizon.isoformat()}")
+        with self._lock:
+            plates = self._groups.get((car_type_id, branch_id), ())
+            return sorted(plate for plate in plates if self._schedules[plate].is_free(start, end))
+
+
+availability = AvailabilityIndex()
+
+
+######################################################################
+# Keep the index current from ORM writes
+######################################################################
+@event.listens_for(Session, "after_flush")
+def _collect_reservation_changes(session, flush_context):
+    changes = session.info.setdefault("availability_changes", [])
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Reservation):
+            changes.append((obj.Id, obj.CarPlateNumber, obj.PickUpTime, obj.DropOffTime))
+    for obj in session.deleted:
+        if isinstance(obj, Reservation):
+            changes.append((obj.Id, None, None, None))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_reservation_changes(session):
+    for reservation_id, plate, start, end in session.info.pop("availability_changes", []):
+        if plate is None:
+            availability.forget(reservation_id)
+        else:
+            availability.track(reservation_id, plate, start, end)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_reservation_changes(session):
+    session.info.pop("availability_changes", None)
@@ -1,7 +1,10 @@
 """
 Flask CLI Command Extensions
 """
+import os
+import click
 from flask import current_app as app  # Import Flask application
+from service.model_registry import ModelRegistry, COMPILED_SUFFIX
 from service.models import db, Customer, Company, CarType, BranchLocation, Reservation, Account
 from datetime import datetime
 
@@ -20,3 +23,242 @@ def db_create():
     db.drop_all()
     db.create_all()
     db.session.commit()
+
+
+######################################################################
+# Command to bring the schema up to date without touching data
+# Usage:
+#   flask db-upgrade
+# Run it on deploy when workers start with DB_CREATE_ON_STARTUP=false
+######################################################################
+@app.cli.command("db-upgrade")
+def db_upgrade():
+    """
+    Creates the tables and indexes declared on the models that the
+    database is missing. Existing tables are left as they are.
+    """
+    started = datetime.now()
+    db.create_all()
+    create_missing_indexes()
+    click.echo(f"Schema is up to date ({(datetime.now() - started).total_seconds():.1f}s)")
+
+
+######################################################################
+# Command to fill the database with synthetic data
+# Usage:
+#   flask db-seed [--reservations 100000] [--seed 42] [--reset]
+# Customers, cars and branches scale with --reservations unless given
+######################################################################
+@app.cli.command("db-seed")
+@click.option("--reservations", default=100000, show_default=True,
+              help="Number of reservations to generate.")
+@click.option("--customers", type=int, default=None,
+              help="Number of customers (and accounts); default reservations / 20.")
+@click.option("--cars", type=int, default=None,
+              help="Number of cars; default reservations / 150.")
+@click.option("--branches", type=int, default=None,
+              help="Number of branch locations; default cars / 40.")
+@click.option("--seed", default=42, show_default=True, help="Random seed.")
+@click.option("--batch-size", default=10000, show_default=True,
+              help="Rows per executemany batch (COPY is used on Postgres).")
+@click.option("--reset", is_flag=True, help="Drop and recreate all tables first.")
+def db_seed(reservations, customers, cars, branches, seed, batch_size, reset):
+    """
+    Generates referentially consistent synthetic data and bulk-loads it.
+    The same options always produce the same rows.
+    """
+    # pylint: disable=import-outside-toplevel
+    from service.common.synthetic_data import SeedScale, bulk_load, generate
+    from service.summaries import rebuild
+
+    if reset:
+        db.drop_all()
+        db.create_all()
+    elif any(db.session.query(model).first() for model in (Customer, CarType, Reservation)):
+        raise click.ClickException("Database already has data; use --reset to replace it")
+
+    scale = SeedScale(reservations, customers=customers, cars=cars, branches=branches, seed=seed)
+    reservation_indexes = list(Reservation.__table__.indexes)
+    with db.engine.begin() as connection:
+        # Building the indexes once after the load is cheaper than
+        # maintaining them row by row
+        for index in reservation_indexes:
+            index.drop(connection, checkfirst=True)
+        for model, columns, rows in generate(scale):
+            started = datetime.now()
+            count = bulk_load(connection, model, columns, rows, batch_size=batch_size)
+            click.echo(f"{model.__tablename__}: {count} rows in "
+                       f"{(datetime.now() - started).total_seconds():.1f}s")
+        started = datetime.now()
+        for index in reservation_indexes:
+            index.create(connection)
+        click.echo(f"Indexes rebuilt in {(datetime.now() - started).total_seconds():.1f}s")
+        started = datetime.now()
+        rebuild(connection, batch_size=batch_size)
+        click.echo(f"Summaries rebuilt in {(datetime.now() - started).total_seconds():.1f}s")
+
+
+######################################################################
+# Command to recompute the reporting summary tables
+# Usage:
+#   flask summaries-rebuild [--batch-size 10000]
+# The tables are kept current as reservations change; this repairs them
+# after writes that bypass the application (SQL consoles, restores)
+######################################################################
+@app.cli.command("summaries-rebuild")
+@click.option("--batch-size", default=10000, show_default=True,
+              help="Reservations fetched per batch.")
+def summaries_rebuild(batch_size):
+    """Recomputes BRANCH_DAILY_REVENUE and CAR_TYPE_MONTHLY_USAGE from all reservations."""
+    # pylint: disable=import-outside-toplevel
+    from service.summaries import rebuild
+
+    started = datetime.now()
+    with db.engine.begin() as connection:
+        branch_days, type_months = rebuild(connection, batch_size=batch_size)
+    click.echo(f"{branch_days} branch days and {type_months} car type months in "
+               f"{(datetime.now() - started).total_seconds():.1f}s")
+
+
+######################################################################
+# Command to move completed reservations to the archive table
+# Usage:
+#   flask archive-reservations [--horizon-days 365] [--batch-size 1000]
+#       [--max-batches N] [--pause 0.1]
+# Safe to run while the service is up, e.g. nightly from cron
+######################################################################
+@app.cli.command("archive-reservations")
+@click.option("--horizon-days", type=float, default=None,
+              help="Archive reservations that dropped off more than this many days ago "
+                   "(default ARCHIVE_HORIZON_DAYS).")
+@click.option("--batch-size", type=int, default=None,
+              help="Reservations moved per transaction (default ARCHIVE_BATCH_SIZE).")
+@click.option("--max-batches", type=int, default=None, help="Stop after this many batches.")
+@click.option("--pause", default=0.1, show_default=True,
+              help="Seconds to wait between batches, leaving room for other writers.")
+def archive_reservations(horizon_days, batch_size, max_batches, pause):
+    """Moves reservations past the archive horizon to RESERVATION_ARCHIVE."""
+    # pylint: disable=import-outside-toplevel
+    from service import archive
+
+    horizon_days = app.config["ARCHIVE_HORIZON_DAYS"] if horizon_days is None else horizon_days
+    batch_size = batch_size or app.config["ARCHIVE_BATCH_SIZE"]
+    started = datetime.now()
+    moved = archive.archive_reservations(
+        horizon_days, batch_size, max_batches=max_batches, pause=pause,
+        progress=lambda moved: click.echo(f"{moved} reservations archived"))
+    current, archived = archive.table_sizes()
+    click.echo(f"Moved {moved} reservations in {(datetime.now() - started).total_seconds():.1f}s; "
+               f"{current} current, {archived} archived")
+
+
+######################################################################
+# Command to add indexes declared on the models to an existing database
+# Usage:
+#   flask db-indexes
+######################################################################
+@app.cli.command("db-indexes")
+def db_indexes():
+    """
+    Creates any index declared on the models that the database is missing.
+    db-create builds them with the tables; this upgrades existing tables.
+    """
+    create_missing_indexes()
+    click.echo("Indexes are up to date")
+
+
+def create_missing_indexes():
+    """Create the indexes declared on the models that the database lacks."""
+    # create_all() skips indexes on tables that already exist
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+
+######################################################################
+# Command to train the rental price model
+# Usage:
+#   flask train-model [--chunksize 50000] [--output path/to/model.pkl]
+#   flask train-model --incremental [--verify]
+# Without --output the model is published as a new registry version
+######################################################################
+@app.cli.command("train-model")
+@click.option("--chunksize", default=50000, show_default=True,
+              help="Rows fetched from the database per chunk.")
+@click.option("--output", default=None,
+              help="Write the model to this file instead of publishing it to the registry.")
+@click.option("--incremental", is_flag=True,
+              help="Only fold in reservations created since the last training run.")
+@click.option("--verify", is_flag=True,
+              help="After an incremental run, compare against a full retrain.")
+def train_model(chunksize, output, incremental, verify):
+    """Trains the rental price model from the reservation history."""
+    # pylint: disable=import-outside-toplevel
+    import joblib
+    from service.ml_model import RentalPriceEstimator, training_chunks
+
+    registry = ModelRegistry.from_config(app.config)
+
+    def save(estimator):
+        if output:
+            joblib.dump(estimator, output)
+            estimator.export(os.path.splitext(output)[0] + COMPILED_SUFFIX)
+            return output
+        return f"registry version {registry.publish(estimator)}"
+
+    if not incremental:
+        estimator = RentalPriceEstimator()
+        with db.engine.connect() as connection:
+            rows = estimator.fit_chunks(training_chunks(connection, chunksize=chunksize))
+        if not rows:
+            raise click.ClickException("No reservations to train on")
+        click.echo(f"Trained on {rows} reservations, saved as {save(estimator)}")
+        return
+
+    estimator = registry.load_estimator(registry.current_version())
+    if estimator.stats is None:
+        raise click.ClickException("Current model has no training statistics; run a full retrain first")
+    since_id = estimator.high_water_mark
+    with db.engine.connect() as connection:
+        rows = estimator.fit_chunks(training_chunks(connection, chunksize=chunksize, since_id=since_id),
+                                    incremental=True)
+    if not rows:
+        click.echo(f"No reservations after Id {since_id}, model is up to date")
+        return
+    click.echo(f"Folded in {rows} new reservations (up to Id {estimator.high_water_mark}), "
+               f"saved as {save(estimator)}")
+
+    if verify:
+        full = RentalPriceEstimator()
+        with db.engine.connect() as connection:
+            full.fit_chunks(training_chunks(connection, chunksize=chunksize))
+        gap = estimator.max_prediction_gap(full)
+        click.echo(f"Largest price difference against a full retrain: {gap:.6f}")
+        if gap > app.config["MODEL_VERIFY_TOLERANCE"]:
+            raise click.ClickException("Incremental model drifted from a full retrain")
+
+
+######################################################################
+# Command to check the SQL statements each endpoint runs
+# Usage:
+#   flask query-budget [--report]
+# Exits non-zero if an endpoint runs more statements than its budget
+######################################################################
+@app.cli.command("query-budget")
+@click.option("--report", is_flag=True,
+              help="Print statement counts and timings for every endpoint.")
+def query_budget(report):
+    """Checks every endpoint against its declared SQL statement budget."""
+    # pylint: disable=import-outside-toplevel
+    from service.common.query_budget import check_budgets
+
+    results, problems = check_budgets(app._get_current_object())  # pylint: disable=protected-access
+    if report:
+        click.echo(f"{'endpoint':<52} {'status':>6} {'budget':>6} {'sql':>4} {'sql ms':>8} {'total ms':>9}")
+        for method, rule, budget, status, statements, elapsed in results:
+            sql_ms = sum(seconds for _, seconds in statements) * 1000
+            click.echo(f"{method + ' ' + rule:<52} {status:>6} {str(budget):>6} "
+                       f"{len(statements):>4} {sql_ms:>8.2f} {elapsed * 1000:>9.2f}")
+    if problems:
+        raise click.ClickException("Query budget check failed:\n" + "\n".join(problems))
+    click.echo(f"{len(results)} endpoints within their query budgets")
@@ -0,0 +1,206 @@
+"""
+Database engine profiles and connection pool metrics
+
+engine_options() builds SQLALCHEMY_ENGINE_OPTIONS from the DB_* and
+SQLITE_* settings in config.py. With DB_ENGINE_PROFILE=tuned (the default):
+
+- Postgres gets a sized queue pool (pool_size, max_overflow, pool_timeout),
+  connections recycled after DB_POOL_RECYCLE seconds and pinged before use
+  so a restarted server or a dropped idle connection costs a reconnect
+  instead of a failed request, and a server-side statement_timeout so a
+  runaway query cannot hold a connection forever.
+- SQLite files get the same pool sizing plus, on every new connection, the
+  journal_mode, synchronous and busy_timeout pragmas. WAL lets readers run
+  while a write is in progress, synchronous=NORMAL skips an fsync per
+  commit (safe in WAL mode), and busy_timeout makes writers wait for the
+  lock instead of failing with "database is locked".
+
+DB_ENGINE_PROFILE=default leaves SQLAlchemy's own defaults, as a baseline.
+Either way the pool is a TimedQueuePool, which records how long each
+checkout waited for a connection; engine_pools adds those waits and the
+pools' saturation to /metrics.
+"""
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+ENGINE_PROFILES = ("tuned", "default")
+# Upper bounds, in seconds, of the pool checkout wait histogram buckets
+WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+
+class TimedQueuePool(QueuePool):
+    """A QueuePool that records how long checkouts wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.wait_buckets = [0] * len(WAIT_BUCKETS)
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._stats_lock:
+                for i, bound in enumerate(WAIT_BUCKETS):
+                    if elapsed <= bound:
+                        self.wait_buckets[i] += 1
+                self.waits += 1
+                self.wait_seconds += elapsed
+
+    def stats(self):
+        """(buckets, waits, wait seconds, timeouts, checked out, capacity)"""
+        with self._stats_lock:
+            return (list(self.wait_buckets), self.waits, self.wait_seconds, self.timeouts,
+                    self.checkedout(), self.size() + max(self._max_overflow, 0))
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool, TimedQueuePool):
+    """TimedQueuePool for engines made by create_async_engine."""
+
+
+def engine_options(config, uri=None):
+    """SQLALCHEMY_ENGINE_OPTIONS for the database at `uri` (the main one by default)."""
+    profile = config["DB_ENGINE_PROFILE"]
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"DB_ENGINE_PROFILE must be one of {', '.join(ENGINE_PROFILES)}, "
+                         f"not {profile!r}")
+    url = make_url(uri or config["SQLALCHEMY_DATABASE_URI"])
+    backend = url.get_backend_name()
+    if backend == "sqlite" and url.database in (None, "", ":memory:"):
+        # Flask-SQLAlchemy gives in-memory databases a single static connection
+        return {}
+
+    options = {"poolclass": TimedQueuePool}
+    if profile == "default":
+        return options
+    options.update(
+        pool_size=config["DB_POOL_SIZE"],
+        max_overflow=config["DB_MAX_OVERFLOW"],
+        pool_timeout=config["DB_POOL_TIMEOUT"],
+        pool_recycle=config["DB_POOL_RECYCLE"],
+        pool_pre_ping=config["DB_POOL_PRE_PING"],
+    )
+    if backend == "postgresql" and config["DB_STATEMENT_TIMEOUT_MS"] > 0:
+        options["connect_args"] = {
+            "options": f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}",
+        }
+    return options
+
+
+def async_database_uri(uri):
+    """The asyncio driver URI for a database URI: aiosqlite or psycopg's async API."""
+    url = make_url(uri)
+    backend = url.get_backend_name()
+    if backend == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    if backend == "postgresql" and url.get_driver_name() in ("psycopg", "psycopg_async", "psycopg2"):
+        return url.set(drivername="postgresql+psycopg_async")
+    raise ValueError(f"No asyncio driver configured for {url.drivername}")
+
+
+def async_engine_options(config, uri=None):
+    """engine_options() for create_async_engine."""
+    options = engine_options(config, uri)
+    if options.get("poolclass") is TimedQueuePool:
+        options["poolclass"] = TimedAsyncQueuePool
+    return options
+
+
+def sqlite_pragmas(config):
+    """PRAGMA statements run on every new SQLite connection of the tuned profile."""
+    if config["DB_ENGINE_PROFILE"] != "tuned":
+        return []
+    return [
+        f"PRAGMA journal_mode={config['SQLITE_JOURNAL_MODE']}",
+        f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA busy_timeout={config['SQLITE_BUSY_TIMEOUT_MS']}",
+    ]
+
+
+class EnginePools:
+    """The pools of the app's engines, by bind name, for /metrics."""
+
+    def __init__(self):
+        self._engines = {}
+
+    def init_app(self, app, engines):
+        """
+        Install the SQLite pragmas on, and track the pools of, `engines`
+        ({bind key: engine}, None for the main database). Must run before
+        the engines open their first connection.
+        """
+        self._engines = {}
+        for key, engine in engines.items():
+            self.track(key or "primary", engine, app.config)
+
+    def track(self, name, engine, config):
+        """Install the SQLite pragmas on, and report the pool of, one engine."""
+        pragmas = sqlite_pragmas(config)
+        self._engines[name] = engine
+        if engine.dialect.name == "sqlite" and pragmas:
+            event.listen(engine, "connect", _run_pragmas(pragmas))
+
+    def render(self):
+        """Pool checkout waits and saturation in the Prometheus text format."""
+        pools = {name: engine.pool.stats() for name, engine in sorted(self._engines.items())
+                 if isinstance(engine.pool, TimedQueuePool)}
+        lines = [
+            "# HELP db_pool_checkout_wait_seconds Time checkouts waited for a pooled connection.",
+            "# TYPE db_pool_checkout_wait_seconds histogram",
+        ]
+        for name, (buckets, waits, wait_seconds, _, _, _) in pools.items():
+            for bound, observed in zip(WAIT_BUCKETS, buckets):
+                lines.append(f'db_pool_checkout_wait_seconds_bucket{{pool="{name}",le="{bound}"}} {observed}')
+            lines.append(f'db_pool_checkout_wait_seconds_bucket{{pool="{name}",le="+Inf"}} {waits}')
+            lines.append(f'db_pool_checkout_wait_seconds_sum{{pool="{name}"}} {wait_seconds}')
+            lines.append(f'db_pool_checkout_wait_seconds_count{{pool="{name}"}} {waits}')
+        lines += [
+            "# HELP db_pool_checkout_timeouts_total Checkouts that gave up after pool_timeout.",
+            "# TYPE db_pool_checkout_timeouts_total counter",
+        ]
+        lines += [f'db_pool_checkout_timeouts_total{{pool="{name}"}} {stats[3]}'
+                  for name, stats in pools.items()]
+        lines += [
+            "# HELP db_pool_connections_in_use Connections checked out of the pool.",
+            "# TYPE db_pool_connections_in_use gauge",
+        ]
+        lines += [f'db_pool_connections_in_use{{pool="{name}"}} {stats[4]}'
+                  for name, stats in pools.items()]
+        lines += [
+            "# HELP db_pool_capacity Most connections the pool opens (pool_size + max_overflow).",
+            "# TYPE db_pool_capacity gauge",
+        ]
+        lines += [f'db_pool_capacity{{pool="{name}"}} {stats[5]}' for name, stats in pools.items()]
+        lines += [
+            "# HELP db_pool_saturation Share of the pool's capacity checked out.",
+            "# TYPE db_pool_saturation gauge",
+        ]
+        lines += [f'db_pool_saturation{{pool="{name}"}} {stats[4] / stats[5] if stats[5] else 0}'
+                  for name, stats in pools.items()]
+        return lines
+
+
+def _run_pragmas(pragmas):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+    return set_pragmas
+
+
+engine_pools = EnginePools()
@@ -0,0 +1,188 @@
+"""
+Per-request performance metrics
+
+Records, for every route (the URL rule, not the raw path, so label values
+stay bounded): a latency histogram, response counts by status, requests in
+flight, and the number and total time of SQL statements the request ran.
+SQL statements are timed with engine cursor events and charged to the
+request whose context they run in; statements run outside a request (the
+availability refresher, CLI commands) are not counted.
+
+render() formats everything, plus the lines of any collectors added by
+other modules (the connection pools), in the Prometheus text exposition
+format for the /metrics endpoint. Requests slower than SLOW_REQUEST_MS are logged
+with their slowest SQL statements. Metrics are per worker process.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds, in seconds, of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Statements listed in a slow request log line
+SLOW_LOG_STATEMENTS = 5
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class RouteStats:
+    """Latency histogram and SQL totals of one (method, route)."""
+    __slots__ = ("buckets", "count", "seconds", "sql_statements", "sql_seconds")
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.seconds = 0.0
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+
+
+class Metrics:
+    """Request and SQL metrics collected by Flask and SQLAlchemy hooks."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = defaultdict(RouteStats)   # (method, route) -> RouteStats
+        self._statuses = defaultdict(int)        # (method, route, status) -> count
+        self.in_flight = 0
+        self.slow_request_seconds = None
+        self._collectors = []
+
+    def add_collector(self, collector):
+        """Append the lines returned by `collector()` to every render()."""
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def init_app(self, app):
+        """Install the request hooks on an app."""
+        slow_ms = app.config["SLOW_REQUEST_MS"]
+        self.slow_request_seconds = slow_ms / 1000 if slow_ms > 0 else None
+        app.before_request(self._start_request)
+        app.after_request(self._record_status)
+        app.teardown_request(self._finish_request)
+
+    def _start_request(self):
+        g.metrics_start = time.perf_counter()
+        g.metrics_sql = []
+        with self._lock:
+            self.in_flight += 1
+
+    @staticmethod
+    def _record_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    def _finish_request(self, error=None):
+        start = g.pop("metrics_start", None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        statements = g.pop("metrics_sql", [])
+        status = g.pop("metrics_status", 500)
+        route = request.url_rule.rule if request.url_rule else UNMATCHED_ROUTE
+        key = (request.method, route)
+        sql_seconds = sum(seconds for _, seconds in statements)
+
+        with self._lock:
+            self.in_flight -= 1
+            stats = self._routes[key]
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if elapsed <= bound:
+                    stats.buckets[i] += 1
+            stats.count += 1
+            stats.seconds += elapsed
+            stats.sql_statements += len(statements)
+            stats.sql_seconds += sql_seconds
+            self._statuses[key + (status,)] += 1
+
+        if self.slow_request_seconds and elapsed >= self.slow_request_seconds:
+            slowest = sorted(statements, key=lambda statement: statement[1], reverse=True)
+            logger.warning(
+                "Slow request %s %s: %.1f ms, status %s, %d SQL statements in %.1f ms%s",
+                request.method, request.path, elapsed * 1000, status, len(statements),
+                sql_seconds * 1000,
+                "".join(f"\n  {seconds * 1000:8.1f} ms  {sql}"
+                        for sql, seconds in slowest[:SLOW_LOG_STATEMENTS]),
+            )
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            routes = {key: (list(stats.buckets), stats.count, stats.seconds,
+                            stats.sql_statements, stats.sql_seconds)
+                      for key, stats in self._routes.items()}
+            statuses = dict(self._statuses)
+            in_flight = self.in_flight
+
+        lines = [
+            "# HELP http_requests_in_flight Requests being handled.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {in_flight}",
+            "# HELP http_request_duration_seconds Request latency by route.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), (buckets, count, seconds, _, _) in sorted(routes.items()):
+            labels = _labels(method=method, route=route)
+            for bound, observed in zip(LATENCY_BUCKETS, buckets):
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {observed}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {seconds}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {count}")
+
+        lines += [
+            "# HELP http_responses_total Responses by route and status.",
+            "# TYPE http_responses_total counter",
+        ]
+        for (method, route, status), count in sorted(statuses.items()):
+            lines.append(f"http_responses_total{{{_labels(method=method, route=route, status=status)}}} {count}")
+
+        lines += [
+            "# HELP http_request_sql_statements_total SQL statements run by requests.",
+            "# TYPE http_request_sql_statements_total counter",
+        ]
+        for (method, route), (_, _, _, sql_statements, _) in sorted(routes.items()):
+            lines.append(f"http_request_sql_statements_total{{{_labels(method=method, route=route)}}} {sql_statements}")
+
+        lines += [
+            "# HELP http_request_sql_seconds_total Time spent in SQL statements by requests.",
+            "# TYPE http_request_sql_seconds_total counter",
+        ]
+        for (method, route), (_, _, _, _, sql_seconds) in sorted(routes.items()):
+            lines.append(f"http_request_sql_seconds_total{{{_labels(method=method, route=route)}}} {sql_seconds}")
+        for collector in self._collectors:
+            lines += collector()
+        return "\n".join(lines) + "\n"
+
+
+def _labels(**labels):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = Metrics()
+
+
+######################################################################
+# Time SQL statements on every engine
+######################################################################
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    conn.info["metrics_statement_start"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _finish_statement(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info.pop("metrics_statement_start")
+    if has_request_context():
+        statements = g.get("metrics_sql")
+        if statements is not None:
+            statements.append((" ".join(statement.split())[:200], elapsed))
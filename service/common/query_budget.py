@@ -0,0 +1,224 @@
+"""
+SQL query budgets per endpoint
+
+Every view in routes.py declares, with @query_budget(n), the most SQL
+statements one request to it may run. `flask query-budget` calls each
+endpoint once through the test client against the configured database,
+counts the statements it runs with engine cursor events, and fails if an
+endpoint goes over its budget or has none declared. This catches N+1
+access patterns (a query per row, loading rows only to write them back)
+before they reach production. --report prints the statement counts and
+timings of every endpoint.
+
+Writes are checked on reservations the harness creates and deletes
+itself, so running it leaves the data as it found it.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import event, or_
+from sqlalchemy.engine import Engine
+
+from service.models import db, BranchLocation, Car, CarType, Reservation, OUT_OF_SERVICE
+
+# Endpoints that are not ours to budget
+UNBUDGETED_ENDPOINTS = {"static"}
+
+
+def query_budget(statements):
+    """Declare the most SQL statements one request to a view may run."""
+    def decorator(view):
+        view.query_budget = statements
+        return view
+    return decorator
+
+
+class StatementRecorder:
+    """Statements run by the current thread while recording."""
+
+    def __init__(self):
+        self.statements = []
+        self._thread = None
+
+    def __enter__(self):
+        self._thread = threading.get_ident()
+        self.statements = []
+        event.listen(Engine, "before_cursor_execute", self._before)
+        event.listen(Engine, "after_cursor_execute", self._after)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(Engine, "before_cursor_execute", self._before)
+        event.remove(Engine, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_budget_start"] = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info.pop("query_budget_start")
+        # The availability refresher and model watcher run in other threads
+        if threading.get_ident() == self._thread:
+            self.statements.append((" ".join(statement.split()), elapsed))
+
+
+def budget_cases():
+    """
+    (method, rule, path, request kwargs) for one representative request per
+    endpoint, built from rows in the database. Cases run in order: the
+    reservations created first are the ones updated, extended and deleted.
+    Paths are formatted with, and callable kwargs are called with, a dict of
+    the Ids created so far ("created", "booked" and "bulk_created").
+    """
+    reservation = (Reservation.query.filter(Reservation.PickUpTime.is_not(None),
+                                            Reservation.AccountId.is_not(None))
+                   .order_by(Reservation.Id).first())
+    car_type = CarType.query.order_by(CarType.TypeId).first()
+    location = BranchLocation.query.order_by(BranchLocation.Id).first()
+    # A car the booking endpoint may assign, so the case exercises its full path
+    car = (Car.query.filter(Car.CarTypeId.is_not(None), Car.BranchId.is_not(None),
+                            or_(Car.Status.is_(None), Car.Status.not_in(OUT_OF_SERVICE)))
+           .order_by(Car.LicensePlateNumber).first())
+    if not (reservation and car_type and location and car):
+        raise LookupError("Query budgets need at least one reservation, car type, location and car")
+
+    start = datetime.now().replace(microsecond=0) + timedelta(days=1)
+    new_reservation = {
+        "AccountId": reservation.AccountId, "CarTypeId": car_type.TypeId,
+        "PickUpTime": start.isoformat(), "DropOffTime": (start + timedelta(days=3)).isoformat(),
+        "PickUpLocationId": location.Id, "DropOffLocationId": location.Id,
+    }
+    # Far enough ahead that the car is free
+    booking_start = start + timedelta(days=3650)
+    booking = dict(new_reservation, CarTypeId=car.CarTypeId, PickUpLocationId=car.BranchId,
+                   DropOffLocationId=car.BranchId, PickUpTime=booking_start.isoformat(),
+                   DropOffTime=(booking_start + timedelta(days=3)).isoformat())
+    earlier_drop_off = (start + timedelta(days=2)).isoformat()
+    quote = {
+        "Brand": car_type.Brand, "Model": car_type.Model, "Seats": car_type.Seats or 4,
+        "Location_City": location.City, "Pick_Up_Day": 0, "Pick_Up_Month": 1,
+        "Drop_Off_Day": 3, "Drop_Off_Month": 1, "Credit_Score": 700,
+    }
+    created = "{created}"
+    return [
+        ("GET", "/", "/", {}),
+        ("POST", "/reservations", "/reservations", {"json": new_reservation}),
+        ("POST", "/reservations/book", "/reservations/book", {"json": booking}),
+        ("GET", "/reservations/<int:reservation_id>", f"/reservations/{reservation.Id}", {}),
+        ("PUT", "/reservations/<int:reservation_id>", f"/reservations/{created}",
+         {"json": {"Duration": 4}}),
+        ("PUT", "/reservations/<int:reservation_id>/extend", f"/reservations/{created}/extend", {}),
+        ("POST", "/reservations/extend", "/reservations/extend",
+         lambda state: {"json": {"ids": [state["created"]], "hours": 6}}),
+        ("POST", "/reservations/bulk", "/reservations/bulk",
+         {"json": [new_reservation, new_reservation]}),
+        ("PATCH", "/reservations/bulk", "/reservations/bulk",
+         lambda state: {"json": [{"Id": reservation_id, "DropOffTime": earlier_drop_off}
+                                 for reservation_id in state["bulk_created"]]}),
+        ("GET", "/reservations/search", "/reservations/search",
+         {"query_string": {"account_id": reservation.AccountId, "limit": 50}}),
+        ("GET", "/availability", "/availability",
+         {"query_string": {"car_type_id": car_type.TypeId, "branch_id": location.Id,
+                           "start": start.isoformat(),
+                           "end": (start + timedelta(days=2)).isoformat()}}),
+        ("GET", "/reservations/account/<int:account_id>",
+         f"/reservations/account/{reservation.AccountId}",
+         {"query_string": {"expand": "car_type,locations", "include_archived": "true"}}),
+        ("POST", "/predict-price", "/predict-price", {"json": quote}),
+        ("POST", "/predict-price/batch", "/predict-price/batch", {"json": [quote] * 10}),
+        ("POST", "/admin/model/reload", "/admin/model/reload",
+         {"headers": {"X-Api-Key": current_app.config["API_KEY"] or ""}}),
+        ("GET", "/accounts/<int:account_id>", f"/accounts/{reservation.AccountId}", {}),
+        ("GET", "/car-types", "/car-types", {}),
+        ("GET", "/car-types/<int:type_id>", f"/car-types/{car_type.TypeId}", {}),
+        ("GET", "/locations", "/locations", {}),
+        ("GET", "/locations/<int:location_id>", f"/locations/{location.Id}", {}),
+        ("GET", "/ready", "/ready", {}),
+        ("GET", "/metrics", "/metrics", {}),
+        ("GET", "/reservations/export", "/reservations/export",
+         {"query_string": {"account_id": reservation.AccountId, "format": "csv",
+                           "include_archived": "true"}}),
+        ("GET", "/reports/branches/<int:branch_id>/revenue",
+         f"/reports/branches/{location.Id}/revenue",
+         {"query_string": {"start": start.date().isoformat(),
+                           "end": (start + timedelta(days=30)).date().isoformat()}}),
+        ("GET", "/reports/car-types/utilization", "/reports/car-types/utilization",
+         {"query_string": {"month": start.strftime("%Y-%m")}}),
+        ("GET", "/reports/bookings", "/reports/bookings",
+         {"query_string": {"start": (start - timedelta(days=365)).strftime("%Y-%m"),
+                           "end": start.strftime("%Y-%m")}}),
+        ("DELETE", "/reservations/<int:reservation_id>", f"/reservations/{created}", {}),
+    ]
+
+
+def check_budgets(app):
+    """
+    Run every budget case and return (results, problems). Each result is
+    (method, rule, budget, status, statements, total seconds).
+    """
+    # pylint: disable=import-outside-toplevel
+    from service.availability import availability
+    from service.common.reference_cache import reference_cache
+    from service.routes import live_model
+
+    views = {}
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint in UNBUDGETED_ENDPOINTS:
+            continue
+        for method in rule.methods - {"HEAD", "OPTIONS"}:
+            views[(method, rule.rule)] = app.view_functions[rule.endpoint]
+
+    with app.app_context():
+        cases = budget_cases()
+        # Measure steady-state requests: a lazy or background STARTUP_WARMUP
+        # would otherwise bill its loading to the first request that needs it
+        availability.ensure_loaded()
+        live_model.ensure_loaded()
+        db.session.remove()
+    # Measure database work, not the reference cache
+    reference_cache.clear()
+
+    results, problems = [], []
+    state = {"created": None, "booked": None, "bulk_created": []}
+    client = app.test_client()
+    for method, rule, path, kwargs in cases:
+        view = views.pop((method, rule), None)
+        if view is None:
+            problems.append(f"{method} {rule}: no such endpoint")
+            continue
+        budget = getattr(view, "query_budget", None)
+        # A fresh app context per request, so no request is served from the
+        # identity map of the session a previous one left behind
+        with app.app_context(), StatementRecorder() as recorder:
+            started = time.perf_counter()
+            response = client.open(path.format(**state), method=method,
+                                   **(kwargs(state) if callable(kwargs) else kwargs))
+            # Streamed responses run their queries as the body is read
+            response.get_data()
+            elapsed = time.perf_counter() - started
+        if method == "POST" and response.status_code == 201:
+            if rule == "/reservations":
+                state["created"] = response.get_json()["Id"]
+            elif rule == "/reservations/book":
+                state["booked"] = response.get_json()["Id"]
+            elif rule == "/reservations/bulk":
+                state["bulk_created"] = [row["Id"] for row in response.get_json()["results"]]
+        results.append((method, rule, budget, response.status_code, recorder.statements, elapsed))
+        if response.status_code >= 400:
+            problems.append(f"{method} {rule}: status {response.status_code}")
+        if budget is None:
+            problems.append(f"{method} {rule}: no query budget declared")
+        elif len(recorder.statements) > budget:
+            problems.append(
+                f"{method} {rule}: {len(recorder.statements)} statements, budget {budget}"
+                + "".join(f"\n    {statement[:160]}" for statement, _ in recorder.statements)
+            )
+    for method, rule in sorted(views):
+        problems.append(f"{method} {rule}: no budget case")
+
+    with app.app_context():
+        booked = [state["booked"]] if state["booked"] else []
+        for reservation_id in state["bulk_created"] + booked:
+            Reservation.delete_reservation(reservation_id)
+    return results, problems
@@ -0,0 +1,107 @@
+"""
+Cache for reference-data responses
+
+Car types and branch locations change rarely but are read on every page
+render. Views decorated with @reference_data keep their encoded JSON body,
+status and ETag in process memory, keyed by request path, so a cached read
+touches neither the database nor the JSON encoder. Clients that send a
+matching If-None-Match get 304 Not Modified.
+
+Entries are dropped when a session commits a write to one of the tables
+they were built from, and after REFERENCE_CACHE_TTL seconds in any case,
+which bounds staleness for writes made by other worker processes.
+"""
+import hashlib
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, make_response, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+class ReferenceCache:
+    """Encoded responses keyed by path and tagged with their source tables."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # path -> (tables, expires, status, body, etag)
+
+    def get(self, path):
+        entry = self._entries.get(path)
+        if entry and entry[1] > time.monotonic():
+            return entry
+        return None
+
+    def put(self, path, tables, ttl, status, body):
+        etag = hashlib.sha1(body).hexdigest()
+        entry = (tables, time.monotonic() + ttl, status, body, etag)
+        with self._lock:
+            self._entries[path] = entry
+        return entry
+
+    def invalidate(self, *tables):
+        """Drop every entry built from any of the given tables."""
+        tables = set(tables)
+        with self._lock:
+            self._entries = {path: entry for path, entry in self._entries.items()
+                             if not tables & entry[0]}
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+
+
+reference_cache = ReferenceCache()
+
+
+def reference_data(*tables):
+    """Serve a GET view from the reference cache, with ETag and Cache-Control."""
+    tables = frozenset(tables)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            entry = reference_cache.get(request.path)
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                entry = reference_cache.put(request.path, tables,
+                                            current_app.config["REFERENCE_CACHE_TTL"],
+                                            response.status_code, response.get_data())
+            _, _, status, body, etag = entry
+
+            if request.if_none_match.contains(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.response_class(body, status=status,
+                                                      mimetype="application/json")
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = (
+                f"public, max-age={current_app.config['REFERENCE_CACHE_MAX_AGE']}"
+            )
+            return response
+        return wrapper
+    return decorator
+
+
+######################################################################
+# Invalidate on committed ORM writes to reference tables
+######################################################################
+@event.listens_for(Session, "after_flush")
+def _collect_written_tables(session, flush_context):
+    written = session.info.setdefault("reference_tables_written", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        written.add(getattr(obj, "__tablename__", None))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_written_tables(session):
+    written = session.info.pop("reference_tables_written", None)
+    if written:
+        reference_cache.invalidate(*written)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_written_tables(session):
+    session.info.pop("reference_tables_written", None)
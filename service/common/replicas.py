@@ -0,0 +1,163 @@
+"""
+Read-replica routing
+
+Each URI in DATABASE_REPLICA_URIS becomes a Flask-SQLAlchemy bind named
+replica_0, replica_1, ... with the same engine profile as the primary. Views
+decorated with @replicas.read_only run their queries on a replica, picked
+round-robin among the healthy ones; everything else, and every flush, uses
+the primary.
+
+Read-your-writes: a successful write request (any method but GET, HEAD and
+OPTIONS) stamps the client's Flask session cookie, and for
+REPLICA_STICKY_SECONDS afterwards that client's reads go to the primary, so
+it sees its own changes whatever the replication lag.
+
+Fallback: a replica whose query fails with a connection-level error is
+marked down and the view is run again on the primary (read-only views are
+safe to retry). A daemon thread probes every replica with SELECT 1 every
+REPLICA_CHECK_INTERVAL seconds and brings recovered ones back.
+"""
+import functools
+import itertools
+import logging
+import threading
+import time
+
+from flask import g, has_app_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import text
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+from service.common.engine import engine_options
+
+logger = logging.getLogger(__name__)
+
+REPLICA_PREFIX = "replica_"
+# Flask session key holding the time until which the client reads the primary
+STICKY_KEY = "primary_until"
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def replica_binds(config):
+    """SQLALCHEMY_BINDS for the configured read replicas."""
+    return {f"{REPLICA_PREFIX}{i}": {"url": uri, **engine_options(config, uri)}
+            for i, uri in enumerate(config["DATABASE_REPLICA_URIS"])}
+
+
+class RoutingSession(Session):
+    """Sends the statements of a read-only view to the replica it was given."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_app_context():
+            replica = g.get("read_replica")
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter:
+    """Picks a healthy replica for read-only views and tracks replica health."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._engines = {}       # bind key -> engine
+        self._down_until = {}    # bind key -> time.monotonic() it may be retried
+        self._round_robin = itertools.count()
+        self.sticky_seconds = 0.0
+        self.retry_seconds = 30.0
+        self._prober = None
+
+    def init_app(self, app, engines):
+        """Route to the replica binds in `engines` ({bind key: engine})."""
+        self._engines = dict(sorted((key, engine) for key, engine in engines.items()
+                                    if key and key.startswith(REPLICA_PREFIX)))
+        self._down_until = {}
+        self.sticky_seconds = app.config["REPLICA_STICKY_SECONDS"]
+        self.retry_seconds = app.config["REPLICA_CHECK_INTERVAL"] or 30.0
+        if self._engines:
+            app.after_request(self._stick_after_write)
+            self.start_prober(app.config["REPLICA_CHECK_INTERVAL"])
+
+    def healthy(self):
+        """Bind keys of the replicas currently in use."""
+        now = time.monotonic()
+        with self._lock:
+            return [key for key in self._engines if self._down_until.get(key, 0) <= now]
+
+    def choose(self):
+        """The engine to read from for this request, or None for the primary."""
+        if session.get(STICKY_KEY, 0) > time.time():
+            return None
+        keys = self.healthy()
+        if not keys:
+            return None
+        return self._engines[keys[next(self._round_robin) % len(keys)]]
+
+    def mark_down(self, engine, error):
+        for key, replica in self._engines.items():
+            if replica is engine:
+                with self._lock:
+                    self._down_until[key] = time.monotonic() + self.retry_seconds
+                logger.warning("Read replica %s unavailable, using the primary: %s", key, error)
+
+    def read_only(self, view):
+        """Run a view that only reads on a replica, falling back to the primary."""
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            replica = self.choose() if self._engines else None
+            if replica is None:
+                return view(*args, **kwargs)
+            # pylint: disable=import-outside-toplevel
+            from service.models import db
+
+            g.read_replica = replica
+            try:
+                return view(*args, **kwargs)
+            except (OperationalError, InterfaceError) as error:
+                db.session.rollback()
+                self.mark_down(replica, getattr(error, "orig", error))
+                g.pop("read_replica", None)
+                return view(*args, **kwargs)
+            finally:
+                g.pop("read_replica", None)
+                # Later queries in this app context go to the primary again
+                db.session.close()
+        return wrapper
+
+    def _stick_after_write(self, response):
+        if request.method not in READ_METHODS and response.status_code < 400:
+            session[STICKY_KEY] = time.time() + self.sticky_seconds
+        return response
+
+    def probe(self):
+        """Check every replica with SELECT 1, marking it up or down."""
+        for key, engine in self._engines.items():
+            try:
+                with engine.connect() as connection:
+                    connection.execute(text("SELECT 1"))
+            except Exception as error:  # pylint: disable=broad-except
+                with self._lock:
+                    was_up = self._down_until.get(key, 0) <= time.monotonic()
+                    self._down_until[key] = time.monotonic() + self.retry_seconds
+                if was_up:
+                    logger.warning("Read replica %s failed its health check: %s", key, error)
+            else:
+                with self._lock:
+                    if self._down_until.pop(key, None) is not None:
+                        logger.info("Read replica %s is back", key)
+
+    def start_prober(self, interval):
+        """Probe the replicas every `interval` seconds in a daemon thread."""
+        if self._prober or interval <= 0:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                self.probe()
+
+        self._prober = threading.Thread(target=run, name="replica-probe", daemon=True)
+        self._prober.start()
+
+
+replicas = ReplicaRouter()
@@ -0,0 +1,86 @@
+"""
+Portable SQL expressions
+
+Date arithmetic differs between the databases the service runs on (SQLite
+locally, Postgres in production), so these constructs compile to the right
+SQL for each dialect.
+"""
+from sqlalchemy import DateTime, Integer, cast, func
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+
+
+class day_of_week(FunctionElement):  # pylint: disable=invalid-name
+    """Day of the week of a timestamp, 0 = Monday (same as pandas dayofweek)."""
+    type = Integer()
+    inherit_cache = True
+
+
+class month_of(FunctionElement):  # pylint: disable=invalid-name
+    """Month of a timestamp, 1-12."""
+    type = Integer()
+    inherit_cache = True
+
+
+class days_between(FunctionElement):  # pylint: disable=invalid-name
+    """Whole days from the first timestamp to the second."""
+    type = Integer()
+    inherit_cache = True
+
+
+class add_seconds(FunctionElement):  # pylint: disable=invalid-name
+    """A timestamp moved by a whole number of seconds."""
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(day_of_week)
+def _day_of_week_default(element, compiler, **kw):
+    return "(CAST(EXTRACT(ISODOW FROM %s) AS INTEGER) - 1)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(day_of_week, "sqlite")
+def _day_of_week_sqlite(element, compiler, **kw):
+    # strftime('%w') counts from Sunday = 0
+    (timestamp,) = element.clauses
+    expression = (cast(func.strftime("%w", timestamp), Integer) + 6) % 7
+    return compiler.process(expression.self_group(), **kw)
+
+
+@compiles(month_of)
+def _month_of_default(element, compiler, **kw):
+    return "CAST(EXTRACT(MONTH FROM %s) AS INTEGER)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(month_of, "sqlite")
+def _month_of_sqlite(element, compiler, **kw):
+    (timestamp,) = element.clauses
+    return compiler.process(cast(func.strftime("%m", timestamp), Integer), **kw)
+
+
+@compiles(days_between)
+def _days_between_default(element, compiler, **kw):
+    start, end = [compiler.process(clause, **kw) for clause in element.clauses]
+    return "CAST(FLOOR(EXTRACT(EPOCH FROM (%s - %s)) / 86400) AS INTEGER)" % (end, start)
+
+
+@compiles(days_between, "sqlite")
+def _days_between_sqlite(element, compiler, **kw):
+    start, end = [compiler.process(clause, **kw) for clause in element.clauses]
+    return "CAST(julianday(%s) - julianday(%s) AS INTEGER)" % (end, start)
+
+
+@compiles(add_seconds)
+def _add_seconds_default(element, compiler, **kw):
+    timestamp, seconds = [compiler.process(clause, **kw) for clause in element.clauses]
+    return "(%s + %s * INTERVAL '1 second')" % (timestamp, seconds)
+
+
+@compiles(add_seconds, "sqlite")
+def _add_seconds_sqlite(element, compiler, **kw):
+    # Timestamps are stored as 'YYYY-MM-DD HH:MM:SS.ffffff' text; shift the
+    # whole seconds and carry over the original fraction unchanged
+    timestamp, seconds = element.clauses
+    expression = (func.strftime("%Y-%m-%d %H:%M:%S", timestamp, func.printf("%+d seconds", seconds))
+                  .concat(func.substr(timestamp, 20)))
+    return compiler.process(expression, **kw)
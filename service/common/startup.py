@@ -0,0 +1,96 @@
+"""
+Startup phases and warm-up
+
+create_app() runs its steps inside startup.phase(name), which logs how
+long each took and exports it on /metrics as app_startup_phase_seconds, so
+it is visible where a worker's boot time goes.
+
+The slow steps that only some requests need (loading the price model,
+loading the availability index) are warm-ups, run as STARTUP_WARMUP says:
+
+- "eager": during create_app(), so the worker is ready when it starts
+  listening (the default);
+- "background": in a daemon thread, so the worker starts listening right
+  away; /ready answers 503 until every warm-up has finished;
+- "lazy": not at all; the first request that needs one loads it, and the
+  first /ready probe starts loading both in the background, since /ready
+  answers 503 until they are loaded.
+
+Requests that need a component still loading wait for it rather than fail.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+WARMUP_MODES = ("eager", "background", "lazy")
+
+
+class Startup:
+    """Durations of the startup phases and state of the warm-ups."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.phases = {}     # phase -> seconds
+        self.pending = set()  # warm-ups running in the background
+        self.failed = {}     # warm-up -> error
+
+    @contextmanager
+    def phase(self, name):
+        """Time one step of startup."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def record(self, name, seconds):
+        with self._lock:
+            self.phases[name] = seconds
+        logger.info("Startup phase %s took %.3fs", name, seconds)
+
+    def warm_up(self, app, name, load, mode):
+        """Run load() now, in a daemon thread, or not at all, as `mode` says."""
+        if mode not in WARMUP_MODES:
+            raise ValueError(f"STARTUP_WARMUP must be one of {', '.join(WARMUP_MODES)}")
+        if mode == "eager":
+            with self.phase(name):
+                load()
+        elif mode == "background":
+            with self._lock:
+                self.pending.add(name)
+
+            def run():
+                try:
+                    with app.app_context(), self.phase(f"{name}_background"):
+                        load()
+                except Exception as error:  # pylint: disable=broad-except
+                    logger.error("Warm-up %s failed: %s", name, error)
+                    with self._lock:
+                        self.failed[name] = str(error)
+                finally:
+                    with self._lock:
+                        self.pending.discard(name)
+
+            threading.Thread(target=run, name=f"warm-up-{name}", daemon=True).start()
+
+    def warming_up(self):
+        """Names of the warm-ups still running."""
+        with self._lock:
+            return sorted(self.pending)
+
+    def render(self):
+        """Startup phase durations in the Prometheus text format."""
+        with self._lock:
+            phases = dict(self.phases)
+        return [
+            "# HELP app_startup_phase_seconds Time each startup phase of this worker took.",
+            "# TYPE app_startup_phase_seconds gauge",
+            *(f'app_startup_phase_seconds{{phase="{name}"}} {seconds}'
+              for name, seconds in phases.items()),
+        ]
+
+
+startup = Startup()
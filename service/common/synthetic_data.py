@@ -0,0 +1,257 @@
+"""
+Synthetic data for local load and scale testing
+
+Generates referentially consistent rows for every table the service reads,
+from a seeded RNG so that the same options always produce the same data,
+and bulk-loads them with COPY on Postgres or batched executemany inserts
+elsewhere. Used by `flask db-seed`.
+
+Reservations are generated per car as back-to-back rentals separated by
+random idle gaps, so a car is never double-booked, and are numbered in
+pick-up order. Prices follow the car type's list price with seasonal,
+weekday and city factors plus noise, so the price model has something to
+learn.
+"""
+import heapq
+import random
+from datetime import date, datetime, timedelta
+
+from service.models import (
+    Account, BranchLocation, Car, CarType, Customer, Discount, Employee, Reservation,
+)
+
+# (Brand, Model, Seats, Speed, Luggage, Price, Door, Auto)
+CAR_CATALOG = [
+    ("Toyota", "Corolla", 5, 180, 2, 45.00, 4, True),
+    ("Toyota", "Camry", 5, 200, 3, 55.00, 4, True),
+    ("Toyota", "Sienna", 7, 180, 4, 80.00, 5, True),
+    ("Honda", "Civic", 5, 190, 2, 47.00, 4, True),
+    ("Honda", "CR-V", 5, 185, 3, 65.00, 5, True),
+    ("Ford", "Focus", 5, 190, 2, 42.00, 4, False),
+    ("Ford", "Mustang", 4, 250, 1, 95.00, 2, False),
+    ("Ford", "Explorer", 7, 200, 4, 85.00, 5, True),
+    ("BMW", "X5", 5, 240, 3, 120.00, 5, True),
+    ("BMW", "3 Series", 5, 240, 2, 100.00, 4, True),
+    ("Audi", "A4", 5, 240, 2, 98.00, 4, True),
+    ("Audi", "Q7", 7, 230, 4, 135.00, 5, True),
+    ("Tesla", "Model 3", 5, 225, 2, 90.00, 4, True),
+    ("Chevrolet", "Malibu", 5, 200, 3, 50.00, 4, True),
+    ("Nissan", "Altima", 5, 200, 3, 48.00, 4, True),
+]
+
+# (City, State, price factor)
+CITIES = [
+    ("New York", "NY", 1.30), ("Los Angeles", "CA", 1.20), ("Chicago", "IL", 1.05),
+    ("Houston", "TX", 0.95), ("Miami", "FL", 1.15), ("Phoenix", "AZ", 0.90),
+    ("Philadelphia", "PA", 1.00), ("San Antonio", "TX", 0.85), ("San Diego", "CA", 1.10),
+    ("Dallas", "TX", 0.95), ("San Jose", "CA", 1.15), ("Austin", "TX", 1.00),
+    ("Seattle", "WA", 1.10), ("Denver", "CO", 1.00), ("Boston", "MA", 1.20),
+]
+
+FIRST_NAMES = ["James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda",
+               "David", "Elizabeth", "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica",
+               "Wei", "Mei", "Carlos", "Sofia", "Ahmed", "Fatima", "Raj", "Priya"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis",
+              "Rodriguez", "Martinez", "Hernandez", "Lopez", "Wilson", "Anderson", "Thomas",
+              "Li", "Wang", "Chen", "Kim", "Patel", "Nguyen", "Khan", "Singh", "Cohen"]
+STREETS = ["Main St", "Oak Ave", "Park Blvd", "Broadway", "Market St", "Airport Rd", "2nd St"]
+
+# Price factor by pick-up month (1-12) and pick-up weekday (Monday = 0)
+MONTH_FACTORS = [0.85, 0.85, 0.95, 1.00, 1.05, 1.20, 1.30, 1.30, 1.05, 1.00, 0.95, 1.15]
+WEEKDAY_FACTORS = [0.95, 0.95, 0.95, 1.00, 1.10, 1.15, 1.05]
+INSURANCE_PLANS = [None, 9.99, 14.99, 24.99]
+
+# Average days of one rental plus the idle gap before the next one
+AVERAGE_CYCLE_DAYS = 8
+
+
+class SeedScale:
+    """Row counts to generate, derived from the number of reservations."""
+
+    def __init__(self, reservations, customers=None, cars=None, branches=None, seed=42):
+        self.reservations = reservations
+        self.customers = customers or max(100, reservations // 20)
+        self.cars = cars or max(50, reservations // 150)
+        self.branches = branches or max(len(CITIES), self.cars // 40)
+        self.employees = self.branches * 4
+        self.discounts = 25
+        self.seed = seed
+
+
+def generate(scale):
+    """
+    (model, columns, rows) for every table in insert order; `rows` are
+    generators of tuples, so nothing is held in memory but the fleet.
+    """
+    rng = random.Random(scale.seed)
+    cars = [(f"S{number:07d}", rng.randrange(len(CAR_CATALOG)) + 1,
+             rng.randrange(scale.branches) + 1)
+            for number in range(1, scale.cars + 1)]
+    return [
+        (CarType, ["TypeId", "Brand", "Model", "Seats", "Speed", "Luggage", "Price", "Door",
+                   "Auto", "CompetitivePrice"], _car_types(rng)),
+        (BranchLocation, ["Id", "Street", "City", "State", "ZipCode", "Country"],
+         _branches(rng, scale)),
+        (Customer, ["MemberId", "FirstName", "LastName", "DoB", "SSN", "DriverLicense", "Age"],
+         _customers(random.Random(rng.random()), scale)),
+        (Account, ["Id", "Type", "EmailAddress", "PhoneNumber", "MemberId"],
+         _accounts(random.Random(rng.random()), scale)),
+        (Employee, ["EmployeeId", "FirstName", "LastName", "SSN", "PhoneNumber", "EmailAddress",
+                    "ManagerId", "PositionType"], _employees(random.Random(rng.random()), scale)),
+        (Discount, ["Code", "Amount", "StartDate", "EndDate"], _discounts(rng, scale)),
+        (Car, ["LicensePlateNumber", "CarTypeId", "Status", "BranchId"],
+         _cars(random.Random(rng.random()), cars)),
+        (Reservation, ["Id", "Time", "AccountId", "SalesId", "CarTypeId", "CarPlateNumber",
+                       "PickUpTime", "DropOffTime", "Duration", "PickUpLocationId",
+                       "DropOffLocationId", "RentalPricePerDay", "DiscountCode",
+                       "InsurancePlanPricePerDay", "TotalPrice"],
+         _reservations(random.Random(rng.random()), scale, cars)),
+    ]
+
+
+def _car_types(rng):
+    for type_id, (brand, model, seats, speed, luggage, price, door, auto) in enumerate(CAR_CATALOG, 1):
+        competitive = round(price * rng.uniform(0.9, 1.1), 2)
+        yield (type_id, brand, model, seats, speed, luggage, price, door, auto, competitive)
+
+
+def _branches(rng, scale):
+    for branch_id in range(1, scale.branches + 1):
+        city, state, _ = CITIES[(branch_id - 1) % len(CITIES)]
+        yield (branch_id, f"{rng.randint(1, 9999)} {rng.choice(STREETS)}", city, state,
+               f"{rng.randint(10000, 99999)}", "USA")
+
+
+def _customers(rng, scale):
+    today = date.today()
+    for member_id in range(1, scale.customers + 1):
+        age = rng.randint(21, 80)
+        dob = date(today.year - age, rng.randint(1, 12), rng.randint(1, 28))
+        yield (member_id, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), dob,
+               f"{rng.randint(100, 899):03d}-{rng.randint(1, 99):02d}-{rng.randint(1, 9999):04d}",
+               f"D{rng.randint(10 ** 8, 10 ** 9 - 1)}", age)
+
+
+def _accounts(rng, scale):
+    for account_id in range(1, scale.customers + 1):
+        yield (account_id, "Corporate" if rng.random() < 0.1 else "Personal",
+               f"member{account_id}@example.com", f"555-{rng.randint(1000000, 9999999)}",
+               account_id)
+
+
+def _employees(rng, scale):
+    # Managers come first so every ManagerId refers to an inserted row
+    managers = max(1, scale.employees // 10)
+    for employee_id in range(1, scale.employees + 1):
+        manager = employee_id <= managers
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        yield (employee_id, first, last,
+               f"{rng.randint(100, 899):03d}-{rng.randint(1, 99):02d}-{rng.randint(1, 9999):04d}",
+               f"555-{rng.randint(1000000, 9999999)}",
+               f"{first.lower()}.{last.lower()}{employee_id}@example.com",
+               None if manager else rng.randint(1, managers),
+               "Manager" if manager else "Sales")
+
+
+def _discount_percent(number):
+    return (5, 10, 15, 20, 25)[number % 5]
+
+
+def _discounts(rng, scale):
+    start = date.today() - timedelta(days=365 * 3)
+    for number in range(1, scale.discounts + 1):
+        begins = start + timedelta(days=rng.randint(0, 365 * 3))
+        yield (f"SAVE{number:03d}", _discount_percent(number), begins,
+               begins + timedelta(days=rng.randint(30, 365)))
+
+
+def _cars(rng, cars):
+    for plate, car_type_id, branch_id in cars:
+        status = "Maintenance" if rng.random() < 0.02 else "Available"
+        yield (plate, car_type_id, status, branch_id)
+
+
+def _reservations(rng, scale, cars):
+    # Every car rents back to back from `start`; a heap keyed on each car's
+    # next pick-up merges their schedules so Ids follow pick-up time. The
+    # span is sized so the last rentals run a little into the future.
+    per_car = scale.reservations / len(cars)
+    start = datetime.now().replace(minute=0, second=0, microsecond=0) \
+        - timedelta(days=int(per_car * AVERAGE_CYCLE_DAYS * 0.95))
+    heap = [(start + timedelta(hours=rng.randint(0, 24 * AVERAGE_CYCLE_DAYS)), index)
+            for index in range(len(cars))]
+    heapq.heapify(heap)
+    city_factors = [CITIES[(branch_id - 1) % len(CITIES)][2]
+                    for branch_id in range(1, scale.branches + 1)]
+    discounts = [(f"SAVE{number:03d}", 1 - _discount_percent(number) / 100)
+                 for number in range(1, scale.discounts + 1)]
+    # This loop runs once per reservation, so it draws with rng.random()
+    # and indexes precomputed timedeltas rather than calling randint
+    hours = [timedelta(hours=hour) for hour in range(-3, 24 * 61)]
+    random, expovariate = rng.random, rng.expovariate
+    customers, employees, branches = scale.customers, scale.employees, scale.branches
+
+    for reservation_id in range(1, scale.reservations + 1):
+        pick_up, index = heap[0]
+        plate, car_type_id, branch_id = cars[index]
+        days = min(30, int(expovariate(0.25)) + 1)
+        # Up to 6 hours late, so Duration is the whole days between the two
+        drop_off = pick_up + hours[3 + 24 * days + int(random() * 7)]
+        heapq.heapreplace(heap, (drop_off + hours[3 + 2 + int(random() * 24 * 6)], index))
+
+        rate = round(CAR_CATALOG[car_type_id - 1][5] * MONTH_FACTORS[pick_up.month - 1]
+                     * WEEKDAY_FACTORS[pick_up.weekday()] * city_factors[branch_id - 1]
+                     * (0.92 + 0.16 * random()), 2)
+        insurance = INSURANCE_PLANS[int(random() * len(INSURANCE_PLANS))]
+        discount, factor = discounts[int(random() * len(discounts))] if random() < 0.15 else (None, 1.0)
+        # The same rule Reservation.extend recomputes TotalPrice with
+        total = (rate + (insurance or 0)) * days * factor
+        drop_off_branch = branch_id if random() < 0.9 else int(random() * branches) + 1
+
+        yield (reservation_id, pick_up - hours[3 + int(random() * 24 * 61)],
+               int(random() * customers) + 1,
+               int(random() * employees) + 1 if random() < 0.3 else None,
+               car_type_id, plate, pick_up, drop_off, days, branch_id, drop_off_branch,
+               rate, discount, insurance, round(total, 2))
+
+
+def bulk_load(connection, model, columns, rows, batch_size=10000):
+    """
+    Insert generated rows into a model's table: COPY on Postgres, batched
+    executemany elsewhere. Returns the number of rows written.
+    """
+    table = model.__table__
+    count = 0
+    if connection.dialect.name == "postgresql":
+        column_list = ", ".join(f'"{column}"' for column in columns)
+        with connection.connection.driver_connection.cursor() as cursor:
+            with cursor.copy(f'COPY "{table.name}" ({column_list}) FROM STDIN') as copy:
+                for row in rows:
+                    copy.write_row(row)
+                    count += 1
+        _reset_sequence(connection, table)
+        return count
+
+    insert = table.insert()
+    batch = []
+    for row in rows:
+        batch.append(dict(zip(columns, row)))
+        if len(batch) >= batch_size:
+            connection.execute(insert, batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        connection.execute(insert, batch)
+        count += len(batch)
+    return count
+
+
+def _reset_sequence(connection, table):
+    # Rows were written with explicit ids, so move the id sequence past them
+    primary_key = list(table.primary_key.columns)
+    if len(primary_key) == 1 and primary_key[0].autoincrement and \
+            primary_key[0].type.python_type is int:
+        connection.exec_driver_sql(
+            f"SELECT setval(pg_get_serial_sequence('\"{table.name}\"', '{primary_key[0].name}'), "
+            f"COALESCE((SELECT MAX(\"{primary_key[0].name}\") FROM \"{table.name}\"), 1))"
+        )
@@ -10,10 +10,88 @@ DATABASE_URI = os.getenv(
     "DATABASE_URI", "sqlite:///car_rental.db"
 )
 
+# Read replicas, comma-separated URIs, used by the read-only routes
+DATABASE_REPLICA_URIS = [uri.strip() for uri in os.getenv("DATABASE_REPLICA_URIS", "").split(",")
+                         if uri.strip()]
+# Seconds after a client's write during which its reads go to the primary
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "10"))
+# Seconds between replica health checks, and before a failed one is retried
+REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", "15"))
+
 # Configure SQLAlchemy
 SQLALCHEMY_DATABASE_URI = DATABASE_URI
 SQLALCHEMY_TRACK_MODIFICATIONS = False
-# SQLALCHEMY_POOL_SIZE = 2
+
+# Engine profile (service/common/engine.py builds SQLALCHEMY_ENGINE_OPTIONS
+# from it): "tuned" applies the settings below, "default" keeps SQLAlchemy's
+DB_ENGINE_PROFILE = os.getenv("DB_ENGINE_PROFILE", "tuned")
+# Connection pool of each worker: connections kept open, extra connections
+# opened under load, seconds a request waits for one before failing, and
+# seconds after which a connection is replaced
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Test connections before handing them out, reconnecting dropped ones
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# Postgres cancels statements running longer than this (0 disables)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+# SQLite pragmas set on every connection
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# Create missing tables when a worker starts. Turn off in production and
+# run `flask db-upgrade` as a deploy step instead, so workers boot faster
+DB_CREATE_ON_STARTUP = os.getenv("DB_CREATE_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+# When the price model and availability index load: "eager" (before serving),
+# "background" or "lazy" (on first use), see service/common/startup.py
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "eager")
+
+# Bundled rental price model, served until a version is published
+MODEL_PATH = os.getenv("MODEL_PATH", "service/rental_price_model.pkl")
+
+# Published model versions, the newest MODEL_REGISTRY_KEEP are kept on disk
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", "service/model_registry")
+MODEL_REGISTRY_KEEP = int(os.getenv("MODEL_REGISTRY_KEEP", "5"))
+# Seconds between checks for a newly published model (0 disables the watcher)
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "30"))
+
+# Largest price difference allowed between an incremental and a full retrain
+MODEL_VERIFY_TOLERANCE = float(os.getenv("MODEL_VERIFY_TOLERANCE", "0.01"))
+
+# Largest number of quotes accepted by /predict-price/batch
+PREDICT_BATCH_MAX_SIZE = int(os.getenv("PREDICT_BATCH_MAX_SIZE", "1000"))
+
+# Largest number of reservations accepted by /reservations/bulk
+BULK_MAX_SIZE = int(os.getenv("BULK_MAX_SIZE", "5000"))
+# Longest extension /reservations/extend accepts, in days
+EXTEND_MAX_DAYS = float(os.getenv("EXTEND_MAX_DAYS", "365"))
+
+# Rows fetched from the server-side cursor per chunk of /reservations/export
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# Largest page size accepted by /reservations/search
+SEARCH_MAX_PAGE_SIZE = int(os.getenv("SEARCH_MAX_PAGE_SIZE", "500"))
+
+# Archival (`flask archive-reservations`): reservations that dropped off
+# more than ARCHIVE_HORIZON_DAYS ago move to RESERVATION_ARCHIVE, at most
+# ARCHIVE_BATCH_SIZE rows per transaction
+ARCHIVE_HORIZON_DAYS = float(os.getenv("ARCHIVE_HORIZON_DAYS", "365"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+
+# Car availability index: how far back booked windows are kept, and how
+# often each worker rebuilds it to see other workers' writes (0 disables)
+AVAILABILITY_LOOKBACK_DAYS = float(os.getenv("AVAILABILITY_LOOKBACK_DAYS", "1"))
+AVAILABILITY_REFRESH_INTERVAL = float(os.getenv("AVAILABILITY_REFRESH_INTERVAL", "60"))
+
+# Reference data (car types, locations) responses: seconds a worker keeps an
+# encoded response before re-reading it, and the max-age sent to clients
+REFERENCE_CACHE_TTL = float(os.getenv("REFERENCE_CACHE_TTL", "300"))
+REFERENCE_CACHE_MAX_AGE = int(os.getenv("REFERENCE_CACHE_MAX_AGE", "60"))
+
+# Requests slower than this are logged with their SQL statements (0 disables)
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "500"))
 
 # See if an API Key has been set for security
 API_KEY = os.getenv("API_KEY")
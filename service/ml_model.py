@@ -1,87 +1,273 @@
 import pandas as pd
-# from models import db, Reservation, CarType, BranchLocation
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
 from sklearn.linear_model import LinearRegression
 from sklearn.preprocessing import OneHotEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
-import joblib
 import numpy as np
-from service.db_utils import get_db_connection
+from service.models import Reservation, CarType, BranchLocation, Account, Customer
+from service.common.sql_functions import day_of_week, month_of, days_between
+from service.price_scorer import (
+    CATEGORICAL_FEATURES,
+    NUMERICAL_FEATURES,
+    FEATURES,
+    REQUIRED_FEATURES,
+    CompiledPriceModel,
+)
 
-# load data
-conn = get_db_connection()
-cursor = conn.cursor()
 
-cursor.execute("SELECT * FROM branch")
-branch_data = cursor.fetchall()
+def training_query(since_id=None):
+    """
+    Build the training set in one statement: reservations joined with their
+    car type, pick-up/drop-off branches, account and customer, with the
+    day/month/price columns derived by the database. With since_id only
+    reservations created after that id are returned. Archived reservations
+    are included.
+    """
+    reservations = Reservation.with_archive()
+    pickup = aliased(BranchLocation)
+    dropoff = aliased(BranchLocation)
+    rental_days = days_between(reservations.PickUpTime, reservations.DropOffTime)
+    return (
+        select(
+            reservations.Id.label('reservation_id'),
+            CarType.Brand.label('brand'),
+            CarType.Model.label('model'),
+            CarType.Seats.label('seats'),
+            pickup.City.label('pickupcity'),
+            day_of_week(reservations.PickUpTime).label('pick_up_day'),
+            month_of(reservations.PickUpTime).label('pick_up_month'),
+            day_of_week(reservations.DropOffTime).label('drop_off_day'),
+            month_of(reservations.DropOffTime).label('drop_off_month'),
+            (reservations.RentalPricePerDay * rental_days
+             + reservations.InsurancePlanPricePerDay * rental_days).label('price'),
+        )
+        .join(CarType, reservations.CarTypeId == CarType.TypeId)
+        .join(pickup, reservations.PickUpLocationId == pickup.Id)
+        .join(dropoff, reservations.DropOffLocationId == dropoff.Id)
+        .join(Account, reservations.AccountId == Account.Id)
+        .join(Customer, Account.MemberId == Customer.MemberId)
+        .where(
+            CarType.Brand.is_not(None),
+            CarType.Model.is_not(None),
+            pickup.City.is_not(None),
+            reservations.PickUpTime.is_not(None),
+            reservations.DropOffTime.is_not(None),
+            *([reservations.Id > since_id] if since_id is not None else []),
+        )
+        .order_by(reservations.Id)
+    )
+
+
+def probe_grid(categories):
+    """
+    Rows that walk every category at least once with varied numeric values,
+    used to compare two models feature by feature.
+    """
+    vocab = {name: sorted(categories[name]) for name in CATEGORICAL_FEATURES}
+    longest = max(len(values) for values in vocab.values())
+    return pd.DataFrame([{
+        **{name: vocab[name][i % len(vocab[name])] for name in CATEGORICAL_FEATURES},
+        'seats': 2 + i % 6,
+        'pick_up_day': i % 7,
+        'pick_up_month': 1 + i % 12,
+        'drop_off_day': (i + 3) % 7,
+        'drop_off_month': 1 + (i + 5) % 12,
+        'credit_score': 300 + 37 * i % 551,
+    } for i in range(max(longest, 12))], columns=FEATURES)
+
+
+def simulated_credit_score(reservation_id):
+    """
+    No credit score is stored yet, so derive a stable one in 300-850 from the
+    reservation id; full and incremental retrains then see the same value.
+    """
+    return 300 + (reservation_id * 7919) % 551
+
+
+def training_chunks(connection, chunksize=50000, since_id=None):
+    """
+    Stream the training query in chunks of compact columns: categoricals as
+    pandas categories, numbers as float64. Only one chunk is held at a time.
+    """
+    streaming = connection.execution_options(stream_results=True)
+    for chunk in pd.read_sql(training_query(since_id), streaming, chunksize=chunksize):
+        chunk['credit_score'] = simulated_credit_score(chunk['reservation_id'])
+        yield pd.DataFrame({
+            'reservation_id': chunk['reservation_id'].astype('int64'),
+            **{name: chunk[name].astype('category') for name in CATEGORICAL_FEATURES},
+            **{name: chunk[name].astype('float64')
+               for name in NUMERICAL_FEATURES + ['price']},
+        })
+
+
+def _high_water_mark(data, current):
+    """Highest reservation_id in `data`, or `current` if that is higher."""
+    if 'reservation_id' not in data or not len(data):
+        return current
+    latest = int(data['reservation_id'].max())
+    return max(latest, current or latest)
+
 
-cursor.execute("SELECT * FROM reservation")
-reservation_data = cursor.fetchall()
+class LinearSufficientStats:
+    """
+    Running sufficient statistics for the one-hot + linear price model.
 
-cursor.execute("SELECT * FROM car_type")
-car_data = cursor.fetchall()
+    Holds the row count, the column means and the centered cross-product
+    matrix of [numeric features, price, one-hot categories]. Chunks are merged
+    with the pairwise update of Chan et al., so the least-squares fit can be
+    solved again after each batch of new rows without revisiting old ones.
+    """
+    # Rows expanded into a dense design matrix at a time
+    BLOCK_SIZE = 100000
 
-cursor.execute("SELECT * FROM account")
-account_data = cursor.fetchall()
+    def __init__(self):
+        self.count = 0
+        self.vocab = {name: {} for name in CATEGORICAL_FEATURES}  # category -> column
+        width = len(NUMERICAL_FEATURES) + 1
+        self.mean = np.zeros(width)
+        self.comoment = np.zeros((width, width))
+
+    @property
+    def price_column(self):
+        return len(NUMERICAL_FEATURES)
+
+    def update(self, data):
+        """Fold a frame of FEATURES plus 'price' into the statistics."""
+        data = data.dropna(subset=REQUIRED_FEATURES)
+        for start in range(0, len(data), self.BLOCK_SIZE):
+            self._merge(self._design(data.iloc[start:start + self.BLOCK_SIZE]))
+
+    def _design(self, data):
+        """Dense [numeric, price, one-hot] matrix for a block of rows."""
+        for name in CATEGORICAL_FEATURES:
+            for category in pd.unique(data[name].astype(object)):
+                if category not in self.vocab[name]:
+                    self._add_column(name, category)
+
+        numeric = data[NUMERICAL_FEATURES + ['price']].astype('float64')
+        numeric = numeric.fillna(numeric.mean())
+        design = np.zeros((len(data), len(self.mean)))
+        design[:, :self.price_column + 1] = numeric.to_numpy()
+        rows = np.arange(len(data))
+        for name in CATEGORICAL_FEATURES:
+            columns = data[name].astype(object).map(self.vocab[name]).to_numpy(dtype=np.intp)
+            design[rows, columns] = 1.0
+        return design
+
+    def _add_column(self, name, category):
+        # Earlier rows never had this category: their one-hot value, and so
+        # its mean and cross products, are all zero
+        self.vocab[name][category] = len(self.mean)
+        self.mean = np.append(self.mean, 0.0)
+        self.comoment = np.pad(self.comoment, ((0, 1), (0, 1)))
+
+    def _merge(self, design):
+        count = len(design)
+        if not count:
+            return
+        mean = design.mean(axis=0)
+        centered = design - mean
+        comoment = centered.T @ centered
+
+        total = self.count + count
+        delta = mean - self.mean
+        self.comoment += comoment + np.outer(delta, delta) * (self.count * count / total)
+        self.mean += delta * (count / total)
+        self.count = total
+
+    def solve(self):
+        """
+        Least-squares intercept and coefficients, as (intercept, numeric_coef,
+        category_coef). Uses the minimum-norm solution on centered data, which
+        is what LinearRegression returns for the rank-deficient one-hot design.
+        """
+        if not self.count:
+            raise ValueError("No training rows have been seen yet.")
+        price = self.price_column
+        features = np.array([i for i in range(len(self.mean)) if i != price])
+        sxx = self.comoment[np.ix_(features, features)]
+        sxy = self.comoment[features, price]
+        solution = np.linalg.lstsq(sxx, sxy, rcond=None)[0]
+
+        coef = np.zeros(len(self.mean))
+        coef[features] = solution
+        intercept = self.mean[price] - self.mean[features] @ solution
+        numeric_coef = coef[:len(NUMERICAL_FEATURES)]
+        category_coef = {name: {category: coef[column] for category, column in columns.items()}
+                         for name, columns in self.vocab.items()}
+        return intercept, numeric_coef, category_coef
+
+    def to_pipeline(self):
+        """A fitted Pipeline equivalent to the current least-squares solution."""
+        intercept, numeric_coef, category_coef = self.solve()
+        vocab = [sorted(category_coef[name]) for name in CATEGORICAL_FEATURES]
+
+        preprocessor = ColumnTransformer(
+            transformers=[
+                ('cat', OneHotEncoder(categories=vocab), CATEGORICAL_FEATURES),
+                ('num', 'passthrough', NUMERICAL_FEATURES)
+            ]
+        )
+        # The encoder only learns the column layout here; categories are fixed
+        preprocessor.fit(pd.DataFrame([{
+            **{name: categories[0] for name, categories in zip(CATEGORICAL_FEATURES, vocab)},
+            **{name: 0.0 for name in NUMERICAL_FEATURES},
+        }], columns=FEATURES))
+
+        regressor = LinearRegression()
+        regressor.coef_ = np.concatenate([
+            [category_coef[name][category] for category in categories]
+            for name, categories in zip(CATEGORICAL_FEATURES, vocab)
+        ] + [numeric_coef])
+        regressor.intercept_ = float(intercept)
+        regressor.n_features_in_ = len(regressor.coef_)
+        return Pipeline(steps=[
+            ('preprocessor', preprocessor),
+            ('regressor', regressor)
+        ])
 
-cursor.execute("SELECT * FROM customer")
-customer_data = cursor.fetchall()
 
-# train model
 class RentalPriceEstimator:
     def __init__(self):
         self.model = None
+        self.compiled = None
+        self.stats = None
+        # Highest Reservation.Id the model has been trained on
+        self.high_water_mark = None
 
-    def train_model(self, reservation_data, car_data, branch_data, account_data, customer_data):
-        # Merge datasets to prepare the training data
-        df = reservation_data.merge(car_data, left_on='cartypeid', right_on='typeid')
-        df = df.merge(branch_data, left_on='pickuplocationid', right_on='id', suffixes=('', '_pickup'))
-        df = df.rename(columns={'city': 'pickupcity'})
-        df = df.merge(branch_data, left_on='dropofflocationid', right_on='id', suffixes=('', '_dropoff'))
-        df = df.rename(columns={'city': 'dropoffcity'})
-        df = df.merge(account_data, left_on='accountid', right_on='id')
-        df = df.merge(customer_data, left_on='memberid', right_on='memberid')
-        df['pickuptime'] = pd.to_datetime(df['pickuptime'])
-        df['dropofftime'] = pd.to_datetime(df['dropofftime'])
-        # Create derived columns
-        df['pick_up_day'] = df['pickuptime'].dt.dayofweek  # Day of the week (0 = Monday)
-        df['pick_up_month'] = df['pickuptime'].dt.month
-        df['drop_off_day'] = df['dropofftime'].dt.dayofweek
-        df['drop_off_month'] = df['dropofftime'].dt.month
-        df['price'] = (
-            df['rentalpriceperday'] * (df['dropofftime'] - df['pickuptime']).dt.days
-            + df['insuranceplanpriceperday'] * (df['dropofftime'] - df['pickuptime']).dt.days
-        )
-        
-        df['creditscore'] = np.random.randint(300, 851, size=len(df))
-        
-        # Select features and target
-        data = df[['brand', 'model', 'seats', 'pickupcity', 'pick_up_day', 'pick_up_month',
-                'drop_off_day', 'drop_off_month', 'creditscore', 'price']]
+    def __getstate__(self):
+        # The compiled scorer is rebuilt on load, keep pickles to the Pipeline only
+        state = self.__dict__.copy()
+        state.pop('compiled', None)
+        return state
 
+    def __setstate__(self, state):
+        # Models saved before incremental training have no statistics
+        self.__dict__.update({'stats': None, 'high_water_mark': None, **state})
+        self.compiled = None
+        if self.model is not None:
+            self.compile()
+
+    def train_model(self, data):
+        """Fit the price Pipeline on a frame of FEATURES plus a 'price' column."""
         # Missing values
-        data = data.dropna(subset=['brand', 'model', 'pickupcity', 'pick_up_day', 'pick_up_month',
-                                'drop_off_day', 'drop_off_month'])
-        mean_credit = data['credit_score'].mean()
-        data['credit_score'].fillna(value=mean_credit, inplace=True)
-        mean_price = data['price'].mean()
-        data['price'].fillna(value=mean_price, inplace=True)
-        mean_seats = data['seats'].mean()
-        data['seats'].fillna(value=mean_seats, inplace=True)
-
-        X = data[['brand', 'model', 'seats', 'pickupcity', 'pick_up_day', 
-                'pick_up_month', 'drop_off_day', 'drop_off_month', 'credit_score']]
+        data = data.dropna(subset=REQUIRED_FEATURES)
+        data = data.fillna({
+            'credit_score': data['credit_score'].mean(),
+            'price': data['price'].mean(),
+            'seats': data['seats'].mean(),
+        })
+
+        X = data[FEATURES]
         y = data['price']
 
         # Preprocessing
-        categorical_features = ['brand', 'model', 'pickupcity']
-        numerical_features = ['seats', 'pick_up_day', 'pick_up_month', 'drop_off_day', 
-                            'drop_off_month', 'credit_score']
-
         preprocessor = ColumnTransformer(
             transformers=[
-                ('cat', OneHotEncoder(), categorical_features),
-                ('num', 'passthrough', numerical_features)
+                ('cat', OneHotEncoder(), CATEGORICAL_FEATURES),
+                ('num', 'passthrough', NUMERICAL_FEATURES)
             ]
         )
 
@@ -94,28 +280,87 @@ class RentalPriceEstimator:
         # Train the model
         self.model.fit(X, y)
 
-    def estimate_price(self, car_brand, car_model, seats, location_city, 
+        # Keep sufficient statistics so later rows can be folded in
+        self.stats = LinearSufficientStats()
+        self.stats.update(data)
+        self.high_water_mark = _high_water_mark(data, None)
+        self.compile()
+
+    def fit_chunks(self, chunks, incremental=False):
+        """
+        Fit on an iterable of training frames (see training_chunks), folding
+        each into the sufficient statistics as it arrives, so memory does not
+        grow with the reservation history. With incremental=True the chunks
+        are added to the statistics the model already has. Returns the number
+        of rows read; the model is left unchanged when there were none.
+        """
+        if incremental and self.stats is None:
+            raise ValueError("Model has no training statistics; run a full retrain first.")
+        stats = self.stats if incremental else LinearSufficientStats()
+        high_water_mark = self.high_water_mark if incremental else None
+        rows = 0
+        for chunk in chunks:
+            stats.update(chunk)
+            rows += len(chunk)
+            high_water_mark = _high_water_mark(chunk, high_water_mark)
+        if not rows:
+            return 0
+        self.stats = stats
+        self.model = stats.to_pipeline()
+        self.high_water_mark = high_water_mark
+        self.compile()
+        return rows
+
+    def partial_fit(self, data):
+        """
+        Fold newly created reservations into the model without revisiting the
+        ones it was already trained on; the cost scales with len(data).
+        """
+        self.fit_chunks([data], incremental=True)
+
+    def compile(self):
+        """
+        Flatten the fitted Pipeline into a CompiledPriceModel and check that
+        it scores a probe grid exactly like Pipeline.predict.
+        """
+        compiled = CompiledPriceModel.from_pipeline(self.model)
+
+        probe = probe_grid({name: compiled.categories(name) for name in CATEGORICAL_FEATURES})
+        expected = self.model.predict(probe)
+        actual = compiled.predict_rows(probe.itertuples(index=False))
+        if not np.allclose(actual, expected, rtol=1e-9, atol=1e-6):
+            raise ValueError("Compiled price model does not match the fitted Pipeline")
+        self.compiled = compiled
+
+    def max_prediction_gap(self, other):
+        """Largest absolute price difference from another model over a probe grid."""
+        categories = {name: set(self.compiled.categories(name)) & set(other.compiled.categories(name))
+                      for name in CATEGORICAL_FEATURES}
+        rows = list(probe_grid(categories).itertuples(index=False))
+        return max(abs(a - b) for a, b in zip(self.compiled.predict_rows(rows),
+                                              other.compiled.predict_rows(rows)))
+
+    def estimate_price(self, brand, model, seats, pickupcity,
                     pick_up_day, pick_up_month, drop_off_day, drop_off_month, credit_score):
         """Estimate the rental price based on input features."""
-        if not self.model:
+        if not self.compiled:
             raise ValueError("Model has not been trained yet.")
+        return self.compiled.estimate_price(
+            brand, model, seats, pickupcity, pick_up_day, pick_up_month,
+            drop_off_day, drop_off_month, credit_score)
 
-        input_data = pd.DataFrame([{
-            'brand': brand,
-            'model': model,
-            'seats': seats,
-            'pickupcity': pickupcity,
-            'pick_up_day': pick_up_day,
-            'pick_up_month': pick_up_month,
-            'drop_off_day': drop_off_day,
-            'drop_off_month': drop_off_month,
-            'credit_score': credit_score
-        }])
-        
-        estimated_price = self.model.predict(input_data)[0]
-        return round(estimated_price, 2)
-
-estimator = RentalPriceEstimator()
-estimator.train_model(reservation_data, car_data, branch_data, account_data, customer_data)
-
-joblib.dump(estimator, 'rental_price_model.pkl')
+    def predict_many(self, records):
+        """
+        Estimate rental prices for a list of feature records in one call,
+        as (price, error) tuples in input order. Scoring goes through the
+        compiled lookup tables rather than the sklearn Pipeline.
+        """
+        if not self.compiled:
+            raise ValueError("Model has not been trained yet.")
+        return self.compiled.predict_many(records)
+
+    def export(self, file):
+        """Write the compact, sklearn-free serving artifact (see price_scorer)."""
+        if not self.compiled:
+            raise ValueError("Model has not been trained yet.")
+        self.compiled.save(file)
@@ -0,0 +1,200 @@
+"""
+Versioned price model artifacts
+
+Every trained model is published in the registry directory as two files:
+the pickled RentalPriceEstimator (needed to keep training it) and the
+compact compiled artifact the API serves from (see price_scorer), which
+loads without pandas or sklearn. A small CURRENT file names the version
+that should serve traffic. Everything is written to a temporary file first
+and renamed into place, so readers never see a half-written artifact.
+
+LiveModel holds the (version, estimator) pair used by the API. A new
+version is loaded next to the old one and swapped in with a single
+reference assignment; requests already holding the old pair finish on it.
+"""
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_PREFIX = "rental_price_model-"
+ARTIFACT_SUFFIX = ".pkl"
+COMPILED_SUFFIX = ".rpm"
+POINTER_FILE = "CURRENT"
+BUNDLED_VERSION = "bundled"
+
+
+class ModelRegistry:
+    """A directory of versioned model artifacts plus a CURRENT pointer."""
+
+    def __init__(self, directory, bundled_path=None, keep=5):
+        self.directory = directory
+        self.bundled_path = bundled_path
+        self.keep = keep
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config["MODEL_REGISTRY_DIR"], bundled_path=config["MODEL_PATH"],
+                   keep=config["MODEL_REGISTRY_KEEP"])
+
+    def artifact_path(self, version, suffix=ARTIFACT_SUFFIX):
+        if version == BUNDLED_VERSION:
+            return os.path.splitext(self.bundled_path)[0] + suffix if self.bundled_path else None
+        return os.path.join(self.directory, f"{ARTIFACT_PREFIX}{version}{suffix}")
+
+    def versions(self):
+        """Published versions, oldest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            name[len(ARTIFACT_PREFIX):-len(ARTIFACT_SUFFIX)]
+            for name in os.listdir(self.directory)
+            if name.startswith(ARTIFACT_PREFIX) and name.endswith(ARTIFACT_SUFFIX)
+        )
+
+    def current_version(self):
+        """Version named by CURRENT, or the bundled model if nothing was published."""
+        try:
+            with open(os.path.join(self.directory, POINTER_FILE), encoding="utf-8") as pointer:
+                return pointer.read().strip() or BUNDLED_VERSION
+        except FileNotFoundError:
+            return BUNDLED_VERSION
+
+    def load(self, version):
+        """
+        Load the model to serve for a version: the compiled artifact when there
+        is one, otherwise the pickled estimator.
+        """
+        # Imported here so that numpy is not loaded before the model is
+        from service.price_scorer import CompiledPriceModel  # pylint: disable=import-outside-toplevel
+
+        path = self.artifact_path(version, COMPILED_SUFFIX)
+        if path and os.path.exists(path):
+            return CompiledPriceModel.load(path)
+        return self.load_estimator(version)
+
+    def load_estimator(self, version):
+        """Load the full, trainable RentalPriceEstimator stored under a version."""
+        import joblib  # pylint: disable=import-outside-toplevel
+
+        path = self.artifact_path(version)
+        if not path or not os.path.exists(path):
+            raise LookupError(f"Model version {version} not found")
+        return joblib.load(path)
+
+    def publish(self, estimator, activate=True):
+        """Write an estimator as a new version and, by default, make it current."""
+        import joblib  # pylint: disable=import-outside-toplevel
+
+        version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        self._atomic_write(self.artifact_path(version, COMPILED_SUFFIX), estimator.export)
+        self._atomic_write(self.artifact_path(version),
+                           lambda handle: joblib.dump(estimator, handle))
+        if activate:
+            self.activate(version)
+        self._prune()
+        return version
+
+    def activate(self, version):
+        """Point CURRENT at an existing version (also used to roll back)."""
+        if version != BUNDLED_VERSION and version not in self.versions():
+            raise LookupError(f"Model version {version} not found")
+        self._atomic_write(os.path.join(self.directory, POINTER_FILE),
+                           lambda handle: handle.write(version.encode("utf-8")))
+
+    def _atomic_write(self, path, write):
+        os.makedirs(self.directory, exist_ok=True)
+        handle = tempfile.NamedTemporaryFile(dir=self.directory, prefix=".tmp-", delete=False)
+        try:
+            with handle:
+                write(handle)
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.chmod(handle.name, 0o644)
+            os.replace(handle.name, path)
+        except BaseException:
+            os.unlink(handle.name)
+            raise
+
+    def _prune(self):
+        current = self.current_version()
+        for version in self.versions()[:-self.keep]:
+            if version != current:
+                for suffix in (COMPILED_SUFFIX, ARTIFACT_SUFFIX):
+                    path = self.artifact_path(version, suffix)
+                    if os.path.exists(path):
+                        os.unlink(path)
+
+
+class LiveModel:
+    """The model version serving traffic, swapped atomically on reload."""
+
+    def __init__(self, registry):
+        self.registry = registry
+        self._current = (None, None)
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+
+    @property
+    def current(self):
+        """The (version, estimator) pair; read it once per request."""
+        return self._current
+
+    @property
+    def version(self):
+        return self._current[0]
+
+    def reload(self, version=None):
+        """
+        Load the registry's current version (or the one given) if it is not
+        the one being served. Returns True when a new version was swapped in.
+        """
+        with self._reload_lock:
+            version = version or self.registry.current_version()
+            if version == self._current[0]:
+                return False
+            estimator = self.registry.load(version)
+            # A single reference assignment: readers see the old or the new pair
+            self._current = (version, estimator)
+            logger.info("Serving price model version %s", version)
+            return True
+
+    def load_serving(self):
+        """
+        Load the registry's current version, or the bundled model if that
+        cannot be loaded.
+        """
+        try:
+            self.reload()
+        except Exception as error:  # pylint: disable=broad-except
+            logger.error("Cannot load model version %s (%s), serving the bundled model",
+                         self.registry.current_version(), error)
+            self.reload(BUNDLED_VERSION)
+
+    def ensure_loaded(self):
+        """The (version, estimator) pair, loading a model first if none is served yet."""
+        if self._current[1] is None:
+            # Waits for a warm-up in progress, which holds the reload lock
+            self.load_serving()
+        return self._current
+
+    def start_watcher(self, interval):
+        """Poll the registry every `interval` seconds in a daemon thread."""
+        if self._watcher or interval <= 0:
+            return
+
+        def watch():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.reload()
+                except Exception as error:  # pylint: disable=broad-except
+                    logger.error("Keeping model version %s, reload failed: %s",
+                                 self._current[0], error)
+
+        self._watcher = threading.Thread(target=watch, name="model-watcher", daemon=True)
+        self._watcher.start()
@@ -1,7 +1,13 @@
+from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy.orm import validates
+from sqlalchemy import case, func, insert, or_, select, text, tuple_, update
+from sqlalchemy.orm import aliased, validates
+from service.common.replicas import RoutingSession
+from service.common.sql_functions import add_seconds, days_between
 
-db = SQLAlchemy()
+# Read-only views run on a replica, see service/common/replicas.py
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 class Customer(db.Model):
     __tablename__ = "CUSTOMER"
@@ -34,6 +40,20 @@ class Account(db.Model):
     PhoneNumber = db.Column(db.String(20))
     MemberId = db.Column(db.Integer, db.ForeignKey("CUSTOMER.MemberId"))
 
+    @classmethod
+    def name_statement(cls, account_id):
+        """
+        (FirstName, LastName, company Name) of an account's member, which is
+        a customer or a company, in one outer-joined SELECT.
+        """
+        return (
+            select(Customer.FirstName, Customer.LastName, Company.Name)
+            .select_from(cls)
+            .outerjoin(Customer, Customer.MemberId == cls.MemberId)
+            .outerjoin(Company, Company.MemberId == cls.MemberId)
+            .where(cls.Id == account_id)
+        )
+
 class PaymentAccount(db.Model):
     __tablename__ = "PAYMENT_ACCOUNT"
     Id = db.Column(db.Integer, primary_key=True)
@@ -78,6 +98,9 @@ class Car(db.Model):
     Status = db.Column(db.String(20))
     BranchId = db.Column(db.Integer, db.ForeignKey("BRANCH_LOCATION.Id"))
 
+# Car.Status values that take a car out of the rentable fleet
+OUT_OF_SERVICE = {"Maintenance", "Retired"}
+
 class BranchLocation(db.Model):
     __tablename__ = "BRANCH_LOCATION"
     Id = db.Column(db.Integer, primary_key=True)
@@ -90,10 +113,38 @@ class BranchLocation(db.Model):
 class Discount(db.Model):
     __tablename__ = "DISCOUNT"
     Code = db.Column(db.String(10), primary_key=True)
+    # Percentage off the daily rental and insurance prices, 0-100
+    # (Reservation.extend prices with it)
     Amount = db.Column(db.Numeric(5, 2))
     StartDate = db.Column(db.Date)
     EndDate = db.Column(db.Date)
 
+    __table_args__ = (
+        db.CheckConstraint(Amount.between(0, 100), name="ck_discount_amount_percent"),
+    )
+
+    @validates('Amount')
+    def validate_amount(self, key, value):
+        if value is not None and not 0 <= Decimal(str(value)) <= 100:
+            raise ValueError("Discount Amount is a percentage between 0 and 100")
+        return value
+
+class BranchDailyRevenue(db.Model):
+    """Reservations picked up at a branch on a day, and their revenue (service/summaries.py)."""
+    __tablename__ = "BRANCH_DAILY_REVENUE"
+    BranchId = db.Column(db.Integer, primary_key=True)
+    Day = db.Column(db.Date, primary_key=True)
+    Reservations = db.Column(db.Integer, nullable=False, default=0)
+    Revenue = db.Column(db.Numeric(15, 2), nullable=False, default=0)
+
+class CarTypeMonthlyUsage(db.Model):
+    """Reservations of a car type picked up in a month, and the time its cars were rented in it."""
+    __tablename__ = "CAR_TYPE_MONTHLY_USAGE"
+    CarTypeId = db.Column(db.Integer, primary_key=True)
+    Month = db.Column(db.Date, primary_key=True)  # First day of the month
+    Reservations = db.Column(db.Integer, nullable=False, default=0)
+    RentedSeconds = db.Column(db.BigInteger, nullable=False, default=0)
+
 class Reservation(db.Model):
     __tablename__ = "RESERVATION"
     Id = db.Column(db.Integer, primary_key=True)
@@ -113,11 +164,22 @@ class Reservation(db.Model):
     InsurancePlanPricePerDay = db.Column(db.Numeric(10, 2))
     TotalPrice = db.Column(db.Numeric(15, 2))  # Derived attribute
 
+    # Composite indexes for /reservations/search: each filter column is
+    # followed by the (PickUpTime, Id) keyset the results are paged on
+    __table_args__ = (
+        db.Index("ix_reservation_pickup", "PickUpTime", "Id"),
+        db.Index("ix_reservation_account_pickup", "AccountId", "PickUpTime", "Id"),
+        db.Index("ix_reservation_location_pickup", "PickUpLocationId", "PickUpTime", "Id"),
+        db.Index("ix_reservation_car_type_pickup", "CarTypeId", "PickUpTime", "Id"),
+        # Archival and the availability index select by drop-off time
+        db.Index("ix_reservation_dropoff", "DropOffTime", "Id"),
+    )
+
     @validates('PickUpTime', 'DropOffTime')
     def validate_datetime(self, key, value):
         if isinstance(value, str):
-            # Automatically convert string to datetime
-            return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+            # Automatically convert string to datetime ("YYYY-MM-DD HH:MM:SS" or ISO 8601)
+            return datetime.fromisoformat(value)
         return value
 
     # CRUD Methods for Reservation
@@ -171,29 +233,222 @@ class Reservation(db.Model):
         db.session.commit()
         return reservation
 
+    @classmethod
+    def clean_values(cls, data, allow_id=False):
+        """
+        Check one bulk row against the table's columns and convert its values
+        to column types. Raises ValueError naming the first bad field.
+        """
+        if not isinstance(data, dict):
+            raise ValueError("Each reservation must be an object")
+        values = {}
+        for key, value in data.items():
+            column = cls.__table__.columns.get(key)
+            if column is None or (column.primary_key and not allow_id):
+                raise ValueError(f"Unknown field {key}")
+            if value is None:
+                values[key] = None
+                continue
+            try:
+                value = _to_column_type(column, value)
+            except (TypeError, ValueError, InvalidOperation):
+                raise ValueError(f"Invalid value for {key}: {value!r}") from None
+            length = getattr(column.type, "length", None)
+            if length and len(value) > length:
+                raise ValueError(f"{key} is longer than {length} characters")
+            values[key] = value
+        cls.check_interval(values)
+        return values
+
+    @staticmethod
+    def check_interval(values):
+        """Raise ValueError unless a DropOffTime in `values` is after its PickUpTime."""
+        pick_up, drop_off = values.get("PickUpTime"), values.get("DropOffTime")
+        if pick_up and drop_off and drop_off <= pick_up:
+            raise ValueError("DropOffTime must be after PickUpTime")
+
+    @classmethod
+    def book(cls, data, candidates=()):
+        """
+        Create a reservation with a car of its CarTypeId at its
+        PickUpLocationId that is free for [PickUpTime, DropOffTime), and
+        return it, or None if every such car is booked.
+
+        `candidates` are plates believed free (from the availability index),
+        tried first. On Postgres the chosen car's row is locked with FOR
+        UPDATE SKIP LOCKED, so concurrent bookings each take a different car
+        instead of queueing on one, and the overlap is checked again once
+        the lock is held, since the locking statement's snapshot may predate
+        a booking committed meanwhile. SQLite has no row locks: once a free
+        car has been seen without locking, the booking runs in a BEGIN
+        IMMEDIATE transaction, which holds the database write lock from its
+        first read, so the check and the insert are atomic and the lock is
+        held for two short statements only.
+
+        Bookings are only atomic against each other, not against writes that
+        set CarPlateNumber directly.
+        """
+        reservation = cls.deserialize(data)
+        start, end = reservation.PickUpTime, reservation.DropOffTime
+        if not (reservation.CarTypeId and reservation.PickUpLocationId and start and end):
+            raise ValueError("CarTypeId, PickUpLocationId, PickUpTime and DropOffTime are required")
+        if end <= start:
+            raise ValueError("DropOffTime must be after PickUpTime")
+        # Priced like extend() reprices, so the summaries count the revenue
+        reservation.Duration = (end - start).days
+        if reservation.RentalPricePerDay is not None:
+            discount = (db.session.scalar(select(Discount.Amount)
+                                          .where(Discount.Code == reservation.DiscountCode))
+                        if reservation.DiscountCode else None)
+            reservation.TotalPrice = cls.total_price(
+                reservation.Duration, reservation.RentalPricePerDay,
+                reservation.InsurancePlanPricePerDay, discount)
+
+        def free_car(skipped):
+            return (
+                select(Car.LicensePlateNumber)
+                .where(Car.CarTypeId == reservation.CarTypeId,
+                       Car.BranchId == reservation.PickUpLocationId,
+                       or_(Car.Status.is_(None), Car.Status.not_in(OUT_OF_SERVICE)),
+                       Car.LicensePlateNumber.not_in(skipped),
+                       ~cls.overlapping(Car.LicensePlateNumber, start, end).exists())
+                .order_by(case((Car.LicensePlateNumber.in_(candidates), 0), else_=1),
+                          Car.LicensePlateNumber)
+                .limit(1)
+                .with_for_update(skip_locked=True, of=Car)
+            )
+
+        sqlite = db.session.get_bind().dialect.name == "sqlite"
+        if sqlite:
+            # Most bookings that fail under load find no free car at all:
+            # answer those without queueing for the write lock
+            if db.session.scalar(free_car([])) is None:
+                db.session.rollback()
+                return None
+            db.session.execute(text("BEGIN IMMEDIATE"))
+        skipped = []
+        try:
+            while True:
+                plate = db.session.scalar(free_car(skipped))
+                if plate is None:
+                    db.session.rollback()
+                    return None
+                if sqlite or not db.session.scalar(
+                        cls.overlapping(plate, start, end).exists().select()):
+                    break
+                skipped.append(plate)
+            reservation.CarPlateNumber = plate
+            db.session.add(reservation)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return reservation
+
+    @staticmethod
+    def total_price(duration, rental_price, insurance_price, discount):
+        """
+        `duration` days of the daily rental and insurance prices, less the
+        `discount` percentage, rounded to cents: the rule extend() applies in SQL.
+        """
+        daily = Decimal(str(rental_price)) + Decimal(str(insurance_price or 0))
+        total = duration * daily * (100 - Decimal(str(discount or 0))) / 100
+        return total.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+    @classmethod
+    def overlapping(cls, plate, start, end):
+        """SELECT of the reservations of a car overlapping [start, end)."""
+        return select(cls.Id).where(cls.CarPlateNumber == plate,
+                                    cls.PickUpTime < end, cls.DropOffTime > start)
+
+    @classmethod
+    def bulk_create(cls, rows):
+        """
+        Insert cleaned rows with multi-row INSERT ... RETURNING statements
+        (1000 rows each) and commit. Returns the new Ids in input order.
+        """
+        # Asking SQLAlchemy to match RETURNING rows to parameters makes it
+        # fall back to one INSERT per row on SQLite. Ids are drawn in VALUES
+        # order on both SQLite and Postgres, so sorting them restores it.
+        # pylint: disable=import-outside-toplevel
+        from service import summaries
+
+        ids = db.session.execute(insert(cls).returning(cls.Id), rows).scalars().all()
+        summaries.apply(db.session.connection(), added=rows)
+        db.session.commit()
+        return sorted(ids)
+
+    @classmethod
+    def bulk_update(cls, rows):
+        """
+        Apply cleaned rows, each with its Id, as executemany UPDATEs by primary
+        key and commit. Each row is checked merged over the stored values, so
+        a patch of DropOffTime alone cannot end before the stored PickUpTime.
+        Returns (Ids that do not exist, {Id: error} of invalid rows); nothing
+        is written if either is non-empty.
+        """
+        # pylint: disable=import-outside-toplevel
+        from service import summaries
+
+        ids = [row["Id"] for row in rows]
+        existing = {
+            row.Id: dict(row._mapping)
+            for row in db.session.execute(
+                select(cls.Id, *(getattr(cls, name) for name in summaries.SUMMARY_COLUMNS))
+                .where(cls.Id.in_(ids))
+                .with_for_update()
+            )
+        }
+        missing = [reservation_id for reservation_id in ids if reservation_id not in existing]
+        invalid = {}
+        for row in rows:
+            if row["Id"] in existing:
+                try:
+                    cls.check_interval({**existing[row["Id"]], **row})
+                except ValueError as e:
+                    invalid[row["Id"]] = str(e)
+        if missing or invalid:
+            db.session.rollback()
+            return missing, invalid
+        db.session.execute(update(cls), rows)
+        summaries.apply(db.session.connection(),
+                        changed=[(existing[row["Id"]], {**existing[row["Id"]], **row})
+                                 for row in rows])
+        db.session.commit()
+        return [], {}
+
     # Serialize the model to a dictionary
     def serialize(self):
         """Convert a Reservation object into a JSON-compatible dictionary."""
+        return self.serialize_row(self)
+
+    @staticmethod
+    def serialize_row(row):
+        """
+        serialize() for anything with Reservation's column attributes,
+        including Core result rows selected from the RESERVATION table.
+        """
         return {
-            "Id": self.Id,
-            "Time": self.Time.isoformat() if self.Time else None,
-            "AccountId": self.AccountId,
-            "PaymentAccountId": self.PaymentAccountId,
-            "SalesId": self.SalesId,
-            "CarTypeId": self.CarTypeId,
-            "CarPlateNumber": self.CarPlateNumber,
-            "PickUpTime": self.PickUpTime.isoformat() if self.PickUpTime else None,
-            "DropOffTime": self.DropOffTime.isoformat() if self.DropOffTime else None,
-            "Duration": self.Duration,
-            "PickUpLocationId": self.PickUpLocationId,
-            "DropOffLocationId": self.DropOffLocationId,
-            "RentalPricePerDay": float(self.RentalPricePerDay) if self.RentalPricePerDay else None,
-            "DiscountCode": self.DiscountCode,
-            "InsurancePlanPricePerDay": float(self.InsurancePlanPricePerDay) if self.InsurancePlanPricePerDay else None,
-            "TotalPrice": float(self.TotalPrice) if self.TotalPrice else None,
+            "Id": row.Id,
+            "Time": row.Time.isoformat() if row.Time else None,
+            "AccountId": row.AccountId,
+            "PaymentAccountId": row.PaymentAccountId,
+            "SalesId": row.SalesId,
+            "CarTypeId": row.CarTypeId,
+            "CarPlateNumber": row.CarPlateNumber,
+            "PickUpTime": row.PickUpTime.isoformat() if row.PickUpTime else None,
+            "DropOffTime": row.DropOffTime.isoformat() if row.DropOffTime else None,
+            "Duration": row.Duration,
+            "PickUpLocationId": row.PickUpLocationId,
+            "DropOffLocationId": row.DropOffLocationId,
+            "RentalPricePerDay": float(row.RentalPricePerDay) if row.RentalPricePerDay else None,
+            "DiscountCode": row.DiscountCode,
+            "InsurancePlanPricePerDay": float(row.InsurancePlanPricePerDay) if row.InsurancePlanPricePerDay else None,
+            "TotalPrice": float(row.TotalPrice) if row.TotalPrice else None,
         }
 
     # Deserialize a dictionary into a Reservation object
+    @classmethod
     def deserialize(cls, data):
         """Create or update a Reservation object from a dictionary."""
         return cls(
@@ -215,7 +470,208 @@ class Reservation(db.Model):
         )
 
     @classmethod
-    def list_by_account_id(cls, account_id):
+    def with_archive(cls):
+        """
+        Reservation over RESERVATION and RESERVATION_ARCHIVE together (UNION
+        ALL), for the reads that need the whole history.
+        """
+        history = select(cls.__table__).union_all(select(ReservationArchive.__table__))
+        return aliased(cls, history.subquery("reservation_history"))
+
+    @classmethod
+    def find_with_archive(cls, reservation_id):
+        """Retrieve a reservation by ID, looking in the archive if it is not current."""
+        return cls.query.get(reservation_id) or ReservationArchive.query.get(reservation_id)
+
+    @classmethod
+    def list_by_account_id(cls, account_id, include_archived=False):
         """List all reservations for a given AccountId."""
+        if include_archived:
+            history = cls.with_archive()
+            return db.session.scalars(select(history).where(history.AccountId == account_id)).all()
         return cls.query.filter_by(AccountId=account_id).all()
-    
\ No newline at end of file
+
+    @classmethod
+    def search(cls, account_id=None, pickup_from=None, pickup_to=None,
+               pickup_location_id=None, car_type_id=None, after=None, limit=50):
+        """
+        Search reservations ordered by (PickUpTime, Id), one page at a time.
+        `after` is the (PickUpTime, Id) of the last row of the previous page;
+        seeking past it keeps every page as cheap as the first.
+        """
+        query = cls.query.filter(cls.PickUpTime.is_not(None), *cls.filter_clauses(
+            account_id=account_id, pickup_location_id=pickup_location_id,
+            car_type_id=car_type_id, pickup_from=pickup_from, pickup_to=pickup_to))
+        if after is not None:
+            query = query.filter(tuple_(cls.PickUpTime, cls.Id) > tuple_(*after))
+        return query.order_by(cls.PickUpTime, cls.Id).limit(limit).all()
+
+    @classmethod
+    def filter_clauses(cls, columns=None, account_id=None, pickup_location_id=None,
+                       car_type_id=None, pickup_from=None, pickup_to=None, dropoff_from=None,
+                       dropoff_to=None):
+        """
+        WHERE clauses for the reservation filters shared by search and extend,
+        on Reservation or on `columns` of a table like it (the archive).
+        """
+        source = cls if columns is None else columns
+        clauses = []
+        if account_id is not None:
+            clauses.append(source.AccountId == account_id)
+        if pickup_location_id is not None:
+            clauses.append(source.PickUpLocationId == pickup_location_id)
+        if car_type_id is not None:
+            clauses.append(source.CarTypeId == car_type_id)
+        if pickup_from is not None:
+            clauses.append(source.PickUpTime >= pickup_from)
+        if pickup_to is not None:
+            clauses.append(source.PickUpTime < pickup_to)
+        if dropoff_from is not None:
+            clauses.append(source.DropOffTime >= dropoff_from)
+        if dropoff_to is not None:
+            clauses.append(source.DropOffTime < dropoff_to)
+        return clauses
+
+    @classmethod
+    def stream(cls, batch_size=1000, include_archived=False, **filters):
+        """
+        Yield the reservations matching the filter_clauses() filters in Id
+        order, as lists of up to `batch_size` Core rows, from a server-side
+        cursor so that memory use does not grow with the number of rows.
+        """
+        if include_archived:
+            archive = ReservationArchive.__table__
+            statement = (
+                select(cls.__table__).where(*cls.filter_clauses(**filters))
+                .union_all(select(archive).where(*cls.filter_clauses(archive.c, **filters)))
+                .order_by("Id")
+            )
+        else:
+            statement = select(cls.__table__).where(*cls.filter_clauses(**filters)).order_by(cls.Id)
+        with db.engine.connect() as connection:
+            result = connection.execution_options(
+                stream_results=True, yield_per=batch_size).execute(statement)
+            yield from result.partitions()
+
+    @classmethod
+    def extend(cls, seconds, ids=None, **filters):
+        """
+        Move the drop-off time of every reservation matching `ids` and/or the
+        filter_clauses() filters by `seconds`, in a single UPDATE that also
+        recomputes Duration and TotalPrice from the new drop-off time, and
+        commit. Reservations without a drop-off time are left alone. Returns
+        the (Id, CarPlateNumber, PickUpTime, DropOffTime) of the updated rows.
+        """
+        # pylint: disable=import-outside-toplevel
+        from service import summaries
+
+        clauses = cls.filter_clauses(**filters)
+        if ids is not None:
+            clauses.append(cls.Id.in_(ids))
+        if not clauses:
+            raise ValueError("Give reservation ids or at least one filter")
+        clauses.append(cls.DropOffTime.is_not(None))
+
+        # The summaries need the values the UPDATE replaces; the rows are
+        # locked so they cannot change in between
+        summary_columns = [getattr(cls, name) for name in summaries.SUMMARY_COLUMNS]
+        old = {row.Id: dict(row._mapping) for row in db.session.execute(
+            select(cls.Id, *summary_columns).where(*clauses).with_for_update())}
+        if not old:
+            db.session.commit()
+            return []
+
+        # Every SET expression sees the row as it was before the UPDATE, so
+        # the new drop-off time is spelled out wherever it is needed
+        drop_off = add_seconds(cls.DropOffTime, seconds)
+        duration = days_between(cls.PickUpTime, drop_off)
+        # Discount.Amount is a percentage (0-100, checked on DISCOUNT); the
+        # same rule as total_price(), which book() prices new rows with
+        discount = func.coalesce(
+            select(Discount.Amount).where(Discount.Code == cls.DiscountCode).scalar_subquery(), 0)
+        total_price = case(
+            (or_(cls.PickUpTime.is_(None), cls.RentalPricePerDay.is_(None)), cls.TotalPrice),
+            else_=func.round(
+                duration * (cls.RentalPricePerDay + func.coalesce(cls.InsurancePlanPricePerDay, 0))
+                * (100 - discount) / 100, 2),
+        )
+        statement = (
+            update(cls)
+            .where(cls.Id.in_(list(old)), cls.DropOffTime.is_not(None))
+            .values(
+                DropOffTime=drop_off,
+                Duration=case((cls.PickUpTime.is_(None), cls.Duration), else_=duration),
+                TotalPrice=total_price,
+            )
+            .returning(cls.Id, cls.CarPlateNumber, *summary_columns)
+            .execution_options(synchronize_session=False)
+        )
+        rows = db.session.execute(statement).all()
+        summaries.apply(db.session.connection(),
+                        changed=[(old[row.Id], row._mapping) for row in rows])
+        db.session.commit()
+        return [(row.Id, row.CarPlateNumber, row.PickUpTime, row.DropOffTime) for row in rows]
+
+    @classmethod
+    def list_by_account_id_with_details(cls, account_id, include_archived=False):
+        """
+        List reservations for an AccountId together with their car type and
+        pick-up/drop-off locations, as (reservation, car_type, pick_up,
+        drop_off) tuples fetched in a single joined statement.
+        """
+        return db.session.execute(
+            cls.account_details_statement(account_id, include_archived)).all()
+
+    @classmethod
+    def account_details_statement(cls, account_id, include_archived=False):
+        """The SELECT behind list_by_account_id_with_details()."""
+        reservation = cls.with_archive() if include_archived else cls
+        pick_up = aliased(BranchLocation)
+        drop_off = aliased(BranchLocation)
+        return (
+            select(reservation, CarType, pick_up, drop_off)
+            .outerjoin(CarType, reservation.CarTypeId == CarType.TypeId)
+            .outerjoin(pick_up, reservation.PickUpLocationId == pick_up.Id)
+            .outerjoin(drop_off, reservation.DropOffLocationId == drop_off.Id)
+            .where(reservation.AccountId == account_id)
+        )
+
+
+class ReservationArchive(db.Model):
+    """
+    Reservations moved out of RESERVATION by service/archive.py: the same
+    columns, without foreign keys, keeping their Ids.
+    """
+    __table__ = db.Table(
+        "RESERVATION_ARCHIVE",
+        *(db.Column(column.name, column.type, primary_key=column.primary_key,
+                    autoincrement=False)
+          for column in Reservation.__table__.columns),
+        db.Index("ix_reservation_archive_account_pickup", "AccountId", "PickUpTime", "Id"),
+        db.Index("ix_reservation_archive_dropoff", "DropOffTime", "Id"),
+    )
+
+    def serialize(self):
+        return Reservation.serialize_row(self)
+
+
+
+def _to_column_type(column, value):
+    """Convert a JSON value to a column's Python type, or raise TypeError/ValueError."""
+    python_type = column.type.python_type
+    if isinstance(value, bool) and python_type is not bool:
+        raise TypeError(value)
+    if python_type is datetime:
+        value = datetime.fromisoformat(value) if isinstance(value, str) else value
+        if not isinstance(value, datetime):
+            raise TypeError(value)
+        return value
+    if python_type is int:
+        if int(value) != value:
+            raise ValueError(value)
+        return int(value)
+    if python_type is Decimal:
+        return Decimal(str(value))
+    if not isinstance(value, python_type):
+        raise TypeError(value)
+    return value
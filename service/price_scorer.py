@@ -0,0 +1,371 @@
+"""
+Compiled scorer for the rental price model
+
+The fitted price Pipeline is a one-hot encoder feeding a linear regression,
+so a prediction is just the intercept plus one coefficient per categorical
+value plus a dot product over the numeric features. CompiledPriceModel holds
+those pieces as plain lookup tables and needs neither pandas nor sklearn.
+
+A compiled model can be saved as a small versioned binary artifact:
+
+    8 bytes   magic b"RPMODEL\\0"
+    4 bytes   format version (little-endian uint32)
+    4 bytes   header length (little-endian uint32)
+    N bytes   JSON header: feature names, category vocabularies, layout
+    padding   up to an 8-byte boundary
+    float64[] intercept, numeric coefficients, then category coefficients
+              in vocabulary order
+
+The coefficient block is opened with numpy.memmap, so every worker on a
+host maps the same page-cache pages instead of unpickling its own copy.
+"""
+import json
+import struct
+from itertools import repeat
+from operator import is_
+
+import numpy as np
+
+CATEGORICAL_FEATURES = ['brand', 'model', 'pickupcity']
+NUMERICAL_FEATURES = ['seats', 'pick_up_day', 'pick_up_month', 'drop_off_day',
+                      'drop_off_month', 'credit_score']
+FEATURES = ['brand', 'model', 'seats', 'pickupcity', 'pick_up_day',
+            'pick_up_month', 'drop_off_day', 'drop_off_month', 'credit_score']
+
+REQUIRED_FEATURES = ['brand', 'model', 'pickupcity', 'pick_up_day', 'pick_up_month',
+                     'drop_off_day', 'drop_off_month']
+FEATURE_DEFAULTS = {'seats': 4, 'credit_score': 700}
+FEATURE_RANGES = {
+    'pick_up_day': (0, 6),
+    'pick_up_month': (1, 12),
+    'drop_off_day': (0, 6),
+    'drop_off_month': (1, 12),
+}
+
+ARTIFACT_MAGIC = b"RPMODEL\0"
+ARTIFACT_FORMAT = 1
+_PREAMBLE = struct.Struct("<8sII")
+
+# Policies for a categorical value the model never saw while training
+UNKNOWN_ERROR = "error"    # reject the record, like OneHotEncoder(handle_unknown='error')
+UNKNOWN_IGNORE = "ignore"  # contribute nothing, like OneHotEncoder(handle_unknown='ignore')
+# Smallest predict_many batch scored with numpy rather than row by row
+VECTORIZE_MIN_BATCH = 32
+# Category index of a value that cannot be looked up (see _category_terms)
+UNHASHABLE = -2
+
+
+class UnknownCategoryError(ValueError):
+    """Raised when a record holds a category the model was not trained on."""
+
+
+class CompiledPriceModel:
+    """A fitted linear price model flattened into lookup tables."""
+
+    def __init__(self, intercept, category_coef, numeric_coef, unknown=UNKNOWN_ERROR):
+        if unknown not in (UNKNOWN_ERROR, UNKNOWN_IGNORE):
+            raise ValueError(f"unknown category policy must be '{UNKNOWN_ERROR}' or '{UNKNOWN_IGNORE}'")
+        self.intercept = float(intercept)
+        # {feature: {category: coefficient}} for CATEGORICAL_FEATURES
+        self.category_coef = {
+            name: {category: float(coef) for category, coef in category_coef[name].items()}
+            for name in CATEGORICAL_FEATURES
+        }
+        # Coefficients in NUMERICAL_FEATURES order
+        self.numeric_coef = tuple(float(coef) for coef in numeric_coef)
+        self.unknown = unknown
+        # Memory-mapped coefficient block when loaded from an artifact
+        self.weights = None
+        # Feature positions inside a FEATURES-ordered row
+        self._category_index = [(FEATURES.index(name), self.category_coef[name])
+                                for name in CATEGORICAL_FEATURES]
+        self._numeric_terms = [(FEATURES.index(name), coef)
+                               for name, coef in zip(NUMERICAL_FEATURES, self.numeric_coef)]
+        # Vectorized scoring: {category: position} and the coefficients by
+        # position, plus a trailing 0.0 that index -1 (unknown) gathers
+        self._category_positions = {
+            name: {category: i for i, category in enumerate(self.category_coef[name])}
+            for name in CATEGORICAL_FEATURES
+        }
+        self._category_weights = {
+            name: np.array([*self.category_coef[name].values(), 0.0], dtype=np.float64)
+            for name in CATEGORICAL_FEATURES
+        }
+
+    @classmethod
+    def from_pipeline(cls, pipeline, unknown=UNKNOWN_ERROR):
+        """Compile a fitted ColumnTransformer(OneHotEncoder, passthrough) + LinearRegression."""
+        preprocessor = pipeline.named_steps['preprocessor']
+        regressor = pipeline.named_steps['regressor']
+        encoder = preprocessor.named_transformers_['cat']
+        if getattr(encoder, 'drop_idx_', None) is not None:
+            raise ValueError("Cannot compile a OneHotEncoder that drops categories")
+
+        coef = regressor.coef_.ravel()
+        cat_slice = preprocessor.output_indices_['cat']
+        num_slice = preprocessor.output_indices_['num']
+
+        category_coef = {}
+        offset = cat_slice.start
+        for name, categories in zip(encoder.feature_names_in_, encoder.categories_):
+            category_coef[name] = dict(zip(categories.tolist(),
+                                           coef[offset:offset + len(categories)].tolist()))
+            offset += len(categories)
+
+        numeric_columns = list(preprocessor.transformers_[1][2])
+        numeric_coef = dict(zip(numeric_columns, coef[num_slice].tolist()))
+        return cls(
+            intercept=float(regressor.intercept_),
+            category_coef=category_coef,
+            numeric_coef=[numeric_coef[name] for name in NUMERICAL_FEATURES],
+            unknown=unknown,
+        )
+
+    def categories(self, name):
+        """Categories known for a categorical feature."""
+        return self.category_coef[name].keys()
+
+    def predict_row(self, row):
+        """Score one row given as a sequence in FEATURES order."""
+        price = self.intercept
+        for index, table in self._category_index:
+            coef = table.get(row[index])
+            if coef is None:
+                if self.unknown == UNKNOWN_ERROR:
+                    raise UnknownCategoryError(f"unknown {FEATURES[index]} '{row[index]}'")
+                continue
+            price += coef
+        for index, coef in self._numeric_terms:
+            price += coef * row[index]
+        return price
+
+    def predict_rows(self, rows):
+        """Score many rows given in FEATURES order."""
+        columns = dict(zip(FEATURES, zip(*rows)))
+        if not columns:
+            return []
+        numeric = {name: np.asarray(columns[name], dtype=np.float64)
+                   for name in NUMERICAL_FEATURES}
+        prices, indexes = self._score(columns, numeric)
+        for name in CATEGORICAL_FEATURES:
+            invalid = indexes[name] == UNHASHABLE
+            if self.unknown == UNKNOWN_ERROR:
+                invalid |= indexes[name] == -1
+            if invalid.any():
+                # The first offending row raises, as predict_row would
+                self.predict_row([columns[feature][int(np.argmax(invalid))]
+                                  for feature in FEATURES])
+        return prices.tolist()
+
+    def _category_terms(self, name, values):
+        """
+        Coefficients of a column of category values, gathered through an
+        index array, and the index array itself: -1 marks a value the model
+        does not know, UNHASHABLE one that cannot be a category at all.
+        """
+        positions = self._category_positions[name]
+        try:
+            index = np.fromiter(map(positions.get, values, repeat(-1)), dtype=np.intp,
+                                count=len(values))
+        except TypeError:
+            index = np.fromiter((positions.get(value, -1) if _hashable(value) else UNHASHABLE
+                                 for value in values), dtype=np.intp, count=len(values))
+        return self._category_weights[name][np.maximum(index, -1)], index
+
+    def _score(self, columns, numeric):
+        """
+        Prices for columns of categorical values and float64 numeric arrays,
+        summed in the same order as predict_row, and the category index
+        array of each categorical feature (see _category_terms).
+        """
+        prices = np.full(len(numeric[NUMERICAL_FEATURES[0]]), self.intercept)
+        indexes = {}
+        for name in CATEGORICAL_FEATURES:
+            terms, indexes[name] = self._category_terms(name, columns[name])
+            prices += terms
+        for name, coef in zip(NUMERICAL_FEATURES, self.numeric_coef):
+            prices += coef * numeric[name]
+        return prices, indexes
+
+    def predict(self, record):
+        """Score one feature record given as a dict keyed by feature name."""
+        return self.predict_row([record[name] for name in FEATURES])
+
+    def estimate_price(self, brand, model, seats, pickupcity,
+                       pick_up_day, pick_up_month, drop_off_day, drop_off_month, credit_score):
+        """Estimate one rental price, raising ValueError for an invalid quote."""
+        price, error = self._predict_one({
+            'brand': brand,
+            'model': model,
+            'seats': seats,
+            'pickupcity': pickupcity,
+            'pick_up_day': pick_up_day,
+            'pick_up_month': pick_up_month,
+            'drop_off_day': drop_off_day,
+            'drop_off_month': drop_off_month,
+            'credit_score': credit_score
+        })
+        if error:
+            raise ValueError(error)
+        return price
+
+    def _predict_one(self, record):
+        """(price, error) of one feature record, without numpy."""
+        try:
+            return round(self.predict_row(self.validate_record(record)), 2), None
+        except (TypeError, ValueError) as error:
+            return None, str(error)
+
+    def predict_many(self, records):
+        """
+        Estimate rental prices for a list of feature records in one call.
+
+        Returns a list of (price, error) tuples in the same order as the input;
+        invalid records get a None price and an error message. Records are
+        validated and scored a column at a time with numpy; only invalid
+        records are looked at one by one, to word their errors. Batches too
+        small to repay numpy's per-call overhead are scored row by row.
+        """
+        count = len(records)
+        if count < VECTORIZE_MIN_BATCH:
+            return [self._predict_one(record) for record in records]
+        # {row: error}; checks run in validate_record()'s order, first error wins
+        errors = {i: "record must be an object"
+                  for i, record in enumerate(records) if not isinstance(record, dict)}
+        if errors:
+            records = [{} if i in errors else record for i, record in enumerate(records)]
+        columns = {name: [record.get(name) for record in records] for name in FEATURES}
+        is_none = {name: np.fromiter(map(is_, columns[name], repeat(None)), dtype=bool,
+                                     count=count)
+                   for name in FEATURES}
+
+        missing = np.logical_or.reduce([is_none[name] for name in REQUIRED_FEATURES])
+        for i in np.flatnonzero(missing).tolist():
+            errors.setdefault(i, "missing field(s): " + ", ".join(
+                name for name in REQUIRED_FEATURES if is_none[name][i]))
+
+        numeric = {}
+        for name in NUMERICAL_FEATURES:
+            numeric[name] = _to_float(columns[name], errors)
+            if name in FEATURE_DEFAULTS:
+                numeric[name][is_none[name]] = FEATURE_DEFAULTS[name]
+        for name, (low, high) in FEATURE_RANGES.items():
+            with np.errstate(invalid="ignore"):
+                outside = ~((numeric[name] >= low) & (numeric[name] <= high))
+            for i in np.flatnonzero(outside).tolist():
+                errors.setdefault(i, f"{name} must be between {low} and {high}")
+
+        prices, indexes = self._score(columns, numeric)
+        for name in CATEGORICAL_FEATURES:
+            for i in np.flatnonzero(indexes[name] == UNHASHABLE).tolist():
+                errors.setdefault(i, f"unhashable type: '{type(columns[name][i]).__name__}'")
+            if self.unknown == UNKNOWN_ERROR:
+                for i in np.flatnonzero(indexes[name] == -1).tolist():
+                    errors.setdefault(i, f"unknown {name} '{columns[name][i]}'")
+
+        results = list(zip(map(round, prices.tolist(), repeat(2)), repeat(None)))
+        for i, error in errors.items():
+            results[i] = (None, error)
+        return results
+
+    @staticmethod
+    def validate_record(record):
+        """Check a feature record and return it as a row in FEATURES order."""
+        if not isinstance(record, dict):
+            raise TypeError("record must be an object")
+        missing = [name for name in REQUIRED_FEATURES if record.get(name) is None]
+        if missing:
+            raise ValueError(f"missing field(s): {', '.join(missing)}")
+
+        row = {**FEATURE_DEFAULTS, **{k: v for k, v in record.items() if v is not None}}
+        for name in NUMERICAL_FEATURES:
+            row[name] = float(row[name])
+        for name, (low, high) in FEATURE_RANGES.items():
+            if not low <= row[name] <= high:
+                raise ValueError(f"{name} must be between {low} and {high}")
+        return [row[name] for name in FEATURES]
+
+    def save(self, file):
+        """Write the binary artifact to a path or a binary file object."""
+        vocab = {name: list(self.category_coef[name]) for name in CATEGORICAL_FEATURES}
+        weights = np.array(
+            [self.intercept, *self.numeric_coef]
+            + [self.category_coef[name][category]
+               for name in CATEGORICAL_FEATURES for category in vocab[name]],
+            dtype="<f8",
+        )
+        header = json.dumps({
+            "numerical_features": NUMERICAL_FEATURES,
+            "categorical_features": CATEGORICAL_FEATURES,
+            "vocabularies": vocab,
+            "unknown": self.unknown,
+            "weights": len(weights),
+        }).encode("utf-8")
+        header += b" " * (-(_PREAMBLE.size + len(header)) % 8)
+
+        if isinstance(file, (str, bytes)) or hasattr(file, "__fspath__"):
+            with open(file, "wb") as handle:
+                self._write(handle, header, weights)
+        else:
+            self._write(file, header, weights)
+
+    @staticmethod
+    def _write(handle, header, weights):
+        handle.write(_PREAMBLE.pack(ARTIFACT_MAGIC, ARTIFACT_FORMAT, len(header)))
+        handle.write(header)
+        handle.write(weights.tobytes())
+
+    @classmethod
+    def load(cls, path):
+        """Open a binary artifact, memory-mapping its coefficient block."""
+        with open(path, "rb") as handle:
+            magic, version, header_length = _PREAMBLE.unpack(handle.read(_PREAMBLE.size))
+            if magic != ARTIFACT_MAGIC:
+                raise ValueError(f"{path} is not a price model artifact")
+            if version != ARTIFACT_FORMAT:
+                raise ValueError(f"Unsupported price model artifact format {version}")
+            header = json.loads(handle.read(header_length))
+        if (header["numerical_features"] != NUMERICAL_FEATURES
+                or header["categorical_features"] != CATEGORICAL_FEATURES):
+            raise ValueError("Price model artifact was built for different features")
+
+        weights = np.memmap(path, dtype="<f8", mode="r", shape=(header["weights"],),
+                            offset=_PREAMBLE.size + header_length)
+        numeric_end = 1 + len(NUMERICAL_FEATURES)
+        category_coef, offset = {}, numeric_end
+        for name in CATEGORICAL_FEATURES:
+            vocab = header["vocabularies"][name]
+            category_coef[name] = dict(zip(vocab, weights[offset:offset + len(vocab)].tolist()))
+            offset += len(vocab)
+        model = cls(weights[0], category_coef, weights[1:numeric_end], unknown=header["unknown"])
+        model.weights = weights
+        return model
+
+
+def _hashable(value):
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+def _to_float(values, errors):
+    """
+    A list of numeric values as a float64 array, None as NaN. Values float()
+    rejects become NaN and are recorded in `errors` ({row: error}).
+    """
+    try:
+        converted = np.asarray(values, dtype=np.float64)
+        if converted.ndim == 1:
+            return converted
+    except (TypeError, ValueError):
+        pass
+    converted = np.empty(len(values))
+    for i, value in enumerate(values):
+        try:
+            converted[i] = np.nan if value is None else float(value)
+        except (TypeError, ValueError) as error:
+            converted[i] = np.nan
+            errors.setdefault(i, str(error))
+    return converted
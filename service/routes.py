@@ -1,16 +1,31 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, stream_with_context
 from flask import current_app as app 
-from service.models import db, Reservation, Account, Company, Customer, CarType, BranchLocation
-import joblib
-from datetime import timedelta
-from service.ml_model import RentalPriceEstimator
+from service.models import db, Reservation, Account, CarType, BranchLocation
+import base64
+import binascii
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+from service import summaries
+from service.availability import availability
+from service.common.reference_cache import reference_data
+from service.common.metrics import metrics
+from service.common.query_budget import query_budget
+from service.common.replicas import replicas
+from service.common.startup import startup
+from service.model_registry import ModelRegistry, LiveModel
 
 
 @app.route('/')
+@query_budget(0)
 def index():
     return jsonify({"message": "Welcome to the Reservation API!"})
 
 @app.route('/reservations', methods=['POST'])
+@query_budget(4)
 def create_reservation():
     data = request.json
     try:
@@ -21,14 +36,49 @@ def create_reservation():
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+def booking_candidates(data):
+    """Plates the availability index believes free for a booking, or () if it cannot tell."""
+    try:
+        return availability.free_cars(int(data["CarTypeId"]), int(data["PickUpLocationId"]),
+                                      datetime.fromisoformat(data["PickUpTime"]),
+                                      datetime.fromisoformat(data["DropOffTime"]))
+    except (KeyError, TypeError, ValueError):
+        return ()
+
+@app.route('/reservations/book', methods=['POST'])
+@query_budget(7)
+def book_reservation():
+    """
+    Create a reservation and atomically assign it a car of its CarTypeId at
+    its PickUpLocationId that is free for the whole window.
+    """
+    data = request.json
+    try:
+        reservation = Reservation.book(data, candidates=booking_candidates(data))
+    except (OperationalError, PoolTimeoutError) as e:
+        # Lock or connection wait timed out under load: worth retrying
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+    if reservation is None:
+        return jsonify({"error": "No car of this type is free at this branch for the requested window"}), 409
+    return jsonify(reservation.serialize()), 201
+
 @app.route('/reservations/<int:reservation_id>', methods=['GET'])
+@query_budget(2)
 def get_reservation(reservation_id):
-    reservation = Reservation.read_reservation(reservation_id)
+    # Archived reservations cost a second lookup; current ones do not
+    payload, status = reservation_body(Reservation.find_with_archive(reservation_id))
+    return jsonify(payload), status
+
+def reservation_body(reservation):
+    """(payload, status) of GET /reservations/<id>, shared with service/asgi.py."""
     if not reservation:
-        return jsonify({"error": "Reservation not found"}), 404
-    return jsonify(reservation.serialize())
+        return {"error": "Reservation not found"}, 404
+    return reservation.serialize(), 200
 
 @app.route('/reservations/<int:reservation_id>', methods=['PUT'])
+@query_budget(5)
 def update_reservation(reservation_id):
     data = request.json
     reservation = Reservation.query.get(reservation_id)
@@ -42,81 +92,442 @@ def update_reservation(reservation_id):
     return jsonify(reservation.serialize())
 
 @app.route('/reservations/<int:reservation_id>', methods=['DELETE'])
+@query_budget(4)
 def delete_reservation(reservation_id):
     reservation = Reservation.delete_reservation(reservation_id)
     if not reservation:
         return jsonify({"error": "Reservation not found"}), 404
     return jsonify({"message": "Reservation deleted successfully"})
 
+def bulk_request_rows():
+    """The list of reservation objects in a bulk request body, or an error response."""
+    data = request.get_json(silent=True)
+    rows = data.get("reservations") if isinstance(data, dict) else data
+    if not isinstance(rows, list) or not rows:
+        return None, (jsonify({"error": "Request body must contain a list of reservations"}), 400)
+    if len(rows) > app.config["BULK_MAX_SIZE"]:
+        return None, (jsonify({
+            "error": f"At most {app.config['BULK_MAX_SIZE']} reservations per request"
+        }), 413)
+    return rows, None
+
+@app.route('/reservations/bulk', methods=['POST'])
+@query_budget(3)
+def bulk_create_reservations():
+    """
+    Create a list of reservations in one transaction. Every row is validated
+    first; if any is invalid nothing is written and the errors are returned
+    by row index. Otherwise results carry each new Id in input order.
+    """
+    rows, error = bulk_request_rows()
+    if error:
+        return error
+    cleaned, errors = [], []
+    for index, row in enumerate(rows):
+        try:
+            cleaned.append(Reservation.clean_values(row))
+        except ValueError as e:
+            errors.append({"index": index, "error": str(e)})
+    if errors:
+        return jsonify({"errors": errors}), 400
+
+    try:
+        ids = Reservation.bulk_create(cleaned)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+    # Core inserts bypass the session events that keep the index current
+    for reservation_id, values in zip(ids, cleaned):
+        if values.get("CarPlateNumber"):
+            availability.track(reservation_id, values["CarPlateNumber"],
+                               values.get("PickUpTime"), values.get("DropOffTime"))
+    return jsonify({"results": [
+        {"index": index, "Id": reservation_id, "status": 201}
+        for index, reservation_id in enumerate(ids)
+    ]}), 201
+
+@app.route('/reservations/bulk', methods=['PATCH'])
+@query_budget(5)
+def bulk_update_reservations():
+    """
+    Update a list of reservations, each identified by its Id, in one
+    transaction. Nothing is written unless every row is valid and exists.
+    """
+    rows, error = bulk_request_rows()
+    if error:
+        return error
+    cleaned, errors = [], []
+    for index, row in enumerate(rows):
+        try:
+            values = Reservation.clean_values(row, allow_id=True)
+            if values.get("Id") is None:
+                raise ValueError("Id is required")
+            if len(values) == 1:
+                raise ValueError("No fields to update")
+            cleaned.append(values)
+        except ValueError as e:
+            errors.append({"index": index, "error": str(e)})
+    if not errors:
+        seen = set()
+        for index, values in enumerate(cleaned):
+            if values["Id"] in seen:
+                errors.append({"index": index, "error": f"Reservation {values['Id']} appears more than once"})
+            seen.add(values["Id"])
+    if errors:
+        return jsonify({"errors": errors}), 400
+
+    try:
+        missing, invalid = Reservation.bulk_update(cleaned)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+    if invalid:
+        return jsonify({"errors": [
+            {"index": index, "error": f"Reservation {values['Id']}: {invalid[values['Id']]}"}
+            for index, values in enumerate(cleaned) if values["Id"] in invalid
+        ]}), 400
+    if missing:
+        return jsonify({"errors": [
+            {"index": index, "error": f"Reservation {values['Id']} not found"}
+            for index, values in enumerate(cleaned) if values["Id"] in missing
+        ]}), 404
+    moved = [values["Id"] for values in cleaned
+             if {"CarPlateNumber", "PickUpTime", "DropOffTime"} & values.keys()]
+    if moved:
+        availability.sync(moved)
+    return jsonify({"results": [
+        {"index": index, "Id": values["Id"], "status": 200}
+        for index, values in enumerate(cleaned)
+    ]}), 200
+
+def encode_cursor(reservation):
+    """Opaque keyset cursor pointing just past a reservation."""
+    key = json.dumps([reservation.PickUpTime.isoformat(), reservation.Id])
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+def decode_cursor(cursor):
+    pick_up_time, reservation_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return datetime.fromisoformat(pick_up_time), int(reservation_id)
+
+# Reservation filters taken by search, extend and export, with their parsers
+RESERVATION_FILTERS = {
+    "account_id": int, "pickup_location_id": int, "car_type_id": int,
+    "pickup_from": datetime.fromisoformat, "pickup_to": datetime.fromisoformat,
+    "dropoff_from": datetime.fromisoformat, "dropoff_to": datetime.fromisoformat,
+}
+
+# The subset /reservations/search takes
+SEARCH_FILTERS = ("account_id", "pickup_location_id", "car_type_id", "pickup_from", "pickup_to")
+
+@app.route('/reservations/search', methods=['GET'])
+@query_budget(1)
+def search_reservations():
+    """
+    Search reservations by account_id, pickup_location_id, car_type_id and a
+    [pickup_from, pickup_to) window. Results are ordered by pick-up time and
+    paged with keyset cursors: pass back next_cursor as ?cursor= for the
+    next page.
+    """
+    args = request.args
+    try:
+        # Parsed strictly: a filter that silently fell away would widen the results
+        limit = int(args.get("limit", 50))
+        if not 1 <= limit <= app.config["SEARCH_MAX_PAGE_SIZE"]:
+            raise ValueError(f"limit must be between 1 and {app.config['SEARCH_MAX_PAGE_SIZE']}")
+        filters = {key: RESERVATION_FILTERS[key](args[key]) if key in args else None
+                   for key in SEARCH_FILTERS}
+        filters["after"] = decode_cursor(args["cursor"]) if "cursor" in args else None
+    except (ValueError, TypeError, binascii.Error) as e:
+        return jsonify({"error": f"Invalid search parameters: {e}"}), 400
+
+    # One extra row tells whether there is a next page
+    reservations = Reservation.search(**filters, limit=limit + 1)
+    page = reservations[:limit]
+    return jsonify({
+        "reservations": [reservation.serialize() for reservation in page],
+        "next_cursor": encode_cursor(page[-1]) if len(reservations) > limit else None,
+    })
+
+@app.route('/availability', methods=['GET'])
+@query_budget(0)
+def list_available_cars():
+    """
+    List cars of car_type_id at branch_id that are free for the whole
+    [start, end) window, answered from the in-memory availability index.
+    """
+    args = request.args
+    try:
+        car_type_id = int(args["car_type_id"])
+        branch_id = int(args["branch_id"])
+        start = datetime.fromisoformat(args["start"])
+        end = datetime.fromisoformat(args["end"])
+        if end <= start:
+            raise ValueError("end must be after start")
+        plates = availability.free_cars(car_type_id, branch_id, start, end)
+    except KeyError as e:
+        return jsonify({"error": f"Missing parameter {e.args[0]}"}), 400
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({
+        "car_type_id": car_type_id,
+        "branch_id": branch_id,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "available": plates,
+    })
+
+RESERVATION_EXPANSIONS = {"car_type", "locations"}
+
+def car_type_summary(car_type):
+    if not car_type:
+        return None
+    return {"TypeId": car_type.TypeId, "Brand": car_type.Brand, "Model": car_type.Model,
+            "type": f"{car_type.Brand} {car_type.Model}"}
+
+def location_summary(location):
+    if not location:
+        return None
+    return {"Id": location.Id, "City": location.City,
+            "location": f"{location.Street}, {location.City}, {location.State} {location.ZipCode}"}
+
 @app.route('/reservations/account/<int:account_id>', methods=['GET'])
+@query_budget(1)
+@replicas.read_only
 def list_reservations_by_account(account_id):
-    reservations = Reservation.list_by_account_id(account_id)
-    if not reservations:
-        return jsonify({"message": "No reservations found for this account."}), 404
+    """
+    List reservations for an account. With ?expand=car_type,locations each
+    reservation embeds its car type and locations, loaded in the same query.
+    ?include_archived=true adds the archived ones.
+    """
+    try:
+        expand = parse_expand(request.args.get("expand", ""))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    include_archived = include_archived_arg()
+
+    if not expand:
+        rows = Reservation.list_by_account_id(account_id, include_archived)
+    else:
+        rows = Reservation.list_by_account_id_with_details(account_id, include_archived)
+    payload, status = account_reservations_body(rows, expand)
+    return jsonify(payload), status
+
+def parse_expand(value):
+    """The ?expand options of the account listing; ValueError names unknown ones."""
+    expand = {name for name in value.split(",") if name}
+    if expand - RESERVATION_EXPANSIONS:
+        raise ValueError(
+            f"Unknown expand option(s): {', '.join(sorted(expand - RESERVATION_EXPANSIONS))}")
+    return expand
+
+def account_reservations_body(rows, expand):
+    """
+    (payload, status) of the account listing, shared with service/asgi.py:
+    `rows` are reservations, or (reservation, car_type, pick_up, drop_off)
+    tuples when there is something to expand.
+    """
+    if not rows:
+        return {"message": "No reservations found for this account."}, 404
+    if not expand:
+        return [reservation.serialize() for reservation in rows], 200
 
-    # Serialize the list of reservations
-    return jsonify([reservation.serialize() for reservation in reservations])
+    results = []
+    for reservation, car_type, pick_up, drop_off in rows:
+        data = reservation.serialize()
+        if "car_type" in expand:
+            data["CarType"] = car_type_summary(car_type)
+        if "locations" in expand:
+            data["PickUpLocation"] = location_summary(pick_up)
+            data["DropOffLocation"] = location_summary(drop_off)
+        results.append(data)
+    return results, 200
 
+def include_archived_arg():
+    """Whether ?include_archived asks for archived reservations too."""
+    return is_true(request.args.get("include_archived", ""))
 
-# Load the trained model
-estimator = joblib.load('service/rental_price_model.pkl')
+def is_true(value):
+    return value.lower() in ("1", "true", "yes")
+
+
+# The trained model, loaded by the startup warm-up or on first use
+model_registry = ModelRegistry.from_config(app.config)
+live_model = LiveModel(model_registry)
+
+def quote_features(data):
+    """Map a /predict-price payload onto the estimator's feature names."""
+    return {
+        'brand': data.get('Brand'),
+        'model': data.get('Model'),
+        'seats': data.get('Seats', 4),
+        'pickupcity': data.get('Location_City'),
+        'pick_up_day': data.get('Pick_Up_Day'),
+        'pick_up_month': data.get('Pick_Up_Month'),
+        'drop_off_day': data.get('Drop_Off_Day'),
+        'drop_off_month': data.get('Drop_Off_Month'),
+        'credit_score': data.get('Credit_Score', 700)  # Default credit score
+    }
 
 @app.route('/predict-price', methods=['POST'])
+@query_budget(0)
 def predict_price():
     data = request.json
+    version, estimator = live_model.ensure_loaded()
+    try:
+        estimated_price = estimator.estimate_price(**quote_features(data))
+        return jsonify({"estimated_price": estimated_price, "model_version": version}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/predict-price/batch', methods=['POST'])
+@query_budget(0)
+def predict_price_batch():
+    """
+    Estimate prices for a list of quotes in one vectorized call.
+    Results come back in input order; invalid quotes carry their own error.
+    """
+    data = request.json
+    quotes = data.get("quotes") if isinstance(data, dict) else data
+    if not isinstance(quotes, list):
+        return jsonify({"error": "Request body must contain a list of quotes"}), 400
+    if len(quotes) > app.config["PREDICT_BATCH_MAX_SIZE"]:
+        return jsonify({
+            "error": f"At most {app.config['PREDICT_BATCH_MAX_SIZE']} quotes per request"
+        }), 413
+
+    records = [quote_features(quote) if isinstance(quote, dict) else quote for quote in quotes]
+    version, estimator = live_model.ensure_loaded()
     try:
-        estimated_price = estimator.predict(
-            brand=data['Brand'],
-            model=data['Model'],
-            seats=data.get('Seats', 4),
-            pickupcity=data['Location_City'],
-            pick_up_day=data['Pick_Up_Day'],
-            pick_up_month=data['Pick_Up_Month'],
-            drop_off_day=data['Drop_Off_Day'],
-            drop_off_month=data['Drop_Off_Month'],
-            credit_score=data.get('Credit_Score', 700)  # Default credit score
-        )
-        return jsonify({"estimated_price": estimated_price}), 200
+        predictions = estimator.predict_many(records)
     except Exception as e:
         return jsonify({"error": str(e)}), 400
+    return jsonify({"model_version": version, "results": [
+        {"estimated_price": price} if error is None else {"error": error}
+        for price, error in predictions
+    ]}), 200
+
+@app.route('/admin/model/reload', methods=['POST'])
+@query_budget(0)
+def reload_model():
+    """
+    Load the newest published model (or roll to the "version" given) next
+    to the one serving traffic and swap it in.
+    """
+    if app.config["API_KEY"] and request.headers.get("X-Api-Key") != app.config["API_KEY"]:
+        return jsonify({"error": "Unauthorized"}), 401
+    data = request.get_json(silent=True) or {}
+    try:
+        if data.get("version"):
+            model_registry.activate(data["version"])
+        reloaded = live_model.reload()
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": str(e), "model_version": live_model.version}), 500
+    return jsonify({"model_version": live_model.version, "reloaded": reloaded}), 200
 
 @app.route('/accounts/<int:account_id>', methods=['GET'])
+@query_budget(1)
+@replicas.read_only
 def get_account(account_id):
-    account = Account.query.get(account_id)
-    if account:
-        if account.MemberId:
-            customer = Customer.query.get(account.MemberId)
-            if customer:
-                return jsonify({"name": f"{customer.FirstName} {customer.LastName}"})
-            company = Company.query.get(account.MemberId)
-            if company:
-                return jsonify({"name": company.Name})
-    return jsonify({"error": "Account not found"}), 404
+    # The account's member is a customer or a company; fetch both in one join
+    payload, status = account_name_body(db.session.execute(Account.name_statement(account_id)).first())
+    return jsonify(payload), status
+
+def account_name_body(row):
+    """(payload, status) of GET /accounts/<id> from its name_statement() row."""
+    if row:
+        first_name, last_name, company_name = row
+        if first_name is not None or last_name is not None:
+            return {"name": f"{first_name} {last_name}"}, 200
+        if company_name is not None:
+            return {"name": company_name}, 200
+    return {"error": "Account not found"}, 404
 
 @app.route('/reservations/<int:reservation_id>/extend', methods=['PUT'])
+@query_budget(4)
 def extend_reservation(reservation_id):
-    reservation = Reservation.query.get(reservation_id)
-    if reservation:
-        reservation.DropOffTime += timedelta(weeks=1)
-        db.session.commit()
+    rows = Reservation.extend(int(timedelta(weeks=1).total_seconds()), ids=[reservation_id])
+    if rows:
+        track_extended(rows)
         return jsonify({"message": "Reservation extended"}), 200
     return jsonify({"error": "Reservation not found"}), 404
 
+@app.route('/reservations/extend', methods=['POST'])
+@query_budget(4)
+def extend_reservations():
+    """
+    Push back the drop-off time of many reservations at once, e.g. every
+    reservation at a branch during a disruption. The body names the
+    reservations by "ids" and/or a "filter" (account_id, pickup_location_id,
+    car_type_id, pickup_from/pickup_to, dropoff_from/dropoff_to) and the
+    extension in "days" and/or "hours". Runs as a single UPDATE that also
+    recomputes Duration and TotalPrice.
+    """
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    try:
+        days = float(data.get("days", 0)) + float(data.get("hours", 0)) / 24
+        # Checked before timedelta(), which overflows on huge values
+        if not 0 < days <= app.config["EXTEND_MAX_DAYS"]:
+            raise ValueError("Give a positive extension in days and/or hours, "
+                             f"at most {app.config['EXTEND_MAX_DAYS']:g} days")
+        seconds = round(timedelta(days=days).total_seconds())
+        if seconds <= 0:
+            raise ValueError("Give a positive extension in days and/or hours")
+        ids = data.get("ids")
+        if ids is not None:
+            if not isinstance(ids, list) or not all(type(i) is int for i in ids):
+                raise ValueError("ids must be a list of reservation ids")
+            if len(ids) > app.config["BULK_MAX_SIZE"]:
+                return jsonify({
+                    "error": f"At most {app.config['BULK_MAX_SIZE']} ids per request"
+                }), 413
+        filters = data.get("filter") or {}
+        if not isinstance(filters, dict):
+            raise ValueError("filter must be an object")
+        unknown = set(filters) - set(RESERVATION_FILTERS)
+        if unknown:
+            raise ValueError(f"Unknown filter {', '.join(sorted(unknown))}")
+        filters = {key: RESERVATION_FILTERS[key](value) for key, value in filters.items()}
+        rows = Reservation.extend(seconds, ids=ids, **filters)
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+    track_extended(rows)
+    return jsonify({"extended": len(rows)}), 200
+
+def track_extended(rows):
+    # The UPDATE bypasses the session events that keep the index current
+    for reservation_id, plate, pick_up, drop_off in rows:
+        if plate:
+            availability.track(reservation_id, plate, pick_up, drop_off)
+
 @app.route('/car-types', methods=['GET'])
+@query_budget(1)
+@reference_data(CarType.__tablename__)
+@replicas.read_only
 def list_car_types():
     """
     List all car types available in the database.
     """
-    car_types = CarType.query.all()  
+    payload, status = car_types_body(CarType.query.all())
+    return jsonify(payload), status
+
+def car_types_body(car_types):
+    """(payload, status) of GET /car-types, shared with service/asgi.py."""
     if not car_types:
-        return jsonify({"error": "No car types found"}), 404
-    return jsonify([
+        return {"error": "No car types found"}, 404
+    return [
         {"TypeId": car_type.TypeId, "Brand": car_type.Brand, "Model": car_type.Model}
         for car_type in car_types
-    ]), 200
+    ], 200
 
 
 @app.route('/car-types/<int:type_id>', methods=['GET'])
+@query_budget(1)
+@reference_data(CarType.__tablename__)
+@replicas.read_only
 def get_car_type_by_id(type_id):
     """Retrieve a car type by its ID."""
     car_type = CarType.query.get(type_id)
@@ -125,29 +536,191 @@ def get_car_type_by_id(type_id):
     return jsonify({"type": f"{car_type.Brand} {car_type.Model}"}), 200
 
 @app.route('/locations', methods=['GET'])
+@query_budget(1)
+@reference_data(BranchLocation.__tablename__)
+@replicas.read_only
 def list_locations():
     """
     List all branch locations available in the database.
     """
-    locations = BranchLocation.query.all()
-    if not locations:
-        return jsonify({"error": "No locations found"}), 404
+    payload, status = locations_body(BranchLocation.query.all())
+    return jsonify(payload), status
 
-    return jsonify([
+def locations_body(locations):
+    """(payload, status) of GET /locations, shared with service/asgi.py."""
+    if not locations:
+        return {"error": "No locations found"}, 404
+    return [
         {"Id": location.Id, "Street": location.Street, "City": location.City, "State": location.State, "ZipCode": location.ZipCode, "Country": location.Country}
         for location in locations
-    ]), 200
+    ], 200
 
 @app.route('/locations/<int:location_id>', methods=['GET'])
+@query_budget(1)
+@reference_data(BranchLocation.__tablename__)
+@replicas.read_only
 def get_location_by_id(location_id):
     """
     Retrieve a branch location by its ID.
     """
     location = BranchLocation.query.get(location_id)
-    print(location)
     if not location:
         return jsonify({"error": "Location not found"}), 404
     return jsonify({
         "location": f"{location.Street}, {location.City}, {location.State} {location.ZipCode}"
     }), 200
 
+
+@app.route('/ready', methods=['GET'])
+@query_budget(1)
+def ready():
+    """
+    Readiness probe: 200 once the database answers and the price model and
+    availability index are loaded, 503 until then. Under STARTUP_WARMUP=lazy
+    the first probe starts loading them in the background, so an instance
+    only takes traffic once it can answer /predict-price.
+    """
+    try:
+        db.session.execute(text("SELECT 1"))
+        database = True
+    except Exception as error:  # pylint: disable=broad-except
+        app.logger.warning("Readiness check cannot reach the database: %s", error)
+        db.session.rollback()
+        database = False
+    components = {
+        "model": (live_model.version is not None, live_model.load_serving),
+        "availability": (availability.loaded, availability.ensure_loaded),
+    }
+    warming_up = startup.warming_up()
+    for name, (loaded, load) in components.items():
+        if not loaded and name not in warming_up and name not in startup.failed:
+            startup.warm_up(app._get_current_object(), name, load, "background")  # pylint: disable=protected-access
+    warming_up = startup.warming_up()
+    is_ready = (database and all(loaded for loaded, _ in components.values())
+                and not warming_up and not startup.failed)
+    return jsonify({
+        "ready": is_ready,
+        "database": database,
+        "warming_up": warming_up,
+        "failed": startup.failed,
+        "model_version": live_model.version,
+        "availability_loaded": availability.loaded,
+        "startup_seconds": {name: round(seconds, 3) for name, seconds in startup.phases.items()},
+    }), 200 if is_ready else 503
+
+@app.route('/metrics', methods=['GET'])
+@query_budget(0)
+def get_metrics():
+    """Request and SQL metrics of this worker in the Prometheus text format."""
+    return app.response_class(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+@app.route('/reservations/export', methods=['GET'])
+@query_budget(1)
+def export_reservations():
+    """
+    Stream reservations as NDJSON (default) or ?format=csv, filtered like
+    /reservations/extend (account_id, pickup_location_id, car_type_id,
+    pickup_from/pickup_to, dropoff_from/dropoff_to). Rows are read from a
+    server-side cursor and written out a batch at a time, so memory use
+    stays flat however many rows match. ?include_archived=true adds the
+    archived reservations.
+    """
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+    try:
+        filters = {key: convert(request.args[key])
+                   for key, convert in RESERVATION_FILTERS.items() if key in request.args}
+    except ValueError as e:
+        return jsonify({"error": f"Invalid export parameters: {e}"}), 400
+
+    include_archived = include_archived_arg()
+
+    def generate():
+        columns = [column.name for column in Reservation.__table__.columns]
+        if export_format == "csv":
+            buffer = io.StringIO()
+            # Fields are matched by name, whatever order serialize_row() builds them in
+            writer = csv.DictWriter(buffer, fieldnames=columns)
+            writer.writeheader()
+            yield buffer.getvalue()
+        for batch in Reservation.stream(app.config["EXPORT_BATCH_SIZE"], include_archived,
+                                        **filters):
+            if export_format == "csv":
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(Reservation.serialize_row(row) for row in batch)
+                yield buffer.getvalue()
+            else:
+                yield "".join(json.dumps(Reservation.serialize_row(row)) + "\n" for row in batch)
+
+    return app.response_class(
+        stream_with_context(generate()), mimetype=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="reservations.{export_format}"'},
+    )
+
+######################################################################
+# Reports, served from the summary tables (service/summaries.py)
+######################################################################
+REPORT_MAX_DAYS = 366
+REPORT_MAX_MONTHS = 120
+
+def parse_month(value):
+    """First day of a YYYY-MM month."""
+    return datetime.strptime(value, "%Y-%m").date()
+
+@app.route('/reports/branches/<int:branch_id>/revenue', methods=['GET'])
+@query_budget(1)
+@replicas.read_only
+def branch_revenue_report(branch_id):
+    """
+    Reservations picked up and revenue per day at a branch, for the days
+    ?start=YYYY-MM-DD to ?end=YYYY-MM-DD (at most a year).
+    """
+    try:
+        start = date.fromisoformat(request.args["start"])
+        end = date.fromisoformat(request.args["end"])
+    except (KeyError, ValueError) as e:
+        return jsonify({"error": f"start and end must be YYYY-MM-DD dates: {e}"}), 400
+    if not 0 <= (end - start).days < REPORT_MAX_DAYS:
+        return jsonify({"error": f"end must be on or after start, at most {REPORT_MAX_DAYS} days"}), 400
+    days = summaries.branch_revenue(branch_id, start, end)
+    return jsonify({
+        "branch_id": branch_id, "start": start.isoformat(), "end": end.isoformat(),
+        "reservations": sum(day["reservations"] for day in days),
+        "revenue": round(sum(day["revenue"] for day in days), 2),
+        "days": days,
+    }), 200
+
+@app.route('/reports/car-types/utilization', methods=['GET'])
+@query_budget(1)
+@replicas.read_only
+def car_type_utilization_report():
+    """
+    Reservations, rented days and fleet utilization per car type in the
+    month ?month=YYYY-MM.
+    """
+    try:
+        month = parse_month(request.args["month"])
+    except (KeyError, ValueError) as e:
+        return jsonify({"error": f"month must be YYYY-MM: {e}"}), 400
+    return jsonify({"month": month.strftime("%Y-%m"),
+                    "car_types": summaries.car_type_utilization(month)}), 200
+
+@app.route('/reports/bookings', methods=['GET'])
+@query_budget(1)
+@replicas.read_only
+def monthly_bookings_report():
+    """Reservations picked up per month, for the months ?start=YYYY-MM to ?end=YYYY-MM."""
+    try:
+        start = parse_month(request.args["start"])
+        end = parse_month(request.args["end"])
+    except (KeyError, ValueError) as e:
+        return jsonify({"error": f"start and end must be YYYY-MM months: {e}"}), 400
+    months = (end.year - start.year) * 12 + end.month - start.month
+    if not 0 <= months < REPORT_MAX_MONTHS:
+        return jsonify({"error": f"end must be on or after start, at most {REPORT_MAX_MONTHS} months"}), 400
+    return jsonify({"start": start.strftime("%Y-%m"), "end": end.strftime("%Y-%m"),
+                    "months": summaries.monthly_bookings(start, end)}), 200
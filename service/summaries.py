@@ -0,0 +1,248 @@
+"""
+Reporting summary tables
+
+BRANCH_DAILY_REVENUE and CAR_TYPE_MONTHLY_USAGE hold what the /reports
+endpoints would otherwise aggregate from RESERVATION on every request:
+
+- a reservation counts once, with its TotalPrice as revenue, at its pick-up
+  branch on its pick-up day, and once for its car type in its pick-up month;
+- the time between its pick-up and drop-off is split across the months it
+  covers and added to its car type's RentedSeconds, which the utilization
+  report divides by the time the type's fleet was available.
+
+Both tables are maintained incrementally, in the transaction that writes
+the reservation: SummaryDeltas turns reservations' old and new column
+values into per-row deltas, which are upserted (INSERT ... ON CONFLICT DO
+UPDATE adding to the stored values). ORM writes are picked up by an
+after_flush session event; the Core statements of Reservation.bulk_create,
+bulk_update and extend apply their deltas explicitly. `flask
+summaries-rebuild` recomputes both tables from RESERVATION and its archive,
+whose reservations stay counted.
+"""
+import calendar
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import delete, event, func, inspect, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from service.models import (
+    db, BranchDailyRevenue, Car, CarTypeMonthlyUsage, Reservation, OUT_OF_SERVICE,
+)
+
+# Reservation columns the summaries are computed from
+SUMMARY_COLUMNS = ("PickUpLocationId", "CarTypeId", "PickUpTime", "DropOffTime", "TotalPrice")
+CENT = Decimal("0.01")
+
+
+def month_start(moment):
+    return date(moment.year, moment.month, 1)
+
+
+def next_month(day):
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def seconds_by_month(start, end):
+    """(first day of month, seconds of [start, end) in that month) for each month covered."""
+    month = month_start(start)
+    while True:
+        boundary = datetime.combine(next_month(month), datetime.min.time())
+        yield month, int((min(end, boundary) - start).total_seconds())
+        if end <= boundary:
+            return
+        start, month = boundary, next_month(month)
+
+
+class SummaryDeltas:
+    """Changes to summary rows, accumulated from reservations added and removed."""
+
+    def __init__(self):
+        self.branch_days = defaultdict(lambda: [0, Decimal(0)])   # (branch, day) -> [count, revenue]
+        self.type_months = defaultdict(lambda: [0, 0])            # (type, month) -> [count, seconds]
+
+    def add(self, values, sign=1):
+        """
+        Count one reservation in (sign=1) or out of (sign=-1) the summaries.
+        `values` maps SUMMARY_COLUMNS to the reservation's values.
+        """
+        branch, car_type, pick_up, drop_off, total = (values.get(name) for name in SUMMARY_COLUMNS)
+        if pick_up is None:
+            return
+        if branch is not None:
+            entry = self.branch_days[(int(branch), pick_up.date())]
+            entry[0] += sign
+            if total is not None:
+                entry[1] += sign * Decimal(str(total)).quantize(CENT)
+        if car_type is not None:
+            car_type = int(car_type)
+            self.type_months[(car_type, month_start(pick_up))][0] += sign
+            if drop_off is not None and drop_off > pick_up:
+                for month, seconds in seconds_by_month(pick_up, drop_off):
+                    self.type_months[(car_type, month)][1] += sign * seconds
+
+    def change(self, old, new):
+        """Replace one reservation's contribution: `old` values out, `new` in."""
+        self.add(old, -1)
+        self.add(new, 1)
+
+    def write(self, connection):
+        """Add the non-zero deltas to the summary tables."""
+        branch_days = [
+            {"BranchId": branch, "Day": day, "Reservations": count, "Revenue": revenue}
+            for (branch, day), (count, revenue) in self.branch_days.items() if count or revenue
+        ]
+        type_months = [
+            {"CarTypeId": car_type, "Month": month, "Reservations": count, "RentedSeconds": seconds}
+            for (car_type, month), (count, seconds) in self.type_months.items() if count or seconds
+        ]
+        if branch_days:
+            _add_to_rows(connection, BranchDailyRevenue.__table__, ("BranchId", "Day"), branch_days)
+        if type_months:
+            _add_to_rows(connection, CarTypeMonthlyUsage.__table__, ("CarTypeId", "Month"),
+                         type_months)
+        self.branch_days.clear()
+        self.type_months.clear()
+
+
+def _add_to_rows(connection, table, keys, rows):
+    """Upsert rows, adding their non-key values to those of existing rows."""
+    columns = [name for name in rows[0] if name not in keys]
+    dialect_insert = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}.get(
+        connection.dialect.name)
+    if dialect_insert is not None:
+        statement = dialect_insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=keys,
+            set_={name: table.c[name] + statement.excluded[name] for name in columns},
+        )
+        connection.execute(statement, rows)
+        return
+    for row in rows:
+        result = connection.execute(
+            update(table)
+            .where(*(table.c[name] == row[name] for name in keys))
+            .values({name: table.c[name] + row[name] for name in columns})
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(table), row)
+
+
+def apply(connection, added=(), removed=(), changed=()):
+    """
+    Update the summaries for reservations written with Core statements:
+    `added` and `removed` are value mappings, `changed` (old, new) pairs.
+    """
+    deltas = SummaryDeltas()
+    for values in added:
+        deltas.add(values, 1)
+    for values in removed:
+        deltas.add(values, -1)
+    for old, new in changed:
+        deltas.change(old, new)
+    deltas.write(connection)
+
+
+def rebuild(connection, batch_size=10000):
+    """
+    Recompute both summary tables from RESERVATION and RESERVATION_ARCHIVE;
+    returns their row counts.
+    """
+    deltas = SummaryDeltas()
+    history = Reservation.with_archive()
+    rows = connection.execution_options(yield_per=batch_size).execute(
+        select(*(getattr(history, name) for name in SUMMARY_COLUMNS)))
+    for row in rows:
+        deltas.add(row._mapping)
+    counts = len(deltas.branch_days), len(deltas.type_months)
+    connection.execute(delete(BranchDailyRevenue))
+    connection.execute(delete(CarTypeMonthlyUsage))
+    deltas.write(connection)
+    return counts
+
+
+######################################################################
+# Reports, each a range scan of a summary table
+######################################################################
+def branch_revenue(branch_id, start, end):
+    """Reservations and revenue per day at a branch, for the days start..end."""
+    rows = db.session.execute(
+        select(BranchDailyRevenue.Day, BranchDailyRevenue.Reservations, BranchDailyRevenue.Revenue)
+        .where(BranchDailyRevenue.BranchId == branch_id,
+               BranchDailyRevenue.Day >= start, BranchDailyRevenue.Day <= end)
+        .order_by(BranchDailyRevenue.Day)
+    ).all()
+    return [{"day": day.isoformat(), "reservations": count, "revenue": round(float(revenue), 2)}
+            for day, count, revenue in rows if count or revenue]
+
+
+def car_type_utilization(month):
+    """
+    Reservations, rented time and utilization (rented time over the time
+    the type's in-service cars were available) per car type in a month.
+    """
+    usage = db.session.execute(
+        select(CarTypeMonthlyUsage.CarTypeId, CarTypeMonthlyUsage.Reservations,
+               CarTypeMonthlyUsage.RentedSeconds, func.count(Car.LicensePlateNumber))
+        .outerjoin(Car, (Car.CarTypeId == CarTypeMonthlyUsage.CarTypeId)
+                   & (Car.Status.is_(None) | Car.Status.not_in(OUT_OF_SERVICE)))
+        .where(CarTypeMonthlyUsage.Month == month)
+        .group_by(CarTypeMonthlyUsage.CarTypeId, CarTypeMonthlyUsage.Reservations,
+                  CarTypeMonthlyUsage.RentedSeconds)
+        .order_by(CarTypeMonthlyUsage.CarTypeId)
+    ).all()
+    month_seconds = calendar.monthrange(month.year, month.month)[1] * 86400
+    return [{
+        "car_type_id": car_type_id,
+        "reservations": count,
+        "rented_days": round(seconds / 86400, 2),
+        "cars": cars,
+        "utilization": round(seconds / (cars * month_seconds), 4) if cars else None,
+    } for car_type_id, count, seconds, cars in usage if count or seconds]
+
+
+def monthly_bookings(start, end):
+    """Reservations picked up per month, for the months start..end."""
+    rows = db.session.execute(
+        select(CarTypeMonthlyUsage.Month, func.sum(CarTypeMonthlyUsage.Reservations))
+        .where(CarTypeMonthlyUsage.Month >= start, CarTypeMonthlyUsage.Month <= end)
+        .group_by(CarTypeMonthlyUsage.Month)
+        .order_by(CarTypeMonthlyUsage.Month)
+    ).all()
+    return [{"month": month.strftime("%Y-%m"), "reservations": int(count)}
+            for month, count in rows if count]
+
+
+######################################################################
+# Keep the summaries current from ORM writes
+######################################################################
+def _current_values(obj):
+    return {name: getattr(obj, name) for name in SUMMARY_COLUMNS}
+
+
+def _previous_values(obj):
+    state = inspect(obj)
+    values = {}
+    for name in SUMMARY_COLUMNS:
+        history = state.attrs[name].history
+        previous = history.deleted or history.unchanged
+        values[name] = previous[0] if previous else getattr(obj, name)
+    return values
+
+
+@event.listens_for(Session, "after_flush")
+def _summarize_reservation_changes(session, flush_context):
+    # Attribute history still holds the pre-flush values here
+    deltas = SummaryDeltas()
+    for obj in session.new:
+        if isinstance(obj, Reservation):
+            deltas.add(_current_values(obj))
+    for obj in session.dirty:
+        if isinstance(obj, Reservation) and session.is_modified(obj):
+            deltas.change(_previous_values(obj), _current_values(obj))
+    for obj in session.deleted:
+        if isinstance(obj, Reservation):
+            deltas.add(_previous_values(obj), -1)
+    deltas.write(session.connection())
@@ -0,0 +1,73 @@
+"""
+Test fixtures: one application on a seeded, throwaway SQLite database
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+import pytest
+
+TEST_RESERVATIONS = 2000
+
+# service.config reads the environment when it is first imported, which
+# happens as the test modules are collected
+DIRECTORY = tempfile.mkdtemp(prefix="car_rental_tests_")
+atexit.register(shutil.rmtree, DIRECTORY, ignore_errors=True)
+os.environ.update({
+    "DATABASE_URI": f"sqlite:///{os.path.join(DIRECTORY, 'car_rental.db')}",
+    "MODEL_REGISTRY_DIR": os.path.join(DIRECTORY, "model_registry"),
+    "MODEL_WATCH_INTERVAL": "0",
+    "STARTUP_WARMUP": "lazy",
+})
+
+
+@pytest.fixture(scope="session")
+def app():
+    """The service app on a freshly seeded database, shared by every test."""
+    from service import create_app  # pylint: disable=import-outside-toplevel
+
+    application = create_app()
+    result = application.test_cli_runner().invoke(
+        args=["db-seed", "--reset", "--reservations", str(TEST_RESERVATIONS)])
+    assert result.exit_code == 0, result.output
+    return application
+
+
+@pytest.fixture
+def app_context(app):
+    with app.app_context():
+        yield
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture(scope="session")
+def training_frame():
+    """A synthetic training set: FEATURES, 'price' and 'reservation_id'."""
+    # pylint: disable=import-outside-toplevel
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(7)
+    count = 600
+    brands = rng.choice(["Toyota", "Ford", "Tesla"], count)
+    seats = rng.integers(2, 8, count)
+    frame = pd.DataFrame({
+        "reservation_id": np.arange(1, count + 1),
+        "brand": brands,
+        "model": rng.choice(["Compact", "Sedan", "SUV", "Van"], count),
+        "seats": seats.astype(float),
+        "pickupcity": rng.choice(["Boston", "Denver", "Austin"], count),
+        "pick_up_day": rng.integers(0, 7, count).astype(float),
+        "pick_up_month": rng.integers(1, 13, count).astype(float),
+        "drop_off_day": rng.integers(0, 7, count).astype(float),
+        "drop_off_month": rng.integers(1, 13, count).astype(float),
+        "credit_score": rng.integers(300, 851, count).astype(float),
+    })
+    frame["price"] = (40 + 15 * (brands == "Tesla") + 3 * seats
+                      - frame["credit_score"] / 100 + rng.normal(0, 2, count))
+    return frame
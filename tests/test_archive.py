@@ -0,0 +1,42 @@
+"""
+Archived reservations leave RESERVATION but stay readable
+"""
+from sqlalchemy import func, select
+
+from service import archive
+from service.models import db, Reservation, ReservationArchive
+
+
+def test_archived_reservations_are_still_found(app, client):
+    with app.app_context():
+        oldest = db.session.scalars(
+            select(Reservation).order_by(Reservation.DropOffTime, Reservation.Id).limit(10)).all()
+        before = {reservation.Id: reservation.serialize() for reservation in oldest}
+        account_id = oldest[0].AccountId
+        account_total = db.session.scalar(
+            select(func.count()).select_from(Reservation).where(Reservation.AccountId == account_id))
+        current, archived = archive.table_sizes()
+
+        moved = archive.archive_reservations(horizon_days=0, batch_size=10, max_batches=1)
+        assert moved == 10
+        assert archive.table_sizes() == (current - 10, archived + 10)
+        assert not db.session.scalars(select(Reservation.Id).where(
+            Reservation.Id.in_(before))).all()
+        assert set(db.session.scalars(select(ReservationArchive.Id).where(
+            ReservationArchive.Id.in_(before)))) == set(before)
+
+    # Lookups by Id fall back to the archive
+    for reservation_id, serialized in before.items():
+        assert client.get(f"/reservations/{reservation_id}").get_json() == serialized
+
+    # Listings only include the archive when asked to
+    listed = client.get(f"/reservations/account/{account_id}").get_json()
+    with_archive = client.get(f"/reservations/account/{account_id}",
+                              query_string={"include_archived": "true"}).get_json()
+    assert len(with_archive) == account_total
+    assert {row["Id"] for row in with_archive} - {row["Id"] for row in listed} == \
+        {reservation_id for reservation_id, row in before.items() if row["AccountId"] == account_id}
+
+    with app.app_context():
+        history = Reservation.with_archive()
+        assert db.session.scalar(select(func.count()).select_from(history)) == current + archived
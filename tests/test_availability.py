@@ -0,0 +1,59 @@
+"""
+The in-memory availability index follows reservation writes
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from service.availability import availability
+from service.models import db, Car, OUT_OF_SERVICE
+
+PICK_UP = datetime(2040, 6, 1, 10)
+DROP_OFF = PICK_UP + timedelta(days=2)
+
+
+@pytest.fixture
+def car(app):
+    with app.app_context():
+        return db.session.execute(
+            db.select(Car.LicensePlateNumber, Car.CarTypeId, Car.BranchId)
+            .where(Car.CarTypeId.is_not(None), Car.BranchId.is_not(None),
+                   db.or_(Car.Status.is_(None), Car.Status.not_in(OUT_OF_SERVICE)))
+            .order_by(Car.LicensePlateNumber)
+        ).first()
+
+
+def is_free(app, car, start, end):
+    with app.app_context():
+        return car.LicensePlateNumber in availability.free_cars(
+            car.CarTypeId, car.BranchId, start, end)
+
+
+def test_free_cars_follows_create_extend_and_delete(app, client, car):
+    # The week after the drop-off, which PUT .../extend pushes into
+    after = (DROP_OFF + timedelta(days=1), DROP_OFF + timedelta(days=2))
+    assert is_free(app, car, PICK_UP, DROP_OFF)
+
+    response = client.post("/reservations", json={
+        "AccountId": 1, "CarTypeId": car.CarTypeId, "CarPlateNumber": car.LicensePlateNumber,
+        "PickUpLocationId": car.BranchId, "DropOffLocationId": car.BranchId,
+        "PickUpTime": PICK_UP.isoformat(), "DropOffTime": DROP_OFF.isoformat(),
+    })
+    assert response.status_code == 201
+    reservation_id = response.get_json()["Id"]
+    assert not is_free(app, car, PICK_UP + timedelta(hours=1), PICK_UP + timedelta(hours=2))
+    assert is_free(app, car, *after)
+
+    assert client.put(f"/reservations/{reservation_id}/extend").status_code == 200
+    assert not is_free(app, car, *after)
+
+    assert client.delete(f"/reservations/{reservation_id}").status_code == 200
+    assert is_free(app, car, PICK_UP, DROP_OFF + timedelta(weeks=1))
+
+
+def test_free_cars_before_the_horizon_raises(app, car):
+    with app.app_context():
+        availability.ensure_loaded()
+        start = availability.horizon - timedelta(days=1)
+        with pytest.raises(ValueError):
+            availability.free_cars(car.CarTypeId, car.BranchId, start, start + timedelta(hours=1))
@@ -0,0 +1,75 @@
+"""
+POST /reservations/book assigns each booking its own free car
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from service.models import db, Car, Discount, Reservation, OUT_OF_SERVICE
+
+
+@pytest.fixture
+def car_group(app):
+    """(car_type_id, branch_id, number of cars) of the smallest in-service group."""
+    with app.app_context():
+        return db.session.execute(
+            db.select(Car.CarTypeId, Car.BranchId, db.func.count())
+            .where(Car.CarTypeId.is_not(None), Car.BranchId.is_not(None),
+                   db.or_(Car.Status.is_(None), Car.Status.not_in(OUT_OF_SERVICE)))
+            .group_by(Car.CarTypeId, Car.BranchId)
+            .order_by(db.func.count(), Car.CarTypeId, Car.BranchId)
+        ).first()
+
+
+def booking(car_group, pick_up, **values):
+    car_type_id, branch_id, _ = car_group
+    return {"AccountId": 1, "CarTypeId": car_type_id, "PickUpLocationId": branch_id,
+            "DropOffLocationId": branch_id, "PickUpTime": pick_up.isoformat(),
+            "DropOffTime": (pick_up + timedelta(days=3)).isoformat(), **values}
+
+
+def test_booking_takes_free_cars_until_none_is_left(client, car_group):
+    pick_up = datetime(2045, 1, 10, 9)
+    responses = [client.post("/reservations/book", json=booking(car_group, pick_up))
+                 for _ in range(car_group[2] + 1)]
+    assert [response.status_code for response in responses] == [201] * car_group[2] + [409]
+    plates = [response.get_json()["CarPlateNumber"] for response in responses[:-1]]
+    assert len(set(plates)) == car_group[2]
+
+    # A window that does not overlap is bookable again
+    later = client.post("/reservations/book",
+                        json=booking(car_group, pick_up + timedelta(days=3)))
+    assert later.status_code == 201
+
+
+def test_concurrent_bookings_never_share_a_car(app, car_group):
+    pick_up = datetime(2045, 6, 10, 9)
+
+    def book(_):
+        return app.test_client().post("/reservations/book", json=booking(car_group, pick_up))
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        responses = list(pool.map(book, range(car_group[2] + 4)))
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses == [201] * car_group[2] + [409] * 4
+    plates = [response.get_json()["CarPlateNumber"] for response in responses
+              if response.status_code == 201]
+    assert len(set(plates)) == len(plates)
+
+
+def test_booking_prices_the_reservation(app, client, car_group):
+    with app.app_context():
+        db.session.add(Discount(Code="BOOK10", Amount=10))
+        db.session.commit()
+    response = client.post("/reservations/book", json=booking(
+        car_group, datetime(2045, 9, 1, 9), RentalPricePerDay=40,
+        InsurancePlanPricePerDay=5, DiscountCode="BOOK10"))
+    assert response.status_code == 201
+
+    with app.app_context():
+        reservation = db.session.get(Reservation, response.get_json()["Id"])
+        assert reservation.Duration == 3
+        # 3 days of (40 + 5), 10% off
+        assert reservation.TotalPrice == Decimal("121.50")
@@ -0,0 +1,79 @@
+"""
+POST and PATCH /reservations/bulk
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from service.models import db, Reservation
+
+PICK_UP = datetime(2031, 3, 1, 10)
+
+
+def new_reservation(**values):
+    return {"AccountId": 1, "CarTypeId": 1, "PickUpLocationId": 1, "DropOffLocationId": 1,
+            "PickUpTime": PICK_UP.isoformat(),
+            "DropOffTime": (PICK_UP + timedelta(days=3)).isoformat(), **values}
+
+
+@pytest.fixture
+def created(client):
+    response = client.post("/reservations/bulk", json=[new_reservation(), new_reservation()])
+    assert response.status_code == 201
+    return [result["Id"] for result in response.get_json()["results"]]
+
+
+def stored(app, reservation_id):
+    with app.app_context():
+        return db.session.get(Reservation, reservation_id)
+
+
+def test_bulk_create_returns_ids_in_input_order(app, created):
+    assert created == sorted(created)
+    assert stored(app, created[0]).DropOffTime == PICK_UP + timedelta(days=3)
+
+
+def test_bulk_create_rejects_every_row_if_one_is_invalid(client):
+    response = client.post("/reservations/bulk",
+                           json=[new_reservation(), new_reservation(Colour="red")])
+    assert response.status_code == 400
+    assert response.get_json()["errors"] == [{"index": 1, "error": "Unknown field Colour"}]
+
+
+def test_bulk_update_applies_a_partial_row(app, client, created):
+    drop_off = PICK_UP + timedelta(days=1)
+    response = client.patch("/reservations/bulk",
+                            json=[{"Id": created[0], "DropOffTime": drop_off.isoformat()}])
+    assert response.status_code == 200
+    reservation = stored(app, created[0])
+    assert (reservation.PickUpTime, reservation.DropOffTime) == (PICK_UP, drop_off)
+
+
+def test_bulk_update_checks_a_partial_row_against_stored_values(app, client, created):
+    # Only DropOffTime is patched, to before the stored PickUpTime
+    response = client.patch("/reservations/bulk", json=[
+        {"Id": created[0], "Duration": 2},
+        {"Id": created[1], "DropOffTime": "2020-01-01T00:00:00"},
+    ])
+    assert response.status_code == 400
+    assert response.get_json()["errors"] == [{
+        "index": 1, "error": f"Reservation {created[1]}: DropOffTime must be after PickUpTime"}]
+    assert stored(app, created[1]).DropOffTime == PICK_UP + timedelta(days=3)
+    assert stored(app, created[0]).Duration is None
+
+
+def test_bulk_update_requires_an_id(client):
+    response = client.patch("/reservations/bulk", json=[{"Duration": 2}])
+    assert response.status_code == 400
+    assert response.get_json()["errors"] == [{"index": 0, "error": "Id is required"}]
+
+
+def test_bulk_update_of_a_missing_id_is_not_found(app, client, created):
+    response = client.patch("/reservations/bulk", json=[
+        {"Id": created[0], "Duration": 2},
+        {"Id": 10 ** 9, "Duration": 2},
+    ])
+    assert response.status_code == 404
+    assert response.get_json()["errors"] == [
+        {"index": 1, "error": f"Reservation {10 ** 9} not found"}]
+    assert stored(app, created[0]).Duration is None
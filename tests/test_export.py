@@ -0,0 +1,42 @@
+"""
+GET /reservations/export
+"""
+import csv
+import io
+import json
+
+from service.models import Reservation
+
+
+def expected_rows(app, account_id):
+    with app.app_context():
+        return {reservation.Id: reservation.serialize() for reservation in
+                Reservation.query.filter_by(AccountId=account_id)}
+
+
+def test_csv_export_columns_line_up_with_the_header(app, client):
+    response = client.get("/reservations/export", query_string={"format": "csv", "account_id": 2})
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert list(rows[0]) == [column.name for column in Reservation.__table__.columns]
+
+    expected = expected_rows(app, 2)
+    assert len(rows) == len(expected) > 0
+    for row in rows:
+        serialized = expected[int(row["Id"])]
+        assert row == {key: "" if value is None else str(value)
+                       for key, value in serialized.items()}
+
+
+def test_ndjson_export_filters_rows(app, client):
+    response = client.get("/reservations/export", query_string={"account_id": 2})
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert {row["Id"]: row for row in rows} == expected_rows(app, 2)
+
+
+def test_export_rejects_invalid_filters(client):
+    assert client.get("/reservations/export", query_string={"account_id": "x"}).status_code == 400
+    assert client.get("/reservations/export", query_string={"format": "xml"}).status_code == 400
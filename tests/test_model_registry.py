@@ -0,0 +1,72 @@
+"""
+Publishing, activating and rolling back price model versions
+"""
+import pytest
+
+from service.ml_model import RentalPriceEstimator
+from service.model_registry import BUNDLED_VERSION, LiveModel, ModelRegistry
+
+
+@pytest.fixture(scope="module")
+def estimators(training_frame):
+    """Two models that quote different prices."""
+    cheap, dear = RentalPriceEstimator(), RentalPriceEstimator()
+    cheap.train_model(training_frame)
+    dear.train_model(training_frame.assign(price=training_frame["price"] * 2))
+    return cheap, dear
+
+
+def quote(model):
+    return model.estimate_price("Ford", "Sedan", 4, "Boston", 1, 6, 3, 6, 700)
+
+
+def test_publish_activate_and_roll_back(tmp_path, estimators):
+    registry = ModelRegistry(str(tmp_path))
+    assert registry.current_version() == BUNDLED_VERSION
+    first = registry.publish(estimators[0])
+    second = registry.publish(estimators[1])
+    assert registry.versions() == [first, second]
+    assert registry.current_version() == second
+
+    live = LiveModel(registry)
+    assert live.reload()
+    assert live.version == second
+    assert quote(live.current[1]) == quote(estimators[1])
+    assert not live.reload()  # Already serving CURRENT
+
+    registry.activate(first)
+    assert live.reload()
+    assert live.version == first
+    assert quote(live.current[1]) == quote(estimators[0])
+    # The stored estimator can be trained further
+    assert registry.load_estimator(first).stats is not None
+
+    with pytest.raises(LookupError):
+        registry.activate("19990101T000000000000Z")
+
+
+def test_old_versions_are_pruned_but_not_the_current_one(tmp_path, estimators):
+    registry = ModelRegistry(str(tmp_path), keep=2)
+    oldest = registry.publish(estimators[0])
+    registry.activate(oldest)
+    newer = [registry.publish(estimators[1], activate=False) for _ in range(3)]
+    assert registry.versions() == [oldest, *newer[1:]]
+    assert registry.current_version() == oldest
+
+
+def test_admin_reload_endpoint(app, client, estimators):
+    # pylint: disable=import-outside-toplevel
+    from service.routes import live_model
+
+    registry = ModelRegistry.from_config(app.config)
+    version = registry.publish(estimators[0])
+    try:
+        response = client.post("/admin/model/reload")
+        assert response.status_code == 200
+        assert response.get_json() == {"model_version": version, "reloaded": True}
+        assert client.post("/admin/model/reload",
+                           json={"version": "19990101T000000000000Z"}).status_code == 404
+    finally:
+        registry.activate(BUNDLED_VERSION)
+        live_model.reload()
+    assert live_model.version == BUNDLED_VERSION
@@ -0,0 +1,57 @@
+"""
+The compiled price scorer agrees with the sklearn Pipeline it was built from
+"""
+import numpy as np
+import pytest
+
+from service.ml_model import RentalPriceEstimator
+from service.price_scorer import FEATURES, UNKNOWN_IGNORE, CompiledPriceModel
+
+
+@pytest.fixture(scope="module")
+def estimator(training_frame):
+    estimator = RentalPriceEstimator()
+    estimator.train_model(training_frame)
+    return estimator
+
+
+@pytest.mark.parametrize("batch", [10, 600])  # Row by row, and vectorized
+def test_compiled_scores_match_the_pipeline(estimator, training_frame, batch):
+    frame = training_frame.iloc[:batch]
+    expected = estimator.model.predict(frame[FEATURES])
+    results = estimator.predict_many(frame[FEATURES].to_dict("records"))
+    assert all(error is None for _, error in results)
+    np.testing.assert_allclose([price for price, _ in results], expected, atol=0.005 + 1e-9)
+
+
+def test_artifact_round_trip(estimator, training_frame, tmp_path):
+    path = tmp_path / "model.rpm"
+    estimator.export(str(path))
+    loaded = CompiledPriceModel.load(str(path))
+    rows = list(training_frame[FEATURES].itertuples(index=False))
+    assert loaded.predict_rows(rows) == estimator.compiled.predict_rows(rows)
+
+
+def test_invalid_records_get_errors(estimator, training_frame):
+    record = training_frame[FEATURES].iloc[0].to_dict()
+    results = estimator.predict_many([
+        record, dict(record, brand="Lada"), dict(record, pick_up_month=13), {"brand": "Ford"}, [],
+    ])
+    assert results[0][1] is None
+    assert [error for _, error in results[1:]] == [
+        "unknown brand 'Lada'",
+        "pick_up_month must be between 1 and 12",
+        "missing field(s): model, pickupcity, pick_up_day, pick_up_month, drop_off_day, drop_off_month",
+        "record must be an object",
+    ]
+
+    ignoring = CompiledPriceModel.from_pipeline(estimator.model, unknown=UNKNOWN_IGNORE)
+    assert ignoring.predict_many([dict(record, brand="Lada")])[0][1] is None
+
+
+def test_partial_fit_matches_a_full_retrain(estimator, training_frame):
+    incremental = RentalPriceEstimator()
+    incremental.train_model(training_frame.iloc[:400])
+    incremental.partial_fit(training_frame.iloc[400:])
+    assert incremental.high_water_mark == len(training_frame)
+    assert incremental.max_prediction_gap(estimator) < 1e-6
@@ -0,0 +1,10 @@
+"""
+Every endpoint stays within its declared SQL statement budget
+"""
+from service.common.query_budget import check_budgets
+
+
+def test_endpoints_within_query_budgets(app):
+    results, problems = check_budgets(app)
+    assert results
+    assert not problems, "\n".join(problems)
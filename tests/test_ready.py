@@ -0,0 +1,32 @@
+"""
+GET /ready waits for the price model and availability index
+"""
+import time
+
+
+def wait_until_ready(client, timeout=30):
+    deadline = time.monotonic() + timeout
+    while True:
+        response = client.get("/ready")
+        if response.status_code == 200 or time.monotonic() > deadline:
+            return response
+        time.sleep(0.05)
+
+
+def test_ready_until_the_model_is_loaded(client, monkeypatch):
+    # Imported once the app exists: the routes module registers on it
+    from service.routes import live_model  # pylint: disable=import-outside-toplevel
+
+    assert wait_until_ready(client).status_code == 200
+    # As a worker started with STARTUP_WARMUP=lazy sees it before any quote
+    monkeypatch.setattr(live_model, "_current", (None, None))
+
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.get_json()["ready"] is False
+
+    # The probe started loading the model in the background
+    response = wait_until_ready(client)
+    assert response.status_code == 200
+    assert response.get_json()["model_version"] is not None
+    assert response.get_json()["availability_loaded"] is True
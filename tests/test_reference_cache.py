@@ -0,0 +1,49 @@
+"""
+Reference-data responses are cached, revalidated by ETag and dropped on writes
+"""
+from service.common.query_budget import StatementRecorder
+from service.common.reference_cache import reference_cache
+from service.models import db, BranchLocation, CarType
+
+
+def test_cached_read_runs_no_sql_and_answers_304(app, client):
+    reference_cache.clear()
+    first = client.get("/car-types")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    with app.app_context(), StatementRecorder() as recorder:
+        again = client.get("/car-types")
+    assert again.get_data() == first.get_data()
+    assert recorder.statements == []
+
+    revalidated = client.get("/car-types", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.get_data() == b""
+
+
+def test_committed_write_invalidates_only_its_table(app, client):
+    car_types = client.get("/car-types")
+    locations = client.get("/locations")
+
+    with app.app_context():
+        db.session.add(CarType(Brand="Cached", Model="Refresh", Seats=4))
+        db.session.commit()
+
+    updated = client.get("/car-types")
+    assert updated.headers["ETag"] != car_types.headers["ETag"]
+    assert {"Cached"} <= {car_type["Brand"] for car_type in updated.get_json()}
+    assert client.get("/locations").headers["ETag"] == locations.headers["ETag"]
+    assert client.get("/car-types", headers={
+        "If-None-Match": car_types.headers["ETag"]}).status_code == 200
+
+
+def test_rolled_back_write_keeps_the_cache(app, client):
+    locations = client.get("/locations")
+    with app.app_context():
+        db.session.add(BranchLocation(Street="1 Nowhere", City="Limbo"))
+        db.session.flush()
+        db.session.rollback()
+    with app.app_context(), StatementRecorder() as recorder:
+        assert client.get("/locations").headers["ETag"] == locations.headers["ETag"]
+    assert recorder.statements == []
@@ -0,0 +1,54 @@
+"""
+Read-only views run on a read replica and fall back to the primary
+"""
+import pytest
+from sqlalchemy import create_engine, insert
+
+from service.common.replicas import replicas
+from service.models import db, Account, Customer
+
+REPLICA_ACCOUNT = 10 ** 8
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch):
+    """A replica that holds one account the primary does not have."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    db.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(Customer), {"MemberId": REPLICA_ACCOUNT,
+                                              "FirstName": "Read", "LastName": "Replica"})
+        connection.execute(insert(Account), {"Id": REPLICA_ACCOUNT, "MemberId": REPLICA_ACCOUNT})
+    monkeypatch.setattr(replicas, "_engines", {"replica_0": engine})
+    monkeypatch.setattr(replicas, "_down_until", {})
+    yield engine
+    engine.dispose()
+
+
+def test_read_only_view_reads_the_replica(client, replica):
+    response = client.get(f"/accounts/{REPLICA_ACCOUNT}")
+    assert response.status_code == 200
+    assert response.get_json() == {"name": "Read Replica"}
+
+
+def test_unreachable_replica_falls_back_to_the_primary(app, client, tmp_path, monkeypatch):
+    # pylint: disable=import-outside-toplevel
+    from service.routes import account_name_body
+
+    broken = create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    monkeypatch.setattr(replicas, "_engines", {"replica_0": broken})
+    monkeypatch.setattr(replicas, "_down_until", {})
+    with app.app_context():
+        expected, _ = account_name_body(db.session.execute(Account.name_statement(1)).first())
+
+    response = client.get("/accounts/1")
+    assert response.status_code == 200
+    assert response.get_json() == expected
+    assert replicas.healthy() == []
+
+    # A probe that still fails keeps it down; one that succeeds brings it back
+    replicas.probe()
+    assert replicas.healthy() == []
+    (tmp_path / "missing").mkdir()
+    replicas.probe()
+    assert replicas.healthy() == ["replica_0"]
@@ -0,0 +1,50 @@
+"""
+Reservation.extend and the /reservations/extend endpoint
+"""
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from service.models import db, Account, Discount, Reservation
+
+
+def test_extend_applies_percentage_discount(app_context):
+    db.session.add(Discount(Code="TEST20", Amount=20))
+    reservation = Reservation.create_reservation({
+        "AccountId": Account.query.first().Id,
+        "PickUpTime": datetime(2030, 1, 1, 10),
+        "DropOffTime": datetime(2030, 1, 3, 10),
+        "Duration": 2,
+        "RentalPricePerDay": Decimal("50.00"),
+        "InsurancePlanPricePerDay": Decimal("10.00"),
+        "DiscountCode": "TEST20",
+        "TotalPrice": Decimal("96.00"),
+    })
+
+    Reservation.extend(24 * 3600, ids=[reservation.Id])
+
+    extended = db.session.get(Reservation, reservation.Id)
+    assert extended.DropOffTime == datetime(2030, 1, 4, 10)
+    assert extended.Duration == 3
+    # 3 days of (50 + 10), 20% off
+    assert extended.TotalPrice == Decimal("144.00")
+
+
+def test_discount_amount_must_be_a_percentage(app_context):
+    with pytest.raises(ValueError):
+        Discount(Code="TEST150", Amount=150)
+
+
+@pytest.mark.parametrize("body", [
+    [1],
+    "days",
+    {"ids": [1], "days": 1e300},
+    {"ids": [1], "hours": float("inf")},
+    {"ids": [1], "days": -1},
+    {"ids": [1], "days": 1, "filter": [1]},
+])
+def test_extend_endpoint_rejects_invalid_bodies(client, body):
+    response = client.post("/reservations/extend", json=body)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
@@ -0,0 +1,52 @@
+"""
+GET /reservations/search
+"""
+import pytest
+
+from service.models import db, Reservation
+
+
+@pytest.fixture
+def account_id(app):
+    with app.app_context():
+        return db.session.scalar(
+            db.select(Reservation.AccountId)
+            .where(Reservation.PickUpTime.is_not(None))
+            .group_by(Reservation.AccountId)
+            .having(db.func.count() >= 3)
+            .limit(1))
+
+
+def test_search_filters_and_pages_in_pick_up_order(client, account_id):
+    everything = client.get("/reservations/search",
+                            query_string={"account_id": account_id, "limit": 500}).get_json()
+    expected = [(row["PickUpTime"], row["Id"]) for row in everything["reservations"]]
+    assert len(expected) >= 3
+    assert expected == sorted(expected)
+    assert everything["next_cursor"] is None
+    assert {row["AccountId"] for row in everything["reservations"]} == {account_id}
+
+    seen, cursor = [], None
+    while True:
+        query = {"account_id": account_id, "limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/reservations/search", query_string=query).get_json()
+        seen += [(row["PickUpTime"], row["Id"]) for row in page["reservations"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == expected
+
+
+@pytest.mark.parametrize("query", [
+    {"account_id": "x"},
+    {"pickup_location_id": "1.5"},
+    {"car_type_id": ""},
+    {"pickup_from": "yesterday"},
+    {"limit": "many"},
+    {"limit": 0},
+    {"cursor": "not-a-cursor"},
+])
+def test_search_rejects_invalid_parameters(client, query):
+    response = client.get("/reservations/search", query_string=query)
+    assert response.status_code == 400
+    assert response.get_json()["error"].startswith("Invalid search parameters")
@@ -0,0 +1,35 @@
+"""
+The portable date expressions agree with Python on SQLite and compile for Postgres
+"""
+from datetime import datetime
+
+from sqlalchemy import create_engine, literal, select
+from sqlalchemy.dialects import postgresql
+
+from service.common.sql_functions import add_seconds, day_of_week, days_between, month_of
+
+PICK_UP = datetime(2024, 2, 28, 9, 30, 15)   # A Wednesday
+DROP_OFF = datetime(2024, 3, 2, 8, 0, 0)
+
+
+def test_sqlite_results_match_python():
+    engine = create_engine("sqlite://")
+    with engine.connect() as connection:
+        row = connection.execute(select(
+            day_of_week(literal(PICK_UP)), month_of(literal(PICK_UP)),
+            days_between(literal(PICK_UP), literal(DROP_OFF)),
+        )).one()
+        moved = connection.scalar(select(add_seconds(literal(PICK_UP), 86400 + 45)))
+    assert tuple(row) == (PICK_UP.weekday(), PICK_UP.month, (DROP_OFF - PICK_UP).days)
+    assert moved == datetime(2024, 2, 29, 9, 31, 0)
+
+
+def test_postgres_compilation():
+    def sql(expression):
+        return str(expression.compile(dialect=postgresql.dialect(),
+                                      compile_kwargs={"literal_binds": True}))
+
+    assert "ISODOW" in sql(day_of_week(literal(PICK_UP)))
+    assert "EXTRACT(MONTH" in sql(month_of(literal(PICK_UP)))
+    assert "EXTRACT(EPOCH" in sql(days_between(literal(PICK_UP), literal(DROP_OFF)))
+    assert "INTERVAL '1 second'" in sql(add_seconds(literal(PICK_UP), 60))
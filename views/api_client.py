@@ -0,0 +1,129 @@
+"""
+Client for the Flask API, shared by the Streamlit pages
+
+One pooled requests.Session (kept alive across reruns with cache_resource)
+is used for every call, so a page reuses its TCP connections instead of
+opening one per request, and every call has a timeout. Reference data that
+rarely changes (car types, locations) is cached with cache_data for
+REFERENCE_TTL seconds. fetch_concurrently() runs independent calls on a
+shared thread pool, so a page waits for the slowest call rather than for
+the sum of them.
+
+Cached lookups raise on errors instead of returning a fallback, so a
+failed call is retried on the next rerun rather than cached.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+FLASK_API_BASE_URL = os.getenv("FLASK_API_BASE_URL", "http://127.0.0.1:5000")
+
+# (connect, read) timeouts in seconds
+TIMEOUT = (3.05, 10)
+# Connections kept open to the API, and threads used for concurrent calls
+POOL_SIZE = 8
+# Seconds car types and locations are cached for
+REFERENCE_TTL = 300
+
+
+@st.cache_resource
+def get_session():
+    """The pooled keep-alive session shared by all pages and reruns."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@st.cache_resource
+def get_executor():
+    return ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="api-client")
+
+
+def api_request(method, path, **kwargs):
+    """Call the API with the shared session and default timeout."""
+    kwargs.setdefault("timeout", TIMEOUT)
+    return get_session().request(method, f"{FLASK_API_BASE_URL}{path}", **kwargs)
+
+
+def fetch_concurrently(calls, defaults):
+    """
+    Run independent calls at once. `calls` maps a name to a zero-argument
+    callable; a call that raises yields defaults[name] instead.
+    """
+    context = get_script_run_ctx()
+
+    def run(call):
+        # Let cached functions running in pool threads see the script context
+        add_script_run_ctx(ctx=context)
+        return call()
+
+    futures = {name: get_executor().submit(run, call) for name, call in calls.items()}
+    results = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except requests.RequestException:
+            results[name] = defaults[name]
+    return results
+
+
+######################################################################
+# Reference data
+######################################################################
+@st.cache_data(ttl=REFERENCE_TTL, show_spinner=False)
+def get_car_types():
+    """All car types."""
+    response = api_request("GET", "/car-types")
+    response.raise_for_status()
+    return response.json()
+
+
+@st.cache_data(ttl=REFERENCE_TTL, show_spinner=False)
+def get_locations():
+    """All branch locations."""
+    response = api_request("GET", "/locations")
+    response.raise_for_status()
+    return response.json()
+
+
+######################################################################
+# Accounts and reservations
+######################################################################
+def get_customer_name(account_id):
+    """Customer name of an account."""
+    response = api_request("GET", f"/accounts/{account_id}")
+    if response.status_code == 200:
+        return response.json().get("name", "Unknown")
+    return "Unknown"
+
+
+def get_reservations(account_id):
+    """Reservations of an account, each with its car type and locations embedded."""
+    response = api_request("GET", f"/reservations/account/{account_id}",
+                           params={"expand": "car_type,locations"})
+    if response.status_code == 200:
+        return response.json()
+    return []
+
+
+def extend_reservation(reservation_id):
+    """Extend the drop-off time of a reservation by 1 week."""
+    response = api_request("PUT", f"/reservations/{reservation_id}/extend")
+    return response.status_code == 200
+
+
+def create_reservation(data):
+    """Create a reservation."""
+    response = api_request("POST", "/reservations", json=data)
+    return response.status_code == 201
+
+
+def estimate_price(payload):
+    """Ask the API for a rental price quote; returns the response."""
+    return api_request("POST", "/predict-price", json=payload)
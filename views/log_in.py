@@ -1,12 +1,13 @@
 import streamlit as st
-import requests
 import pandas as pd
 from datetime import datetime, timedelta
+from views.api_client import (
+    create_reservation, extend_reservation, fetch_concurrently, get_car_types,
+    get_customer_name, get_locations, get_reservations,
+)
 
 st.set_page_config(layout="wide")
 
-FLASK_API_BASE_URL = "http://127.0.0.1:5000"
-
 if 'logged_in' not in st.session_state:
     st.session_state.logged_in = False
 
@@ -19,25 +20,6 @@ def logout():
     st.session_state.logged_in = False
     st.session_state.account_id = None
 
-def get_customer_name(account_id):
-    """Retrieve customer name using the Flask API."""
-    response = requests.get(f"{FLASK_API_BASE_URL}/accounts/{account_id}")
-    if response.status_code == 200:
-        return response.json().get("name", "Unknown")
-    return "Unknown"
-
-def get_reservations(account_id):
-    """Fetch reservations for the given account ID using the Flask API."""
-    response = requests.get(f"{FLASK_API_BASE_URL}/reservations/account/{account_id}")
-    if response.status_code == 200:
-        return pd.DataFrame(response.json())
-    return pd.DataFrame([])
-
-def extend_reservation(reservation_id):
-    """Extend the drop-off time of a reservation by 1 week."""
-    response = requests.put(f"{FLASK_API_BASE_URL}/reservations/{reservation_id}/extend")
-    return response.status_code == 200
-
 def create_new_reservation(account_id, car_type_id, pick_up_time, pick_up_location_id, drop_off_time, drop_off_location_id):
     """Create a new reservation using the Flask API."""
     data = {
@@ -48,35 +30,13 @@ def create_new_reservation(account_id, car_type_id, pick_up_time, pick_up_locati
         "PickUpLocationId": pick_up_location_id,
         "DropOffLocationId": drop_off_location_id
     }
-    response = requests.post(f"{FLASK_API_BASE_URL}/reservations", json=data)
-    return response.status_code == 201
-
-def get_car_types():
-    """Fetch all car types using the Flask API."""
-    response = requests.get(f"{FLASK_API_BASE_URL}/car-types")
-    if response.status_code == 200:
-        return response.json()
-    return []
-
-def get_car_type_by_id(type_id): 
-    response = requests.get(f"{FLASK_API_BASE_URL}/car-types/{type_id}")
-    if response.status_code == 200:
-        return response.json().get("type", "Unknown")
-    return "Unknown"
-
-def get_locations():
-    """Fetch all branch locations using the Flask API."""
-    response = requests.get(f"{FLASK_API_BASE_URL}/locations")
-    if response.status_code == 200:
-        return response.json()
-    return []
-
-def get_location_by_id(location_id):
-    response = requests.get(f"{FLASK_API_BASE_URL}/locations/{location_id}")
-    if response.status_code == 200:
-        return response.json().get("location", "Unknown Location")
-    else:
-        return "Unknown Location"
+    return create_reservation(data)
+
+def describe(details, key, unknown):
+    """Read a display string from an embedded object of an expanded reservation."""
+    if isinstance(details, dict):
+        return details.get(key) or unknown
+    return unknown
 
 
 if not st.session_state.logged_in:
@@ -86,19 +46,30 @@ if not st.session_state.logged_in:
         login(account_id)
         st.rerun() 
 else:
-    st.session_state.customer_name = get_customer_name(st.session_state.account_id)
+    # The page's reads are independent, so they are fetched at once
+    account_id = st.session_state.account_id
+    page_data = fetch_concurrently(
+        {
+            "customer_name": lambda: get_customer_name(account_id),
+            "reservations": lambda: get_reservations(account_id),
+            "car_types": get_car_types,
+            "locations": get_locations,
+        },
+        defaults={"customer_name": "Unknown", "reservations": [], "car_types": [], "locations": []},
+    )
+    st.session_state.customer_name = page_data["customer_name"]
     st.title(f"Welcome, {st.session_state.customer_name}!")
     st.subheader("Your Reservations")
-    reservations_df = get_reservations(st.session_state.account_id)
+    reservations_df = pd.DataFrame(page_data["reservations"])
     display_data = []
     for _, row in reservations_df.iterrows():
         display_data.append({
             "Reservation ID": row["Id"],
-            "Car Type": get_car_type_by_id(row["CarTypeId"]),  # Fetch car type
+            "Car Type": describe(row["CarType"], "type", "Unknown"),
             "Pick-Up Time": row["PickUpTime"],
             "Drop-Off Time": row["DropOffTime"],
-            "Pick-Up Location": get_location_by_id(row["PickUpLocationId"]),  # Fetch pick-up location
-            "Drop-Off Location": get_location_by_id(row["DropOffLocationId"]),  # Fetch drop-off location
+            "Pick-Up Location": describe(row["PickUpLocation"], "location", "Unknown Location"),
+            "Drop-Off Location": describe(row["DropOffLocation"], "location", "Unknown Location"),
         })
 
     display_df = pd.DataFrame(display_data)
@@ -115,11 +86,11 @@ else:
                 st.error(f"Failed to extend reservation {row['Id']}.")
 
     st.subheader("Create New Reservation")
-    car_types = get_car_types()
+    car_types = page_data["car_types"]
     car_type_choices = {f"{ct['Brand']} {ct['Model']}": ct['TypeId'] for ct in car_types}
     selected_car_type = st.selectbox("Select Car Type", list(car_type_choices.keys()))
 
-    locations = get_locations()
+    locations = page_data["locations"]
     location_choices = {loc['City']: loc['Id'] for loc in locations}
     selected_pick_up_location = st.selectbox("Pick-Up Location", list(location_choices.keys()))
     selected_drop_off_location = st.selectbox("Drop-Off Location", list(location_choices.keys()))
@@ -1,6 +1,5 @@
 import streamlit as st
-import requests
-FLASK_API_BASE_URL = "http://127.0.0.1:5000"
+from views.api_client import estimate_price
 
 st.title("Let's start renting a car!")
 
@@ -36,7 +35,7 @@ if st.button("Get Rental Price Estimate"):
     }
     # API call to the Flask route
     try:
-        response = requests.post(f"{FLASK_API_BASE_URL}/predict-price", json=payload)
+        response = estimate_price(payload)
         if response.status_code == 200:
             estimated_price = response.json().get("estimated_price", "N/A")
             st.success(f"Estimated Rental Price: ${estimated_price}")